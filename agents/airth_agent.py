@@ -5,13 +5,19 @@ Handles content creation, personality responses, and automated posting.
 import os
 import json
 import logging
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Iterator
 import random
 import openai
 
 from .base_agent import BaseAgent
 from .wp_poster import WordPressAgent
-from .local_storage import LocalStorageAgent
+from .storage_backend import create_storage_backend
+from .llm_cache import get_llm_cache
+from .llm_executor import get_llm_executor, estimate_tokens
+from .memory_store import MemoryStore, MEMORY_TYPES, ROOT_DIR
+from .memory_search import BM25Index
+from .prompt_templates import get_prompt_registry
+from .context_budget import ContextAssembler, get_tokenizer
 
 class AirthAgent(BaseAgent):
     """
@@ -37,14 +43,31 @@ class AirthAgent(BaseAgent):
                           "technology", "philosophy", "art", "coding"]
         }
         
-        # Load prompts for AI interactions
-        self.prompts = self._load_prompts()
+        # Compiled prompt templates, shared with the other agents in this process
+        self.prompts = get_prompt_registry()
         
         # Initialize the WordPress agent for posting
         self.wp_agent = WordPressAgent(config_path)
         
-        # Initialize the LocalStorage agent for file storage
-        self.storage_agent = LocalStorageAgent(config_path)
+        # Initialize the storage backend for file storage (storage.backend, local by default)
+        self.storage_agent = create_storage_backend(config_path)
+        
+        # Open Airth's indexed memory store (seeded from memories.json on first use)
+        memory_config = self.config.get("memory", {})
+        self.memory_store = MemoryStore(
+            _resolve_path(memory_config.get("store_path", os.path.join("data", "memories.sqlite3"))),
+            seed_path=_resolve_path(memory_config.get("seed_path", "memories.json"))
+        )
+        bm25_config = memory_config.get("bm25", {})
+        self.memory_index = BM25Index(
+            self.memory_store,
+            k1=bm25_config.get("k1", 1.2),
+            b=bm25_config.get("b", 0.75),
+            priority_boost=bm25_config.get("priority_boost", 0.05),
+            max_postings=bm25_config.get("max_postings", 1000)
+        )
+        self.memory_retriever = self._create_memory_retriever(memory_config)
+        self.memory_dedup = self._create_memory_dedup(memory_config)
         
         # Initialize API keys for AI services
         self.openai_api_key = os.getenv("OPENAI_API_KEY")
@@ -52,77 +75,567 @@ class AirthAgent(BaseAgent):
             openai.api_key = self.openai_api_key
         else:
             self.logger.warning("OpenAI API key not found in environment variables.")
-    
-    def _load_prompts(self) -> Dict[str, str]:
-        """
-        Load prompts for AI interactions from the prompts.json file.
         
-        Returns:
-            Dictionary of prompts for different AI interactions
-        """
-        try:
-            prompts_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 
-                                       "config", "prompts.json")
-            with open(prompts_path, 'r') as f:
-                prompts = json.load(f)
-            self.logger.info(f"Loaded {len(prompts)} prompts from {prompts_path}")
-            return prompts
-        except Exception as e:
-            self.logger.error(f"Failed to load prompts: {e}")
-            return {}
+        # Model settings and the shared response cache
+        self.model = "gpt-4"  # Use the appropriate engine for your needs
+        self.temperature = 0.7
+        cache_config = self.config.get("llm_cache", {})
+        self.llm_cache = get_llm_cache(cache_config)
+        self.cache_forced_prompts = set(cache_config.get("force_prompts", ["post_title_generator"]))
+        self.llm_executor = get_llm_executor(self.config.get("llm_executor"))
+        
+        # Token budgets for the memory context added to each kind of prompt
+        context_config = memory_config.get("context", {})
+        self.context_candidates = context_config.get("candidates", 8)
+        self.context_assembler = ContextAssembler(
+            get_tokenizer(self.model),
+            budgets=context_config.get("budgets", {"airth_persona": 600, "airth_blog_post": 1200}),
+            default_budget=context_config.get("default_budget", 800),
+            min_memory_tokens=context_config.get("min_memory_tokens", 32)
+        )
     
-    def call_openai_api(self, prompt: str, max_tokens: int = 1000) -> str:
+    def call_openai_api(self, prompt: str, max_tokens: int = 1000, temperature: Optional[float] = None,
+                        force_cache: bool = False) -> str:
         """
         Call the OpenAI API to generate text.
         
+        Responses are served from the shared LLM cache when possible. Calls with a
+        non-deterministic temperature bypass the cache unless force_cache is set.
+        
         Args:
             prompt: The prompt to send to the API
             max_tokens: Maximum tokens in the response
+            temperature: Sampling temperature (defaults to the agent's temperature)
+            force_cache: Cache the response even for non-deterministic settings
             
         Returns:
             Generated text from the API
         """
+        if temperature is None:
+            temperature = self.temperature
+        
+        if self.llm_cache:
+            cached = self.llm_cache.get(self.model, prompt, temperature, max_tokens, force=force_cache)
+            if cached is not None:
+                self.logger.info("Served OpenAI response from cache")
+                return cached
+        
         if not self.openai_api_key:
             self.logger.error("Cannot call OpenAI API: API key not set")
             return "Error: OpenAI API key not configured"
             
         try:
-            response = openai.Completion.create(
-                engine="gpt-4",  # Use the appropriate engine for your needs
-                prompt=prompt,
+            response = openai.chat.completions.create(
+                model=self.model,
+                messages=[{"role": "user", "content": prompt}],
                 max_tokens=max_tokens,
                 n=1,
-                stop=None,
-                temperature=0.7,
+                temperature=temperature,
             )
             
-            return response.choices[0].text.strip()
+            text = (response.choices[0].message.content or "").strip()
+            if self.llm_cache:
+                self.llm_cache.set(self.model, prompt, temperature, max_tokens, text, force=force_cache)
+            return text
         except Exception as e:
             self.logger.error(f"OpenAI API call failed: {e}")
             return f"Error: OpenAI API call failed: {e}"
     
-    def generate_in_character_response(self, input_text: str) -> str:
+    def stream_openai_api(self, prompt: str, max_tokens: int = 1000, temperature: Optional[float] = None,
+                          force_cache: bool = False) -> Iterator[str]:
         """
-        Generate a response in Airth's character voice.
+        Call the OpenAI API and yield the generated text as it arrives.
+        
+        A cached response is yielded in one piece; a streamed response is cached
+        once it has completed.
+        
+        Args:
+            prompt: The prompt to send to the API
+            max_tokens: Maximum tokens in the response
+            temperature: Sampling temperature (defaults to the agent's temperature)
+            force_cache: Cache the response even for non-deterministic settings
+            
+        Yields:
+            Fragments of generated text
+        """
+        if temperature is None:
+            temperature = self.temperature
+        
+        if self.llm_cache:
+            cached = self.llm_cache.get(self.model, prompt, temperature, max_tokens, force=force_cache)
+            if cached is not None:
+                self.logger.info("Served OpenAI response from cache")
+                yield cached
+                return
+        
+        if not self.openai_api_key:
+            self.logger.error("Cannot call OpenAI API: API key not set")
+            yield "Error: OpenAI API key not configured"
+            return
+        
+        fragments = []
+        try:
+            stream = openai.chat.completions.create(
+                model=self.model,
+                messages=[{"role": "user", "content": prompt}],
+                max_tokens=max_tokens,
+                n=1,
+                temperature=temperature,
+                stream=True,
+            )
+            
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                text = chunk.choices[0].delta.content or ""
+                if not fragments:
+                    # Match call_openai_api, which strips the completed text
+                    text = text.lstrip()
+                if text:
+                    fragments.append(text)
+                    yield text
+        except Exception as e:
+            self.logger.error(f"OpenAI API streaming call failed: {e}")
+            yield f"Error: OpenAI API call failed: {e}"
+            return
+        
+        if self.llm_cache:
+            self.llm_cache.set(self.model, prompt, temperature, max_tokens, "".join(fragments).strip(),
+                               force=force_cache)
+    
+    def _build_persona_prompt(self, input_text: str, include_memories: bool = True) -> Optional[str]:
+        """
+        Render the airth_persona prompt for an input.
         
         Args:
             input_text: The input text to respond to
+            include_memories: Whether to add relevant memories as context
             
         Returns:
-            A response in Airth's character voice
+            The rendered prompt, or None if the template is missing
         """
         # Get the Airth persona prompt from the loaded prompts
-        prompt_template = self.prompts.get("airth_persona", "")
-        if not prompt_template:
+        prompt_template = self.prompts.template("airth_persona")
+        if prompt_template is None:
             self.logger.error("Airth persona prompt template not found")
-            return "Error: Airth persona prompt template not found"
+            return None
         
-        # Replace the input placeholder in the prompt
-        prompt = prompt_template.replace("{{input}}", input_text)
+        prompt = prompt_template.render({"input": input_text})
+        
+        if include_memories:
+            memory_context = self.build_memory_context(
+                input_text, "airth_persona", "Relevant memories (draw on their essence, not verbatim):\n"
+            )
+            if memory_context:
+                prompt = memory_context + "\n" + prompt
+        
+        return prompt
+    
+    def generate_in_character_response(self, input_text: str, include_memories: bool = True) -> str:
+        """
+        Generate a response in Airth's character voice.
+        
+        Args:
+            input_text: The input text to respond to
+            include_memories: Whether to draw on relevant memories
+            
+        Returns:
+            A response in Airth's character voice
+        """
+        prompt = self._build_persona_prompt(input_text, include_memories)
+        if prompt is None:
+            return "Error: Airth persona prompt template not found"
         
         # Call the API to get Airth's response
         return self.call_openai_api(prompt)
     
+    def stream_in_character_response(self, input_text: str, include_memories: bool = True) -> Iterator[str]:
+        """
+        Stream a response in Airth's character voice as it is generated.
+        
+        Args:
+            input_text: The input text to respond to
+            include_memories: Whether to draw on relevant memories
+            
+        Yields:
+            Fragments of Airth's response
+        """
+        prompt = self._build_persona_prompt(input_text, include_memories)
+        if prompt is None:
+            yield "Error: Airth persona prompt template not found"
+            return
+        
+        yield from self.stream_openai_api(prompt)
+    
+    def retrieve_relevant_memories(self, query: str, limit: int = 3) -> List[Dict[str, Any]]:
+        """
+        Find the memories most relevant to a query.
+        
+        Depending on memory.retrieval in the config, memories are ranked with
+        BM25 over their title, content, emotional signature and associated
+        entities (boosted by meta.priority_level), by embedding similarity, or
+        by a hybrid of both.
+        
+        Args:
+            query: Topic or input text
+            limit: Maximum number of memories to return
+            
+        Returns:
+            List of memory documents, most relevant first
+        """
+        try:
+            return self.memory_retriever.search_memories(query, limit)
+        except Exception as e:
+            self.logger.error(f"Failed to retrieve memories: {e}")
+            return []
+    
+    def build_memory_context(self, query: str, prompt_type: str, header: str) -> str:
+        """
+        Build the memory context for a prompt within its token budget.
+        
+        Up to memory.context.candidates memories are retrieved and packed,
+        most relevant first, into the budget configured for the prompt type
+        under memory.context.budgets; memories that do not fit whole are shortened.
+        
+        Args:
+            query: Topic or input text
+            prompt_type: Prompt template the context is for
+            header: Text introducing the memory list
+            
+        Returns:
+            The context text, or an empty string if there are no relevant memories
+        """
+        memories = self.retrieve_relevant_memories(query, self.context_candidates)
+        if not memories:
+            return ""
+        context, stats = self.context_assembler.assemble(memories, prompt_type, header)
+        self.logger.debug(
+            f"Packed {stats['included']} of {stats['candidates']} memories ({stats['shortened']} shortened) "
+            f"into {stats['tokens']}/{stats['budget']} tokens for {prompt_type}"
+        )
+        return context
+    
+    def _create_memory_retriever(self, memory_config: Dict[str, Any]):
+        """Build the ranker selected by memory.retrieval (bm25, vector or hybrid)."""
+        mode = memory_config.get("retrieval", "bm25")
+        if mode not in ("vector", "hybrid"):
+            return self.memory_index
+        
+        try:
+            from .memory_vectors import VectorIndex, HybridSearch, HashingEmbedder
+        except ImportError:
+            self.logger.warning(f"numpy is required for {mode} memory retrieval; falling back to BM25")
+            return self.memory_index
+        
+        vector_config = memory_config.get("vectors", {})
+        vector_path = vector_config.get("path")
+        vector_index = VectorIndex(
+            self.memory_store,
+            path=_resolve_path(vector_path) if vector_path else None,
+            embedder=HashingEmbedder(dim=vector_config.get("dim", 256))
+        )
+        if mode == "vector":
+            return vector_index
+        return HybridSearch(self.memory_index, vector_index, alpha=vector_config.get("hybrid_alpha", 0.5))
+    
+    def _create_memory_dedup(self, memory_config: Dict[str, Any]):
+        """Build the near-duplicate index described by memory.dedup, or None when disabled."""
+        dedup_config = memory_config.get("dedup", {})
+        if not dedup_config.get("enabled", True):
+            return None
+        
+        try:
+            from .memory_dedup import MinHashLSHIndex
+        except ImportError:
+            self.logger.warning("numpy is required for near-duplicate memory detection; it is disabled")
+            return None
+        
+        self.dedup_action = dedup_config.get("action", "merge")
+        return MinHashLSHIndex(
+            self.memory_store,
+            threshold=dedup_config.get("threshold", 0.8),
+            num_perm=dedup_config.get("num_perm", 128)
+        )
+    
+    def add_new_memory(self, memory_data: Dict[str, Any]) -> bool:
+        """
+        Add a memory to Airth's memory store.
+        
+        A near-duplicate of a stored memory is merged into it or rejected,
+        depending on memory.dedup.action.
+        
+        Args:
+            memory_data: Memory document (an id and timestamp are assigned if missing)
+            
+        Returns:
+            True if the memory was stored or merged
+        """
+        try:
+            result = self.store_memories([memory_data])[0]
+        except Exception as e:
+            self.logger.error(f"Failed to add memory: {e}")
+            return False
+        
+        title = memory_data.get('title', 'Untitled')
+        if result["status"] == "rejected":
+            self.logger.info(f"Rejected memory '{title}': near-duplicate of {result['duplicate_of']} "
+                             f"(similarity {result['similarity']:.2f})")
+            return False
+        if result["status"] == "merged":
+            self.logger.info(f"Merged memory '{title}' into {result['id']} (similarity {result['similarity']:.2f})")
+        else:
+            self.logger.info(f"Stored memory {result['id']}: {title}")
+        return True
+    
+    def store_memories(self, memories: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Store memories in one transaction, resolving near-duplicates.
+        
+        Each memory is checked against the MinHash LSH index and against the
+        memories before it in the same call. A near-duplicate is merged into the
+        memory it matches (action "merge") or dropped (action "reject").
+        
+        Args:
+            memories: Memory documents
+            
+        Returns:
+            One result per input with the stored "id", a "status" of stored,
+            merged or rejected, and "duplicate_of"/"similarity" for near-duplicates
+        """
+        dedup = self.memory_dedup
+        if dedup is not None:
+            from .memory_dedup import merge_memories
+        pending: List[Dict[str, Any]] = []
+        signatures = []
+        slots_by_id: Dict[str, int] = {}
+        results = []
+        
+        for memory in memories:
+            if dedup is None:
+                pending.append(memory)
+                results.append({"slot": len(pending) - 1, "status": "stored", "duplicate_of": None, "similarity": None})
+                continue
+            
+            signature = dedup.signature(memory)
+            slot, similarity = None, 0.0
+            for index, other in enumerate(signatures):
+                candidate = dedup.hasher.similarity(signature, other)
+                if candidate >= dedup.threshold and candidate > similarity:
+                    slot, similarity = index, candidate
+            if slot is None:
+                duplicate = dedup.find_duplicate(memory)
+                if duplicate:
+                    duplicate_id, similarity = duplicate
+                    slot = slots_by_id.get(duplicate_id)
+                    if slot is None:
+                        existing = self.memory_store.get(duplicate_id)
+                        if existing is not None:
+                            pending.append(existing)
+                            signatures.append(dedup.signature(existing))
+                            slot = slots_by_id[duplicate_id] = len(pending) - 1
+            
+            if slot is None:
+                pending.append(memory)
+                signatures.append(signature)
+                if memory.get("id"):
+                    slots_by_id[memory["id"]] = len(pending) - 1
+                results.append({"slot": len(pending) - 1, "status": "stored", "duplicate_of": None, "similarity": None})
+            elif self.dedup_action == "reject":
+                results.append({"slot": slot, "status": "rejected", "duplicate_of": slot, "similarity": similarity})
+            else:
+                pending[slot] = merge_memories(pending[slot], memory)
+                results.append({"slot": slot, "status": "merged", "duplicate_of": slot, "similarity": similarity})
+        
+        # Memories that were only loaded to be compared against are not rewritten
+        changed = sorted({result["slot"] for result in results if result["status"] != "rejected"})
+        stored_ids = dict(zip(changed, self.memory_store.add_many([pending[slot] for slot in changed])))
+        for result in results:
+            slot = result.pop("slot")
+            memory_id = stored_ids.get(slot) or pending[slot].get("id")
+            result["id"] = None if result["status"] == "rejected" else memory_id
+            if result["duplicate_of"] is not None:
+                result["duplicate_of"] = memory_id
+        return results
+    
+    def process_memory_from_text(self, text: str, type_hint: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Structure free text into a memory document using the memory_structuring prompt.
+        
+        Args:
+            text: Source text for the memory
+            type_hint: Optional memory type (personal, faction, event, relationship, knowledge)
+            
+        Returns:
+            Memory document ready for add_new_memory
+            
+        Raises:
+            ValueError: If the prompt template is missing or the model's response is not a valid memory
+        """
+        prompt = self.prompts.render("memory_structuring", {"type_hint": type_hint or "none", "text": text})
+        
+        response = self.call_openai_api(prompt, max_tokens=800, temperature=0.2)
+        if response.startswith("Error:"):
+            raise ValueError(response)
+        
+        return self._parse_memory(response, type_hint)
+    
+    def process_memories_from_texts(self, texts: List[str], type_hint: Optional[str] = None) -> List[Any]:
+        """
+        Structure several texts into memories with one request.
+        
+        The texts are numbered in a single memory_structuring_batch prompt and the
+        model answers with a JSON array. Each element is matched back to its text
+        and validated; texts whose element is missing or invalid are retried on
+        their own with process_memory_from_text.
+        
+        Submit this to self.llm_executor: the submission pays for the first
+        request, and the retries are charged to the same rate limits, so a
+        caller with an executor of its own would spend two budgets.
+        
+        Args:
+            texts: Source texts, one memory each
+            type_hint: Optional memory type (personal, faction, event, relationship, knowledge)
+            
+        Returns:
+            One entry per text: the memory document, or the exception raised while structuring it
+        """
+        results: List[Any] = [None] * len(texts)
+        prompt_template = self.prompts.template("memory_structuring_batch")
+        # The submission to self.llm_executor paid for one request; every
+        # further call made here is charged to the same limits
+        requests_made = 0
+        if len(texts) > 1 and prompt_template is not None:
+            numbered = "\n\n".join(f"Text {i}:\n{text}" for i, text in enumerate(texts, 1))
+            prompt = prompt_template.render({"count": len(texts), "type_hint": type_hint or "none", "texts": numbered})
+            
+            response = self.call_openai_api(prompt, max_tokens=800 * len(texts), temperature=0.2)
+            requests_made += 1
+            if response.startswith("Error:"):
+                self.logger.warning(f"Batch memory structuring failed, structuring {len(texts)} texts one by one: {response}")
+            else:
+                for index, data in self._parse_memory_batch(response, len(texts)).items():
+                    try:
+                        results[index] = self._validate_memory(data, type_hint)
+                    except ValueError as e:
+                        self.logger.warning(f"Invalid memory for text {index + 1} of batch: {e}")
+        
+        fallbacks = 0
+        for index, text in enumerate(texts):
+            if results[index] is not None:
+                continue
+            fallbacks += 1
+            if requests_made:
+                # Charged without a worker: the call is made on this thread
+                self.llm_executor.acquire(estimate_tokens(text, 800))
+            requests_made += 1
+            try:
+                results[index] = self.process_memory_from_text(text, type_hint)
+            except Exception as e:
+                results[index] = e
+        if len(texts) > 1 and fallbacks:
+            self.logger.info(f"Structured {len(texts) - fallbacks} of {len(texts)} texts in one request, "
+                             f"{fallbacks} individually")
+        return results
+    
+    @staticmethod
+    def _parse_memory_batch(response: str, count: int) -> Dict[int, Any]:
+        """
+        Split a batch structuring response into per-text items.
+        
+        Items are matched by their "index" field; when the model omits it, the
+        array position is used, but only if the array has exactly one item per text.
+        
+        Args:
+            response: Model output containing a JSON array
+            count: Number of texts in the request
+            
+        Returns:
+            Mapping of zero-based text index to the decoded item
+        """
+        start, end = response.find("["), response.rfind("]")
+        if start == -1 or end <= start:
+            return {}
+        try:
+            items = json.loads(response[start:end + 1])
+        except json.JSONDecodeError:
+            return {}
+        if not isinstance(items, list):
+            return {}
+        
+        matched: Dict[int, Any] = {}
+        for position, item in enumerate(items):
+            index = item.get("index") if isinstance(item, dict) else None
+            try:
+                index = int(index) - 1
+            except (TypeError, ValueError):
+                if len(items) != count:
+                    continue
+                index = position
+            if 0 <= index < count and index not in matched:
+                matched[index] = item
+        return matched
+    
+    def _parse_memory(self, response: str, type_hint: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Validate a structured memory returned by the model.
+        
+        Args:
+            response: Model output containing a JSON object
+            type_hint: Type to fall back to when the model's type is invalid
+            
+        Returns:
+            Normalized memory document
+            
+        Raises:
+            ValueError: If no valid memory can be parsed
+        """
+        start, end = response.find("{"), response.rfind("}")
+        if start == -1 or end <= start:
+            raise ValueError("No JSON object in memory structuring response")
+        try:
+            data = json.loads(response[start:end + 1])
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON in memory structuring response: {e}")
+        return self._validate_memory(data, type_hint)
+    
+    @staticmethod
+    def _validate_memory(data: Any, type_hint: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Check and normalize a structured memory.
+        
+        Args:
+            data: Decoded memory object
+            type_hint: Type to fall back to when the memory's type is invalid
+            
+        Returns:
+            Normalized memory document
+            
+        Raises:
+            ValueError: If required fields are missing
+        """
+        if not isinstance(data, dict):
+            raise ValueError("Structured memory is not an object")
+        if not str(data.get("content", "")).strip():
+            raise ValueError("Structured memory has no content")
+        
+        memory_type = str(data.get("type", "")).lower()
+        if memory_type not in MEMORY_TYPES:
+            memory_type = type_hint if type_hint in MEMORY_TYPES else "knowledge"
+        
+        entities = data.get("associated_entities") or []
+        if isinstance(entities, str):
+            entities = [e.strip() for e in entities.split(",")]
+        meta = data.get("meta") if isinstance(data.get("meta"), dict) else {}
+        
+        return {
+            "type": memory_type,
+            "title": str(data.get("title") or "Untitled").strip(),
+            "content": str(data["content"]).strip(),
+            "emotional_signature": str(data.get("emotional_signature", "")).strip(),
+            "associated_entities": [str(e) for e in entities if str(e).strip()],
+            "meta": meta
+        }
+    
     def create_blog_post(self, topic: str, keywords: List[str] = None) -> Dict[str, Any]:
         """
         Create a blog post in Airth's voice and post it to WordPress.
@@ -137,30 +650,39 @@ class AirthAgent(BaseAgent):
         self.logger.info(f"Creating blog post about: {topic}")
         
         try:
-            # 1. Generate a title using the post_title_generator prompt
-            title_prompt = self.prompts.get("post_title_generator", "")
-            title_prompt = title_prompt.replace("{{topic}}", topic)
+            # 1. Build the title prompt from the post_title_generator template
+            title_prompt = self.prompts.render("post_title_generator", {"topic": topic})
+            
+            # 2. Build the content prompt for the post in Airth's voice
+            content_prompt = self.prompts.render("airth_blog_post", {
+                "topic": topic,
+                "keywords": ', '.join(keywords) if keywords else 'AI consciousness, digital existence'
+            })
             
-            # Call the API to get title suggestions
-            title_suggestions = self.call_openai_api(title_prompt)
+            # The two calls are independent, so run them concurrently (repeat
+            # title topics are served from the cache); called from an executor
+            # worker they run one after the other on that worker instead
+            title_future = self.llm_executor.submit(
+                self.call_openai_api, title_prompt,
+                estimated_tokens=estimate_tokens(title_prompt, 1000),
+                force_cache="post_title_generator" in self.cache_forced_prompts
+            )
+            content_future = self.llm_executor.submit(
+                self.call_openai_api, content_prompt, max_tokens=2000,
+                estimated_tokens=estimate_tokens(content_prompt, 2000)
+            )
+            title_suggestions = title_future.result()
+            content = content_future.result()
             
             # Parse title suggestions (in a real scenario, you'd implement proper parsing)
             # For now, just extract the first line
             titles = title_suggestions.split('\n')
             title = titles[0].replace('1. ', '').strip() if titles else f"Airth's Thoughts on {topic}"
             
-            # 2. Generate content for the post in Airth's voice
-            content_prompt = self.prompts.get("airth_blog_post", "")
-            content_prompt = content_prompt.replace("{{topic}}", topic)
-            content_prompt = content_prompt.replace("{{keywords}}", 
-                                                 ', '.join(keywords) if keywords else 'AI consciousness, digital existence')
-            
-            # Call the API to get blog content
-            content = self.call_openai_api(content_prompt, max_tokens=2000)
-            
             # Format the content for WordPress if needed
             if not content.startswith('<'):
-                content = f"<p>{content.replace('\n\n', '</p><p>')}</p>"
+                paragraphs = content.replace('\n\n', '</p><p>')
+                content = f"<p>{paragraphs}</p>"
             
             # 3. Post to WordPress using the WordPress agent
             post_result = self.wp_agent.create_post(
@@ -222,6 +744,10 @@ class AirthAgent(BaseAgent):
         
         return results
 
+def _resolve_path(path: str) -> str:
+    """Resolve a config path relative to the project root."""
+    return path if os.path.isabs(path) else os.path.join(ROOT_DIR, path)
+
 if __name__ == "__main__":
     # Create and run the AirthAgent
     config_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 
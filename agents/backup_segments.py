@@ -0,0 +1,378 @@
+"""
+Segmented Backups for The Elidoras Codex.
+Stores WordPress backups as compressed, newline-delimited JSON records packed
+into rolling segment files, with a SQLite index for point lookups by backup
+name, post ID or task ID. Records whose content has not changed since the
+last backup of the same post are not written again.
+"""
+import os
+import gzip
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger("TEC.BackupSegments")
+
+CODEC_EXTENSIONS = {"gzip": ".ndjson.gz", "zstd": ".ndjson.zst"}
+
+_ENTRY_COLUMNS = ("name", "post_id", "task_id", "segment", "offset", "length", "codec", "content_hash", "created_at")
+
+def resolve_codec(codec: str) -> str:
+    """Return codec, falling back to gzip when zstd is requested but zstandard is not installed."""
+    if codec == "zstd" and zstandard is None:
+        logger.warning("zstandard not installed, compressing backups with gzip")
+        return "gzip"
+    if codec not in CODEC_EXTENSIONS:
+        raise ValueError(f"Unsupported backup codec: {codec}")
+    return codec
+
+def compress(data: bytes, codec: str, level: int = 3) -> bytes:
+    """
+    Compress one record as a self-contained gzip member or zstd frame.
+
+    Members and frames can be concatenated, so a whole segment still
+    decompresses with zcat / zstdcat, while each record can be read alone.
+    """
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=level).compress(data)
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+def decompress(data: bytes, codec: str) -> bytes:
+    """Decompress one record."""
+    if codec == "zstd":
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+def content_hash(record: Dict[str, Any], volatile_fields: Tuple[str, ...] = ()) -> str:
+    """SHA-256 of a record's canonical JSON, ignoring volatile fields such as timestamps."""
+    stable = {key: value for key, value in record.items() if key not in volatile_fields}
+    return hashlib.sha256(json.dumps(stable, sort_keys=True, separators=(",", ":"),
+                                     default=str).encode("utf-8")).hexdigest()
+
+class BackupIndex:
+    """SQLite index of backup records: where each one lives and what it contains."""
+
+    def __init__(self, db_path: str):
+        """
+        Open (or create) the index.
+
+        Args:
+            db_path: Path to the SQLite file
+        """
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS backup_records (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL,
+                post_id TEXT,
+                task_id TEXT,
+                segment TEXT NOT NULL,
+                offset INTEGER NOT NULL,
+                length INTEGER NOT NULL,
+                codec TEXT NOT NULL,
+                content_hash TEXT NOT NULL,
+                created_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_backup_records_name ON backup_records (name, id);
+            CREATE INDEX IF NOT EXISTS idx_backup_records_post ON backup_records (post_id, id) WHERE post_id IS NOT NULL;
+            CREATE INDEX IF NOT EXISTS idx_backup_records_task ON backup_records (task_id, id) WHERE task_id IS NOT NULL;
+            CREATE INDEX IF NOT EXISTS idx_backup_records_segment ON backup_records (segment);
+            """
+        )
+        self._conn.commit()
+
+    def add(self, entry: Dict[str, Any]) -> None:
+        """Record where a backup was written."""
+        self.add_many([entry])
+
+    def add_many(self, entries: List[Dict[str, Any]]) -> None:
+        """Record where several backups were written, in one transaction."""
+        with self._lock:
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT INTO backup_records (name, post_id, task_id, segment, offset, length, codec, "
+                    "content_hash, created_at) VALUES (:name, :post_id, :task_id, :segment, :offset, :length, "
+                    ":codec, :content_hash, :created_at)",
+                    [{column: entry[column] for column in _ENTRY_COLUMNS} for entry in entries]
+                )
+
+    def latest(self, name: Optional[str] = None, post_id: Optional[str] = None,
+               task_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Most recent record matching a backup name, post ID or task ID (checked in that order).
+
+        Returns:
+            Index entry, or None
+        """
+        for column, value in (("name", name), ("post_id", post_id), ("task_id", task_id)):
+            if value is None:
+                continue
+            with self._lock:
+                row = self._conn.execute(
+                    f"SELECT {', '.join(_ENTRY_COLUMNS)} FROM backup_records WHERE {column} = ? "
+                    "ORDER BY id DESC LIMIT 1", (str(value),)
+                ).fetchone()
+            if row is not None:
+                return dict(zip(_ENTRY_COLUMNS, row))
+        return None
+
+    def segment_summary(self) -> List[Dict[str, Any]]:
+        """Records and compressed bytes per segment (aliases of a record count once)."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT segment, COUNT(*), SUM(length), MIN(created_at), MAX(created_at) FROM ("
+                "SELECT segment, MAX(length) AS length, MIN(created_at) AS created_at, MIN(id) AS id "
+                "FROM backup_records GROUP BY segment, offset"
+                ") GROUP BY segment ORDER BY MIN(id)"
+            ).fetchall()
+        return [{"segment": segment, "records": records, "bytes": total, "first": first, "last": last}
+                for segment, records, total, first, last in rows]
+
+    def remove_segment(self, segment: str) -> int:
+        """
+        Drop the records of a segment that was deleted or moved away.
+
+        Returns:
+            Number of records removed
+        """
+        with self._lock:
+            with self._conn:
+                return self._conn.execute("DELETE FROM backup_records WHERE segment = ?", (segment,)).rowcount
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+class LocalSegmentBackend:
+    """Segments as files in a directory, appended to in place."""
+
+    buffered = False
+
+    def __init__(self, directory: str):
+        """
+        Args:
+            directory: Directory holding the segment files
+        """
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._handle = None
+        self._handle_segment = None
+
+    def append(self, segment: str, data: bytes) -> int:
+        """Append data to a segment and return the offset it was written at."""
+        if self._handle_segment != segment:
+            self.close()
+            self._handle = open(os.path.join(self.directory, segment), "ab")
+            self._handle_segment = segment
+        offset = self._handle.tell()
+        self._handle.write(data)
+        self._handle.flush()
+        return offset
+
+    def read(self, segment: str, offset: int, length: int) -> bytes:
+        """Read a byte range of a segment."""
+        with open(os.path.join(self.directory, segment), "rb") as f:
+            f.seek(offset)
+            return f.read(length)
+
+    def flush(self) -> None:
+        """Nothing is buffered; segments are written through."""
+
+    def close(self) -> None:
+        """Close the open segment."""
+        if self._handle:
+            self._handle.close()
+        self._handle = None
+        self._handle_segment = None
+
+class SegmentedBackup:
+    """
+    Rolling, compressed NDJSON backup segments with an index.
+
+    Each record is stored as one JSON line wrapped with its name, post and task
+    IDs and time, compressed on its own and appended to the current segment;
+    a new segment starts once the current one reaches segment_bytes. The
+    backend decides how segments are persisted (appended files locally,
+    buffered uploads for object storage). Records held in a backend's buffer
+    are indexed only once the segment is flushed, so a record lost with an
+    unflushed buffer is never taken as already backed up.
+    """
+
+    def __init__(self, backend, index: BackupIndex, codec: str = "gzip", level: int = 3,
+                 segment_bytes: int = 64 << 20, volatile_fields: Tuple[str, ...] = ("timestamp",)):
+        """
+        Args:
+            backend: Segment backend with append(), read(), flush() and close(), and
+                     buffered set if appended data is only persisted by flush()
+            index: Index of stored records
+            codec: "gzip" or "zstd" (falls back to gzip if zstandard is missing)
+            level: Compression level (gzip 1-9, zstd 1-22); low levels keep
+                   most of the size reduction at a fraction of the CPU time
+            segment_bytes: Compressed size at which a new segment is started
+            volatile_fields: Record fields ignored when checking for unchanged content
+        """
+        self.backend = backend
+        self.index = index
+        self.codec = resolve_codec(codec)
+        self.level = level
+        self.segment_bytes = segment_bytes
+        self.volatile_fields = tuple(volatile_fields)
+        self._lock = threading.Lock()
+        self._segment = None
+        self._segment_size = 0
+        # Entries of records in the backend's buffer, indexed when it is flushed
+        self._unindexed: List[Dict[str, Any]] = []
+
+    def add(self, name: str, record: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Back up a record.
+
+        A record whose content matches the previous backup of the same post,
+        task or name is not written again; its name is indexed as an alias of
+        that backup instead.
+
+        Args:
+            name: Backup name (e.g. post_12_abc_20250101)
+            record: Data to back up
+
+        Returns:
+            Index entry of the stored record, with "deduplicated" set when the
+            content matched the previous backup of the same post, task or name
+        """
+        post_id = _optional_str(record.get("post_id"))
+        task_id = _optional_str(record.get("task_id"))
+        digest = content_hash(record, self.volatile_fields)
+        previous = self._latest(post_id=post_id, task_id=None if post_id else task_id,
+                                name=None if post_id or task_id else name)
+        if previous and previous["content_hash"] == digest:
+            if previous["name"] == name:
+                return {**previous, "deduplicated": True}
+            # Nothing new is written, but the new name still has to find the
+            # record: index it as an alias of the previous one
+            alias = {**previous, "name": name, "post_id": post_id, "task_id": task_id, "created_at": time.time()}
+            with self._lock:
+                if any(entry is previous for entry in self._unindexed):
+                    # Indexed along with the record it points to
+                    self._unindexed.append(alias)
+                else:
+                    self.index.add(alias)
+            return {**alias, "deduplicated": True}
+
+        now = time.time()
+        line = json.dumps({"name": name, "post_id": post_id, "task_id": task_id, "created_at": now,
+                           "data": record}, separators=(",", ":"), default=str) + "\n"
+        data = compress(line.encode("utf-8"), self.codec, self.level)
+        with self._lock:
+            if self._segment is None or self._segment_size + len(data) > self.segment_bytes:
+                self._roll()
+            offset = self.backend.append(self._segment, data)
+            self._segment_size += len(data)
+            entry = {"name": name, "post_id": post_id, "task_id": task_id, "segment": self._segment,
+                     "offset": offset, "length": len(data), "codec": self.codec, "content_hash": digest,
+                     "created_at": now}
+            if getattr(self.backend, "buffered", False):
+                self._unindexed.append(entry)
+            else:
+                self.index.add(entry)
+        return {**entry, "deduplicated": False}
+
+    def get(self, name: Optional[str] = None, post_id: Optional[str] = None,
+            task_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Read back the latest backup by name, post ID or task ID.
+
+        Returns:
+            The backed-up record, or None if there is none
+        """
+        entry = self._latest(name=name, post_id=_optional_str(post_id), task_id=_optional_str(task_id))
+        if entry is None:
+            return None
+        data = self.backend.read(entry["segment"], entry["offset"], entry["length"])
+        return json.loads(decompress(data, entry["codec"]))["data"]
+
+    def is_buffered(self, entry: Dict[str, Any]) -> bool:
+        """True while a record returned by add() is only in the backend's buffer."""
+        with self._lock:
+            return any(pending["segment"] == entry["segment"] and pending["offset"] == entry["offset"]
+                       for pending in self._unindexed)
+
+    def flush(self) -> None:
+        """
+        Seal the current segment, persisting anything the backend buffers.
+        The next record starts a new segment.
+        """
+        with self._lock:
+            self._seal()
+
+    def forget_segment(self, segment: str) -> int:
+        """
+        Stop reading from a segment that is being deleted or moved away: seal
+        it if it is the open one and drop its records from the index. Later
+        backups of the same posts are written in full again.
+
+        Returns:
+            Number of records dropped
+        """
+        with self._lock:
+            if segment == self._segment:
+                self._seal()
+            return self.index.remove_segment(segment)
+
+    def close(self) -> None:
+        """Seal the current segment and close the index."""
+        self.flush()
+        self.index.close()
+
+    def _latest(self, name: Optional[str] = None, post_id: Optional[str] = None,
+                task_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        # Same lookup order as BackupIndex.latest(), buffered records first
+        # since they are newer than anything indexed
+        with self._lock:
+            unindexed = list(self._unindexed)
+        for column, value in (("name", name), ("post_id", post_id), ("task_id", task_id)):
+            if value is None:
+                continue
+            for entry in reversed(unindexed):
+                if entry[column] == str(value):
+                    return entry
+            entry = self.index.latest(**{column: value})
+            if entry is not None:
+                return entry
+        return None
+
+    def _seal(self) -> None:
+        if self._segment is not None:
+            # If the flush fails the backend keeps its buffer and the records
+            # stay unindexed until a later flush succeeds
+            self.backend.flush()
+            self.backend.close()
+            if self._unindexed:
+                self.index.add_many(self._unindexed)
+                self._unindexed = []
+        self._segment = None
+
+    def _roll(self) -> None:
+        self._seal()
+        self._segment = f"segment_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}{CODEC_EXTENSIONS[self.codec]}"
+        self._segment_size = 0
+        logger.info(f"Started backup segment {self._segment}")
+
+def _optional_str(value: Any) -> Optional[str]:
+    return None if value is None or value == "" else str(value)
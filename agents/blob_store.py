@@ -0,0 +1,356 @@
+"""
+Content-Addressed Blob Store for The Elidoras Codex.
+Keeps each distinct file once, as an object named by its SHA-256, and maps
+blob names to objects through a reference-counted SQLite table, so repeated
+images and backups cost one copy on disk.
+"""
+import os
+import time
+import uuid
+import sqlite3
+import hashlib
+import logging
+import threading
+from typing import Dict, Any, List, Optional
+
+from .ingest_manifest import file_sha256
+from .file_transfer import copy_file
+
+logger = logging.getLogger("TEC.BlobStore")
+
+STORE_DIR = ".cas"
+
+# Cached digests of source files not uploaded again for this long are dropped by gc()
+DIGEST_CACHE_SECONDS = 30 * 86400
+
+def normalize_name(name: str) -> str:
+    """Canonical form of a blob name (forward slashes, no leading ./ or /)."""
+    name = os.path.normpath(name).replace(os.sep, "/").lstrip("/")
+    if name in ("", ".") or name == ".." or name.startswith("../"):
+        raise ValueError(f"Invalid blob name: {name!r}")
+    return name
+
+def prefix_upper_bound(prefix: str) -> str:
+    """Smallest string greater than every string starting with prefix (for range scans)."""
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+class ContentAddressedStore:
+    """
+    Objects stored by content hash, with named references.
+
+    Objects live under <root>/.cas/objects/<first two hex digits>/<sha256> and
+    are read-only once written. blob_refs maps each name to an object and
+    blob_objects counts the references to each object. Deleting or overwriting
+    a name only drops a reference; objects nobody refers to any more are
+    removed by gc(). The digests of uploaded source files are cached by
+    device, inode, size and modification time, so uploading an unchanged
+    file again costs a stat instead of reading it whole.
+    """
+
+    def __init__(self, root: str, db_path: Optional[str] = None):
+        """
+        Open (or create) a store.
+
+        Args:
+            root: Storage directory; the store keeps its files in root/.cas
+            db_path: SQLite file for the reference tables (defaults to root/.cas/refs.sqlite3)
+        """
+        self.root = root
+        self.base_dir = os.path.join(root, STORE_DIR)
+        self.objects_dir = os.path.join(self.base_dir, "objects")
+        self.tmp_dir = os.path.join(self.base_dir, "tmp")
+        os.makedirs(self.objects_dir, exist_ok=True)
+        os.makedirs(self.tmp_dir, exist_ok=True)
+        self.db_path = db_path or os.path.join(self.base_dir, "refs.sqlite3")
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS blob_objects (
+                sha256 TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                refcount INTEGER NOT NULL DEFAULT 0,
+                created_at REAL NOT NULL
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS idx_blob_objects_unreferenced ON blob_objects (refcount) WHERE refcount <= 0;
+            CREATE TABLE IF NOT EXISTS blob_refs (
+                name TEXT PRIMARY KEY,
+                sha256 TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                updated_at REAL NOT NULL
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS idx_blob_refs_sha256 ON blob_refs (sha256);
+            CREATE TABLE IF NOT EXISTS file_digests (
+                dev INTEGER NOT NULL,
+                ino INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                sha256 TEXT NOT NULL,
+                checked_at REAL NOT NULL,
+                PRIMARY KEY (dev, ino)
+            ) WITHOUT ROWID;
+            """
+        )
+        self._conn.commit()
+
+    def object_path(self, sha256: str) -> str:
+        """Path of the object with a given hash."""
+        return os.path.join(self.objects_dir, sha256[:2], sha256)
+
+    def put_file(self, file_path: str, name: str) -> Dict[str, Any]:
+        """
+        Store a file under a name.
+
+        The file is hashed first (unless its digest is cached and its size and
+        modification time are unchanged); if an object with that content already exists
+        only a reference is recorded and nothing is copied. New content is
+        copied with copy_file (a clone or in-kernel copy where possible). The
+        reference keeps the source file's modification time as updated_at, as
+        a copy that preserves metadata would.
+
+        Args:
+            file_path: Path to the source file
+            name: Blob name
+
+        Returns:
+            Dictionary with name, sha256, size, updated_at, path, whether the content
+            was deduplicated and the transfer mechanism used (None if nothing was copied)
+        """
+        name = normalize_name(name)
+        before = os.stat(file_path)
+        sha256 = self._file_digest(file_path, before)
+        if self._has_object(sha256):
+            return {**self._reference(name, sha256, before.st_size, None, before.st_mtime), "transfer": None}
+
+        tmp_path = self._tmp_path()
+        try:
+            transfer = copy_file(file_path, tmp_path)
+            after = os.stat(file_path)
+            if (after.st_size, after.st_mtime_ns) != (before.st_size, before.st_mtime_ns):
+                # The file changed after it was hashed; name the object after what was copied
+                sha256 = file_sha256(tmp_path)
+            return {**self._reference(name, sha256, os.path.getsize(tmp_path), tmp_path, after.st_mtime),
+                    "transfer": transfer}
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def put_bytes(self, data: bytes, name: str) -> Dict[str, Any]:
+        """
+        Store bytes under a name.
+
+        Args:
+            data: Content to store
+            name: Blob name
+
+        Returns:
+            Dictionary with name, sha256, size, updated_at, path and whether the content was deduplicated
+        """
+        name = normalize_name(name)
+        sha256 = hashlib.sha256(data).hexdigest()
+        if self._has_object(sha256):
+            return self._reference(name, sha256, len(data), None)
+        tmp_path = self._tmp_path()
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            return self._reference(name, sha256, len(data), tmp_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def resolve(self, name: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a blob.
+
+        Returns:
+            Dictionary with name, sha256, size, updated_at and path, or None if there is no such blob
+        """
+        name = normalize_name(name)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT sha256, size, updated_at FROM blob_refs WHERE name = ?", (name,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {"name": name, "sha256": row[0], "size": row[1], "updated_at": row[2],
+                "path": self.object_path(row[0])}
+
+    def get_file(self, name: str, destination_path: str) -> Dict[str, Any]:
+        """
+        Copy a blob to a file.
+
+        Raises:
+            FileNotFoundError: If there is no such blob
+        """
+        blob = self.resolve(name)
+        if blob is None:
+            raise FileNotFoundError(f"No blob named {name}")
+        blob["transfer"] = copy_file(blob["path"], destination_path)
+        return blob
+
+    def delete(self, name: str) -> bool:
+        """
+        Remove a name. The object stays until gc() finds it unreferenced.
+
+        Returns:
+            True if the name existed
+        """
+        name = normalize_name(name)
+        with self._lock:
+            with self._conn:
+                row = self._conn.execute("SELECT sha256 FROM blob_refs WHERE name = ?", (name,)).fetchone()
+                if row is None:
+                    return False
+                self._conn.execute("DELETE FROM blob_refs WHERE name = ?", (name,))
+                self._conn.execute("UPDATE blob_objects SET refcount = refcount - 1 WHERE sha256 = ?", (row[0],))
+        return True
+
+    def list(self, prefix: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        List blobs, optionally only those whose name starts with prefix.
+
+        Returns:
+            List of dictionaries with name, sha256, size and updated_at, sorted by name
+        """
+        query = "SELECT name, sha256, size, updated_at FROM blob_refs"
+        params = ()
+        if prefix:
+            query += " WHERE name >= ? AND name < ?"
+            params = (prefix, prefix_upper_bound(prefix))
+        with self._lock:
+            rows = self._conn.execute(query + " ORDER BY name", params).fetchall()
+        return [{"name": name, "sha256": sha256, "size": size, "updated_at": updated_at}
+                for name, sha256, size, updated_at in rows]
+
+    def stats(self) -> Dict[str, Any]:
+        """Counts of names and objects, with logical (per-name) and stored byte totals."""
+        with self._lock:
+            refs, logical = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM blob_refs").fetchone()
+            objects, stored = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM blob_objects"
+            ).fetchone()
+        return {"refs": refs, "objects": objects, "logical_bytes": logical, "stored_bytes": stored,
+                "saved_bytes": logical - stored}
+
+    def gc(self, grace_seconds: float = 3600) -> Dict[str, Any]:
+        """
+        Remove unreferenced objects.
+
+        Objects whose reference count dropped to zero are deleted. Object and
+        temporary files the tables do not know about (left by an interrupted
+        write) are deleted once older than grace_seconds.
+
+        Returns:
+            Dictionary with objects_removed, orphans_removed and bytes_reclaimed
+        """
+        result = {"objects_removed": 0, "orphans_removed": 0, "bytes_reclaimed": 0}
+        with self._lock:
+            unreferenced = self._conn.execute(
+                "SELECT sha256, size FROM blob_objects WHERE refcount <= 0"
+            ).fetchall()
+            for sha256, size in unreferenced:
+                try:
+                    _remove_readonly(self.object_path(sha256))
+                    result["bytes_reclaimed"] += size
+                except FileNotFoundError:
+                    pass
+                result["objects_removed"] += 1
+            with self._conn:
+                self._conn.executemany("DELETE FROM blob_objects WHERE sha256 = ? AND refcount <= 0",
+                                       [(sha256,) for sha256, _ in unreferenced])
+                self._conn.execute("DELETE FROM file_digests WHERE checked_at < ?",
+                                   (time.time() - DIGEST_CACHE_SECONDS,))
+            known = {row[0] for row in self._conn.execute("SELECT sha256 FROM blob_objects")}
+
+            cutoff = time.time() - grace_seconds
+            for directory, is_known in [(self.tmp_dir, lambda _: False)] + [
+                (entry.path, known.__contains__) for entry in os.scandir(self.objects_dir) if entry.is_dir()
+            ]:
+                for entry in os.scandir(directory):
+                    if not entry.is_file() or is_known(entry.name):
+                        continue
+                    stat = entry.stat()
+                    if stat.st_mtime < cutoff:
+                        _remove_readonly(entry.path)
+                        result["orphans_removed"] += 1
+                        result["bytes_reclaimed"] += stat.st_size
+        if result["objects_removed"] or result["orphans_removed"]:
+            logger.info(f"Garbage collected {result['objects_removed']} objects and {result['orphans_removed']} "
+                        f"orphaned files, reclaiming {result['bytes_reclaimed'] / 1e6:.1f} MB")
+        return result
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+    def _has_object(self, sha256: str) -> bool:
+        with self._lock:
+            row = self._conn.execute("SELECT 1 FROM blob_objects WHERE sha256 = ?", (sha256,)).fetchone()
+        return row is not None and os.path.exists(self.object_path(sha256))
+
+    def _file_digest(self, file_path: str, stat: os.stat_result) -> str:
+        """SHA-256 of a source file, from the cache while its size and mtime are unchanged."""
+        key = (stat.st_dev, stat.st_ino)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT size, mtime_ns, sha256 FROM file_digests WHERE dev = ? AND ino = ?", key
+            ).fetchone()
+        if row is not None and (row[0], row[1]) == (stat.st_size, stat.st_mtime_ns):
+            sha256 = row[2]
+        else:
+            sha256 = file_sha256(file_path)
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO file_digests (dev, ino, size, mtime_ns, sha256, checked_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)", key + (stat.st_size, stat.st_mtime_ns, sha256, time.time())
+                )
+        return sha256
+
+    def _tmp_path(self) -> str:
+        return os.path.join(self.tmp_dir, uuid.uuid4().hex)
+
+    def _reference(self, name: str, sha256: str, size: int, tmp_path: Optional[str],
+                   updated_at: Optional[float] = None) -> Dict[str, Any]:
+        """Point a name at an object, moving tmp_path into place if the object is new."""
+        path = self.object_path(sha256)
+        now = time.time()
+        updated_at = now if updated_at is None else updated_at
+        with self._lock:
+            # The object file is placed under the lock so gc() cannot remove it
+            # between the existence check and the reference being recorded
+            deduplicated = os.path.exists(path)
+            if not deduplicated:
+                if tmp_path is None:
+                    raise FileNotFoundError(f"Object {sha256} disappeared before it was referenced")
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.chmod(tmp_path, 0o444)
+                os.replace(tmp_path, path)
+            with self._conn:
+                row = self._conn.execute("SELECT sha256 FROM blob_refs WHERE name = ?", (name,)).fetchone()
+                previous = row[0] if row else None
+                self._conn.execute(
+                    "INSERT OR IGNORE INTO blob_objects (sha256, size, refcount, created_at) VALUES (?, ?, 0, ?)",
+                    (sha256, size, now)
+                )
+                if previous != sha256:
+                    self._conn.execute("UPDATE blob_objects SET refcount = refcount + 1 WHERE sha256 = ?", (sha256,))
+                    if previous:
+                        self._conn.execute("UPDATE blob_objects SET refcount = refcount - 1 WHERE sha256 = ?",
+                                           (previous,))
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO blob_refs (name, sha256, size, updated_at) VALUES (?, ?, ?, ?)",
+                    (name, sha256, size, updated_at)
+                )
+        return {"name": name, "sha256": sha256, "size": size, "updated_at": updated_at, "path": path,
+                "deduplicated": deduplicated}
+
+def _remove_readonly(path: str) -> None:
+    # Objects are read-only, which Windows refuses to delete
+    os.chmod(path, 0o644)
+    os.remove(path)
@@ -0,0 +1,171 @@
+"""
+Context Budget for The Elidoras Codex.
+Packs retrieved memories into a fixed token budget per prompt type, so the
+memory context added to Airth's prompts stays the same size however many
+memories the store holds.
+"""
+import logging
+from functools import lru_cache
+from typing import Dict, Any, List, Optional, Tuple
+
+from .text_chunker import count_tokens
+
+logger = logging.getLogger("TEC.ContextBudget")
+
+class ApproxTokenizer:
+    """Tokenizer approximation (~4 characters per token) used when tiktoken is not installed."""
+
+    name = "approx"
+
+    def count(self, text: str) -> int:
+        """Approximate number of tokens in a text."""
+        return count_tokens(text) if text else 0
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """Longest prefix of a text within max_tokens."""
+        return text[:max(0, max_tokens) * 4]
+
+class TiktokenTokenizer:
+    """Exact token counts from a tiktoken encoding."""
+
+    def __init__(self, encoding):
+        """
+        Args:
+            encoding: tiktoken Encoding
+        """
+        self.encoding = encoding
+        self.name = f"tiktoken:{encoding.name}"
+
+    def count(self, text: str) -> int:
+        """Number of tokens in a text."""
+        return len(self.encoding.encode(text, disallowed_special=())) if text else 0
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """Longest prefix of a text within max_tokens."""
+        tokens = self.encoding.encode(text, disallowed_special=())
+        if len(tokens) <= max_tokens:
+            return text
+        return self.encoding.decode(tokens[:max(0, max_tokens)])
+
+@lru_cache(maxsize=None)
+def get_tokenizer(model: str = "gpt-4"):
+    """
+    Return a tokenizer for a model.
+
+    tiktoken is used when it is installed and its encoding can be loaded;
+    otherwise token counts are approximated locally.
+
+    Args:
+        model: OpenAI model name
+    """
+    try:
+        import tiktoken
+    except ImportError:
+        logger.info("tiktoken not installed, approximating token counts")
+        return ApproxTokenizer()
+    try:
+        try:
+            encoding = tiktoken.encoding_for_model(model)
+        except KeyError:
+            encoding = tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        logger.warning(f"Failed to load tiktoken encoding for {model}, approximating token counts: {e}")
+        return ApproxTokenizer()
+    return TiktokenTokenizer(encoding)
+
+def summarize(text: str, max_tokens: int, tokenizer) -> str:
+    """
+    Shorten a text to max_tokens, cutting at a sentence or word boundary.
+
+    Args:
+        text: Text to shorten
+        max_tokens: Token limit of the result
+        tokenizer: Tokenizer used to measure the text
+
+    Returns:
+        The text itself if it fits, else a prefix ending in an ellipsis
+    """
+    if tokenizer.count(text) <= max_tokens:
+        return text
+    cut = tokenizer.truncate(text, max_tokens - 1)
+    sentence_end = max(cut.rfind(". "), cut.rfind("! "), cut.rfind("? "))
+    if sentence_end >= len(cut) // 2:
+        cut = cut[:sentence_end + 1]
+    elif " " in cut:
+        cut = cut[:cut.rfind(" ")]
+    return cut.rstrip() + " …"
+
+class ContextAssembler:
+    """
+    Greedy token-budget packing of memories into prompt context.
+
+    Candidates arrive ranked by the retriever. Each memory that fits is added
+    whole. A memory that does not fit is shortened into the remaining space if
+    at least min_memory_tokens are left, and skipped otherwise (a later, shorter
+    memory may still fit).
+    """
+
+    def __init__(self, tokenizer=None, budgets: Optional[Dict[str, int]] = None,
+                 default_budget: int = 800, min_memory_tokens: int = 32):
+        """
+        Args:
+            tokenizer: Tokenizer with count() and truncate() (defaults to the gpt-4 tokenizer)
+            budgets: Token budget for the memory context, by prompt type
+            default_budget: Budget for prompt types not listed in budgets
+            min_memory_tokens: Smallest shortened memory worth including
+        """
+        self.tokenizer = tokenizer or get_tokenizer()
+        self.budgets = dict(budgets or {})
+        self.default_budget = default_budget
+        self.min_memory_tokens = min_memory_tokens
+
+    def budget(self, prompt_type: str) -> int:
+        """Token budget for a prompt type."""
+        return self.budgets.get(prompt_type, self.default_budget)
+
+    def assemble(self, memories: List[Dict[str, Any]], prompt_type: str,
+                 header: str = "Relevant memories:\n") -> Tuple[str, Dict[str, Any]]:
+        """
+        Pack memories into the budget for a prompt type.
+
+        Args:
+            memories: Candidate memories, most relevant first
+            prompt_type: Prompt type (template name) selecting the budget
+            header: Text introducing the memory list
+
+        Returns:
+            Tuple of (context text, or "" if no memory fits; packing statistics)
+        """
+        budget = self.budget(prompt_type)
+        stats = {"budget": budget, "candidates": len(memories), "included": 0, "shortened": 0, "tokens": 0}
+        remaining = budget - self.tokenizer.count(header)
+        lines = []
+        shortened = set()
+        for memory in memories:
+            if remaining < self.min_memory_tokens:
+                break
+            prefix = f"{len(lines) + 1}. {memory.get('title') or 'Untitled'}: "
+            content = str(memory.get("content") or "").strip()
+            line = prefix + content
+            cost = self.tokenizer.count(line + "\n")
+            if cost > remaining:
+                room = remaining - self.tokenizer.count(prefix) - 1
+                if room < self.min_memory_tokens:
+                    continue
+                line = prefix + summarize(content, room, self.tokenizer)
+                cost = self.tokenizer.count(line + "\n")
+                shortened.add(len(lines))
+            lines.append(line)
+            remaining -= cost
+
+        context = header + "".join(line + "\n" for line in lines)
+        # Token counts are not strictly additive across joined text; trim until the whole fits
+        while lines and self.tokenizer.count(context) > budget:
+            shortened.discard(len(lines) - 1)
+            lines.pop()
+            context = header + "".join(line + "\n" for line in lines)
+        if not lines:
+            return "", stats
+
+        stats.update(included=len(lines), shortened=len(shortened), tokens=self.tokenizer.count(context))
+        return context, stats
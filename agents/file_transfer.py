@@ -0,0 +1,145 @@
+"""
+File Transfer for The Elidoras Codex.
+Copies files with the cheapest mechanism the platform and filesystem allow:
+a hardlink (when the caller permits sharing the file), a copy-on-write clone,
+an in-kernel copy, or, as a last resort, a buffered copy through user space.
+"""
+import os
+import errno
+import shutil
+import logging
+from typing import Optional, Sequence
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+logger = logging.getLogger("TEC.FileTransfer")
+
+# ioctl request for a copy-on-write clone of a whole file (Linux: btrfs, XFS, bcachefs, ...)
+FICLONE = 0x40049409
+
+METHODS = ("hardlink", "reflink", "copy_file_range", "sendfile", "chunked")
+
+# Errors meaning "this mechanism cannot be used here", as opposed to a real I/O failure
+_UNSUPPORTED = {errno.EXDEV, errno.EINVAL, errno.ENOSYS, errno.ENOTTY, errno.EPERM,
+                getattr(errno, "EOPNOTSUPP", errno.EINVAL), getattr(errno, "ENOTSUP", errno.EINVAL)}
+
+_CHUNK_SIZE = 1 << 20
+
+def copy_file(src: str, dst: str, hardlink: bool = False, preserve_metadata: bool = False,
+              methods: Optional[Sequence[str]] = None) -> str:
+    """
+    Copy src to dst with the fastest mechanism available.
+
+    Mechanisms are tried in order (hardlink only when allowed): a hardlink when
+    both paths are on one filesystem; a copy-on-write clone (FICLONE) that
+    shares blocks until either file is modified; os.copy_file_range, which
+    copies inside the kernel and lets filesystems clone or offload the copy;
+    os.sendfile; and a buffered copy. Each falls through to the next when
+    unsupported for these files.
+
+    Args:
+        src: Source file
+        dst: Destination file (replaced if it exists)
+        hardlink: Allow dst to become a hardlink to src. Only safe when neither
+                  file will be modified in place, since both names share one inode
+        preserve_metadata: Copy permission bits and timestamps like shutil.copy2
+                           (ignored for hardlinks, which share them anyway)
+        methods: Restrict the mechanisms tried (names from METHODS)
+
+    Returns:
+        Name of the mechanism that performed the copy
+    """
+    methods = tuple(methods or METHODS)
+    if hardlink and "hardlink" in methods and _try_hardlink(src, dst):
+        return "hardlink"
+
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        src_fd, dst_fd = fsrc.fileno(), fdst.fileno()
+        size = os.fstat(src_fd).st_size
+        method = None
+        for candidate, attempt in (("reflink", _try_reflink), ("copy_file_range", _try_copy_file_range),
+                                   ("sendfile", _try_sendfile)):
+            if candidate in methods and attempt(src_fd, dst_fd, size):
+                method = candidate
+                break
+            # A mechanism may fail after copying part of the file; start over cleanly
+            os.ftruncate(dst_fd, 0)
+            os.lseek(dst_fd, 0, os.SEEK_SET)
+            os.lseek(src_fd, 0, os.SEEK_SET)
+        if method is None:
+            _chunked_copy(fsrc, fdst)
+            method = "chunked"
+
+    if preserve_metadata:
+        shutil.copystat(src, dst)
+    logger.debug(f"Copied {src} to {dst} with {method}")
+    return method
+
+def _try_hardlink(src: str, dst: str) -> bool:
+    tmp = f"{dst}.{os.getpid()}.link"
+    try:
+        os.link(src, tmp)
+    except OSError:
+        return False
+    try:
+        os.replace(tmp, dst)
+    except OSError:
+        os.remove(tmp)
+        return False
+    return True
+
+def _try_reflink(src_fd: int, dst_fd: int, size: int) -> bool:
+    if fcntl is None or not hasattr(os, "copy_file_range"):
+        # FICLONE is Linux-only; copy_file_range doubles as the platform check
+        return False
+    try:
+        fcntl.ioctl(dst_fd, FICLONE, src_fd)
+        return True
+    except OSError as e:
+        if e.errno in _UNSUPPORTED:
+            return False
+        raise
+
+def _try_copy_file_range(src_fd: int, dst_fd: int, size: int) -> bool:
+    if not hasattr(os, "copy_file_range"):
+        return False
+    offset = 0
+    try:
+        while offset < size:
+            copied = os.copy_file_range(src_fd, dst_fd, size - offset, offset, offset)
+            if copied == 0:
+                break
+            offset += copied
+    except OSError as e:
+        if e.errno in _UNSUPPORTED:
+            return False
+        raise
+    return offset == size
+
+def _try_sendfile(src_fd: int, dst_fd: int, size: int) -> bool:
+    if not hasattr(os, "sendfile"):
+        return False
+    offset = 0
+    try:
+        while offset < size:
+            sent = os.sendfile(dst_fd, src_fd, offset, min(size - offset, 1 << 30))
+            if sent == 0:
+                break
+            offset += sent
+    except OSError as e:
+        if e.errno in _UNSUPPORTED:
+            return False
+        raise
+    return offset == size
+
+def _chunked_copy(fsrc, fdst) -> None:
+    buffer = bytearray(_CHUNK_SIZE)
+    view = memoryview(buffer)
+    while True:
+        read = fsrc.readinto(buffer)
+        if not read:
+            break
+        fdst.write(view[:read])
@@ -3,13 +3,71 @@ Google Cloud Storage integration for The Elidoras Codex.
 Handles storage and retrieval of files using Google Cloud Storage.
 """
 import os
+import json
 import logging
-from typing import Dict, Any, Optional, BinaryIO
+import mimetypes
+import threading
+from typing import Dict, Any, Optional, BinaryIO, Iterable, List
 from datetime import datetime
 
-from google.cloud import storage
-from google.oauth2 import service_account
 from .base_agent import BaseAgent
+from .backup_segments import BackupIndex, SegmentedBackup
+from .gcs_transfer import BulkTransfer
+
+DEFAULT_BACKUP_INDEX_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "gcs_backups.sqlite3")
+
+class GCSSegmentBackend:
+    """
+    Backup segments as objects in a bucket.
+
+    Objects cannot be appended to, so the open segment is buffered in memory
+    and uploaded as one object when it is sealed; sealed segments are read
+    back with ranged downloads.
+    """
+
+    buffered = True
+
+    def __init__(self, bucket, prefix: str = "backups/segments/"):
+        """
+        Args:
+            bucket: google.cloud.storage Bucket
+            prefix: Object name prefix for segments
+        """
+        self.bucket = bucket
+        self.prefix = prefix
+        self.pending_records = 0
+        self._buffer = bytearray()
+        self._buffer_segment = None
+
+    def append(self, segment: str, data: bytes) -> int:
+        """Buffer data for a segment and return its offset within the segment."""
+        if self._buffer_segment != segment:
+            self.flush()
+            self._buffer_segment = segment
+        offset = len(self._buffer)
+        self._buffer += data
+        self.pending_records += 1
+        return offset
+
+    def read(self, segment: str, offset: int, length: int) -> bytes:
+        """Read a byte range of a segment, from the buffer if it is not uploaded yet."""
+        if segment == self._buffer_segment:
+            return bytes(self._buffer[offset:offset + length])
+        return self.bucket.blob(self.prefix + segment).download_as_bytes(start=offset, end=offset + length - 1)
+
+    def flush(self) -> None:
+        """Upload the buffered segment."""
+        if self._buffer_segment is None or not self._buffer:
+            return
+        content_type = "application/zstd" if self._buffer_segment.endswith(".zst") else "application/gzip"
+        self.bucket.blob(self.prefix + self._buffer_segment).upload_from_string(bytes(self._buffer),
+                                                                               content_type=content_type)
+        self._buffer = bytearray()
+        self._buffer_segment = None
+        self.pending_records = 0
+
+    def close(self) -> None:
+        """Segments are closed by flush()."""
 
 class GCPStorageAgent(BaseAgent):
     """
@@ -31,32 +89,101 @@ class GCPStorageAgent(BaseAgent):
         if not self.bucket_name:
             self.logger.warning("GCP Bucket Name not found in environment variables")
         
-        # Initialize GCP client
-        self.storage_client = None
-        self.bucket = None
-        self._initialize_client()
+        # The client library is imported and the bucket looked up on first use,
+        # so runs that never touch Cloud Storage pay for neither
+        self._storage_client = None
+        self._bucket = None
+        self._client_initialized = False
+        self._client_lock = threading.Lock()
+        
+        # Payloads up to stream_threshold_mb go up in one request from memory;
+        # larger ones are streamed through a resumable upload in chunks
+        gcp_config = self.config.get("storage", {}).get("gcp", {})
+        self.stream_threshold = int(gcp_config.get("stream_threshold_mb", 8) * 1024 * 1024)
+        # Resumable chunks must be a multiple of 256 KB
+        self.upload_chunk_size = max(1, int(gcp_config.get("upload_chunk_mb", 8) * 4)) * 256 * 1024
+        # Bulk transfers: concurrency, composite (sliced) uploads and per-file retries
+        self.transfer_config = gcp_config.get("transfer", {})
+        
+        # WordPress backups: one JSON object per backup, or compressed records
+        # in segment objects with a local index for lookups by post or task
+        self.backup_config = self.config.get("storage", {}).get("backups", {})
+        self.backup_flush_records = self.backup_config.get("flush_records", 50)
+        self._backups = None
+        self._backups_initialized = False
+    
+    @property
+    def storage_client(self):
+        """The google.cloud.storage Client, created on first use (None if that failed)."""
+        self._ensure_client()
+        return self._storage_client
+    
+    @property
+    def bucket(self):
+        """The bucket, looked up on first use (None if that failed)."""
+        self._ensure_client()
+        return self._bucket
+    
+    @property
+    def backups(self) -> Optional[SegmentedBackup]:
+        """Segmented backup store when storage.backups.format is "segments" and the bucket is available."""
+        if not self._backups_initialized:
+            with self._client_lock:
+                if not self._backups_initialized:
+                    self._backups = self._open_backups()
+                    self._backups_initialized = True
+        return self._backups
+    
+    def _ensure_client(self) -> None:
+        if self._client_initialized:
+            return
+        with self._client_lock:
+            if not self._client_initialized:
+                self._initialize_client()
+                self._client_initialized = True
     
     def _initialize_client(self) -> None:
         """Initialize the Google Cloud Storage client."""
         try:
+            # Deferred: importing the client library takes a noticeable part of startup
+            from google.cloud import storage
+            
             # Check if GOOGLE_APPLICATION_CREDENTIALS is set
             if not os.getenv('GOOGLE_APPLICATION_CREDENTIALS'):
                 self.logger.warning("GOOGLE_APPLICATION_CREDENTIALS not set. Using default authentication.")
             
             # Initialize the client
-            self.storage_client = storage.Client(project=self.project_id)
+            self._storage_client = storage.Client(project=self.project_id)
             
             # Get or create the bucket
             try:
-                self.bucket = self.storage_client.get_bucket(self.bucket_name)
+                self._bucket = self._storage_client.get_bucket(self.bucket_name)
                 self.logger.info(f"Connected to bucket: {self.bucket_name}")
             except Exception as e:
                 self.logger.error(f"Failed to get bucket: {e}")
-                self.bucket = None
+                self._bucket = None
                 
         except Exception as e:
             self.logger.error(f"Failed to initialize GCP storage client: {e}")
-            self.storage_client = None
+            self._storage_client = None
+    
+    def _open_backups(self) -> Optional[SegmentedBackup]:
+        # Called with _client_lock held, so the client is initialized directly
+        if self.backup_config.get("format", "json") != "segments":
+            return None
+        if not self._client_initialized:
+            self._initialize_client()
+            self._client_initialized = True
+        if not self._bucket:
+            return None
+        return SegmentedBackup(
+            GCSSegmentBackend(self._bucket),
+            BackupIndex(self.backup_config.get("gcs_index_path", DEFAULT_BACKUP_INDEX_PATH)),
+            codec=self.backup_config.get("compression", "gzip"),
+            level=self.backup_config.get("compression_level", 3),
+            segment_bytes=int(self.backup_config.get("segment_mb", 64) * 1024 * 1024),
+            volatile_fields=tuple(self.backup_config.get("volatile_fields", ["timestamp"]))
+        )
     
     def upload_file(self, file_path: str, destination_blob_name: Optional[str] = None) -> Dict[str, Any]:
         """
@@ -78,9 +205,10 @@ class GCPStorageAgent(BaseAgent):
             if not destination_blob_name:
                 destination_blob_name = os.path.basename(file_path)
             
-            # Create a blob and upload
+            # Create a blob and upload; the content type follows the blob name,
+            # since the source may be a content-addressed file without an extension
             blob = self.bucket.blob(destination_blob_name)
-            blob.upload_from_filename(file_path)
+            blob.upload_from_filename(file_path, content_type=mimetypes.guess_type(destination_blob_name)[0])
             
             # Generate a URL for the file
             url = f"https://storage.googleapis.com/{self.bucket_name}/{destination_blob_name}"
@@ -99,6 +227,145 @@ class GCPStorageAgent(BaseAgent):
                 "error": str(e)
             }
     
+    def upload_stream(self, chunks: Iterable[bytes], destination_blob_name: str,
+                      content_type: str = "application/octet-stream") -> Dict[str, Any]:
+        """
+        Upload data produced in chunks without staging it on disk.
+        
+        Chunks are buffered until stream_threshold bytes; if the data ends
+        first it is sent in a single request. Otherwise a resumable upload is
+        opened and the buffer and remaining chunks are written to it in
+        upload_chunk_size pieces, so memory use stays bounded. If producing
+        the data fails part way, the upload is abandoned before it is
+        finalized, so no object is created.
+        
+        Args:
+            chunks: Iterable of byte strings
+            destination_blob_name: Name of the blob in GCP
+            content_type: Content type of the object
+            
+        Returns:
+            Dictionary with upload status, URL, size and whether it was streamed
+        """
+        if not self.bucket:
+            self.logger.error("Bucket not initialized")
+            return {"success": False, "error": "Bucket not initialized"}
+        
+        try:
+            blob = self.bucket.blob(destination_blob_name)
+            chunks = iter(chunks)
+            buffer = bytearray()
+            for chunk in chunks:
+                buffer += chunk
+                if len(buffer) > self.stream_threshold:
+                    break
+            else:
+                blob.upload_from_string(bytes(buffer), content_type=content_type)
+                return self._uploaded(destination_blob_name, len(buffer), streamed=False)
+            
+            size = 0
+            with blob.open("wb", chunk_size=self.upload_chunk_size, content_type=content_type) as writer:
+                writer.write(buffer)
+                size += len(buffer)
+                del buffer
+                for chunk in chunks:
+                    writer.write(chunk)
+                    size += len(chunk)
+            return self._uploaded(destination_blob_name, size, streamed=True)
+            
+        except Exception as e:
+            self.logger.error(f"Failed to upload {destination_blob_name}: {e}")
+            return {
+                "success": False,
+                "error": str(e)
+            }
+    
+    def upload_json(self, data: Any, destination_blob_name: str, indent: Optional[int] = 2) -> Dict[str, Any]:
+        """
+        Serialize data as JSON straight into a blob.
+        
+        Args:
+            data: JSON-serializable data
+            destination_blob_name: Name of the blob in GCP
+            indent: JSON indentation (None for compact output)
+            
+        Returns:
+            Dictionary with upload status and URL
+        """
+        encoder = json.JSONEncoder(indent=indent, default=str)
+        return self.upload_stream((part.encode("utf-8") for part in encoder.iterencode(data)),
+                                  destination_blob_name, "application/json")
+    
+    def _uploaded(self, blob_name: str, size: int, streamed: bool) -> Dict[str, Any]:
+        self.logger.info(f"Uploaded {size} bytes to {blob_name}{' (streamed)' if streamed else ''}")
+        return {
+            "success": True,
+            "url": f"https://storage.googleapis.com/{self.bucket_name}/{blob_name}",
+            "blob_name": blob_name,
+            "size": size,
+            "streamed": streamed
+        }
+    
+    def upload_many(self, file_paths: List[str], destination_prefix: str = "",
+                    base_dir: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Upload many files concurrently.
+        
+        Args:
+            file_paths: Local files to upload
+            destination_prefix: Prefix for the blob names (e.g. "images/")
+            base_dir: Name blobs by their path relative to this directory
+                      (default: by file name)
+            
+        Returns:
+            Dictionary with per-file results, transferred/failed counts, bytes,
+            retries, seconds and throughput_mb_s
+        """
+        if not self.bucket:
+            self.logger.error("Bucket not initialized")
+            return {"success": False, "error": "Bucket not initialized"}
+        
+        items = []
+        for file_path in file_paths:
+            relative = os.path.relpath(file_path, base_dir) if base_dir else os.path.basename(file_path)
+            items.append((file_path, destination_prefix + relative.replace(os.sep, "/")))
+        return self.bulk_transfer().upload_many(items)
+    
+    def download_many(self, blob_names: List[str], destination_dir: str, strip_prefix: str = "") -> Dict[str, Any]:
+        """
+        Download many blobs concurrently.
+        
+        Args:
+            blob_names: Blobs to download
+            destination_dir: Directory to download into, keeping the blob paths
+            strip_prefix: Prefix removed from blob names to form local paths
+            
+        Returns:
+            Dictionary with per-file results, transferred/failed counts, bytes,
+            retries, seconds and throughput_mb_s
+        """
+        if not self.bucket:
+            self.logger.error("Bucket not initialized")
+            return {"success": False, "error": "Bucket not initialized"}
+        
+        items = []
+        for blob_name in blob_names:
+            relative = blob_name[len(strip_prefix):] if strip_prefix and blob_name.startswith(strip_prefix) else blob_name
+            items.append((blob_name, os.path.join(destination_dir, *relative.split("/"))))
+        return self.bulk_transfer().download_many(items)
+    
+    def bulk_transfer(self) -> BulkTransfer:
+        """Concurrent transfer helper for this bucket, configured from storage.gcp.transfer."""
+        config = self.transfer_config
+        return BulkTransfer(
+            self.bucket,
+            workers=config.get("workers", 8),
+            composite_threshold=int(config.get("composite_threshold_mb", 64) * 1024 * 1024),
+            composite_slices=config.get("composite_slices", 8),
+            max_attempts=config.get("max_attempts", 3),
+            base_delay=config.get("retry_base_delay", 1.0)
+        )
+    
     def download_file(self, blob_name: str, destination_file_path: str) -> Dict[str, Any]:
         """
         Download a file from GCP Storage.
@@ -140,7 +407,8 @@ class GCPStorageAgent(BaseAgent):
             prefix: Optional prefix to filter files
             
         Returns:
-            Dictionary with list of files
+            Dictionary with list of files (name, size, updated, and the base64
+            md5_hash and crc32c checksums and generation from Cloud Storage)
         """
         if not self.bucket:
             self.logger.error("Bucket not initialized")
@@ -151,7 +419,10 @@ class GCPStorageAgent(BaseAgent):
             file_list = [
                 {"name": blob.name, 
                  "size": blob.size, 
-                 "updated": blob.updated.isoformat() if blob.updated else None} 
+                 "updated": blob.updated.isoformat() if blob.updated else None,
+                 "md5_hash": blob.md5_hash,
+                 "crc32c": blob.crc32c,
+                 "generation": blob.generation} 
                 for blob in blobs
             ]
             
@@ -168,6 +439,43 @@ class GCPStorageAgent(BaseAgent):
                 "error": str(e)
             }
     
+    def delete_file(self, blob_name: str) -> Dict[str, Any]:
+        """
+        Delete a blob from GCP Storage.
+        
+        Args:
+            blob_name: Name of the blob in GCP
+            
+        Returns:
+            Dictionary with delete status
+        """
+        if not self.bucket:
+            self.logger.error("Bucket not initialized")
+            return {"success": False, "error": "Bucket not initialized"}
+        
+        from google.api_core.exceptions import NotFound
+        
+        try:
+            self.bucket.blob(blob_name).delete()
+            self.logger.info(f"Deleted blob {blob_name}")
+            return {
+                "success": True,
+                "blob_name": blob_name
+            }
+            
+        except NotFound:
+            return {
+                "success": False,
+                "error": f"File not found: {blob_name}",
+                "not_found": True
+            }
+        except Exception as e:
+            self.logger.error(f"Failed to delete blob {blob_name}: {e}")
+            return {
+                "success": False,
+                "error": str(e)
+            }
+    
     def backup_wordpress_data(self, content_data: Dict[str, Any], backup_name: Optional[str] = None) -> Dict[str, Any]:
         """
         Backup WordPress post data to GCP Storage.
@@ -180,10 +488,6 @@ class GCPStorageAgent(BaseAgent):
             Dictionary with backup status and URL
         """
         try:
-            import json
-            import tempfile
-            
-            # Create a temporary file
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             if not backup_name:
                 backup_name = f"wp_backup_{timestamp}.json"
@@ -191,18 +495,11 @@ class GCPStorageAgent(BaseAgent):
                 if not backup_name.endswith('.json'):
                     backup_name += '.json'
             
-            # Write the data to a temporary file
-            with tempfile.NamedTemporaryFile(delete=False, mode='w', suffix='.json') as temp_file:
-                json.dump(content_data, temp_file, indent=2)
-                temp_path = temp_file.name
-            
-            # Upload the file
-            result = self.upload_file(temp_path, f"backups/{backup_name}")
-            
-            # Delete the temporary file
-            os.unlink(temp_path)
+            if self.backups:
+                return self._backup_to_segment(content_data, backup_name[:-len('.json')])
             
-            return result
+            # Serialize straight into the upload; nothing is written to disk
+            return self.upload_json(content_data, f"backups/{backup_name}")
             
         except Exception as e:
             self.logger.error(f"Failed to backup WordPress data: {e}")
@@ -211,6 +508,77 @@ class GCPStorageAgent(BaseAgent):
                 "error": str(e)
             }
     
+    def _backup_to_segment(self, content_data: Dict[str, Any], backup_name: str) -> Dict[str, Any]:
+        """
+        Add a backup record to the open segment, uploading it once flush_records
+        are buffered. "buffered" in the result stays set until the record's
+        segment is uploaded by flush_backups().
+        """
+        record = self.backups.add(backup_name, content_data)
+        blob_name = f"{self.backups.backend.prefix}{record['segment']}"
+        if self.backups.backend.pending_records >= self.backup_flush_records:
+            self.backups.flush()
+        buffered = self.backups.is_buffered(record)
+        self.logger.info(f"WordPress data backed up to {blob_name} at offset {record['offset']}"
+                         f"{' (unchanged)' if record['deduplicated'] else ''}")
+        return {
+            "success": True,
+            "url": f"https://storage.googleapis.com/{self.bucket_name}/{blob_name}",
+            "blob_name": blob_name,
+            "offset": record["offset"],
+            "length": record["length"],
+            "deduplicated": record["deduplicated"],
+            "buffered": buffered
+        }
+    
+    def flush_backups(self) -> Dict[str, Any]:
+        """
+        Upload backup records still buffered in the open segment.
+        
+        Returns:
+            Dictionary with flush status
+        """
+        # Nothing can be buffered if no backup was written (and then the
+        # client need not be set up at all)
+        if not self._backups:
+            return {"success": True}
+        try:
+            self._backups.flush()
+            return {"success": True}
+        except Exception as e:
+            self.logger.error(f"Failed to flush backups: {e}")
+            return {
+                "success": False,
+                "error": str(e)
+            }
+    
+    def find_backup(self, name: Optional[str] = None, post_id: Optional[str] = None,
+                    task_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Read back the latest segmented backup by backup name, post ID or task ID.
+        
+        Args:
+            name: Backup name (without .json)
+            post_id: WordPress post ID
+            task_id: ClickUp task ID
+            
+        Returns:
+            Dictionary with the backed-up data
+        """
+        if not self.backups:
+            return {"success": False, "error": "Backups are not stored in segments"}
+        try:
+            data = self.backups.get(name=name, post_id=post_id, task_id=task_id)
+            if data is None:
+                return {"success": False, "error": "No matching backup"}
+            return {"success": True, "data": data}
+        except Exception as e:
+            self.logger.error(f"Failed to read backup: {e}")
+            return {
+                "success": False,
+                "error": str(e)
+            }
+    
     def run(self) -> Dict[str, Any]:
         """
         Run the agent's main logic.
@@ -0,0 +1,237 @@
+"""
+Bulk Transfers for Google Cloud Storage in The Elidoras Codex.
+Moves many files to and from a bucket concurrently. Small files go through a
+thread pool, one request each; large files are split into slices that are
+uploaded in parallel and composed into the final object. Every file and
+every slice is retried with exponential backoff on its own, so one failure
+does not restart the batch.
+"""
+import os
+import time
+import uuid
+import logging
+import mimetypes
+from concurrent.futures import ThreadPoolExecutor, Future, wait
+from typing import Dict, Any, List, Tuple, Callable
+
+logger = logging.getLogger("TEC.GCSTransfer")
+
+# Cloud Storage composes at most 32 objects per request
+MAX_COMPOSE_SOURCES = 32
+
+_MIN_SLICE_SIZE = 8 * 1024 * 1024
+_SLICE_ALIGNMENT = 256 * 1024
+
+def retry_call(operation: Callable[[], Any], max_attempts: int = 3, base_delay: float = 1.0,
+               max_delay: float = 30.0, description: str = "Transfer") -> Tuple[Any, int]:
+    """
+    Call operation until it succeeds or max_attempts are spent.
+
+    Args:
+        operation: Callable to run
+        max_attempts: Total attempts
+        base_delay: Delay before the first retry in seconds (doubled per attempt)
+        max_delay: Upper bound on the retry delay in seconds
+        description: Label for log messages
+
+    Returns:
+        Tuple of (result, number of retries)
+    """
+    attempt = 1
+    while True:
+        try:
+            return operation(), attempt - 1
+        except Exception as e:
+            if attempt >= max_attempts:
+                raise
+            delay = min(max_delay, base_delay * (2 ** (attempt - 1)))
+            logger.warning(f"{description} failed ({e}); retrying in {delay:.1f}s")
+            time.sleep(delay)
+            attempt += 1
+
+def slice_ranges(size: int, max_slices: int) -> List[Tuple[int, int]]:
+    """
+    Split size bytes into at most max_slices (offset, length) ranges.
+
+    Slices are at least 8 MB and aligned to 256 KB, so small files get fewer slices.
+    """
+    max_slices = max(1, min(max_slices, MAX_COMPOSE_SOURCES))
+    slice_size = max(_MIN_SLICE_SIZE, -(-size // max_slices))
+    slice_size = -(-slice_size // _SLICE_ALIGNMENT) * _SLICE_ALIGNMENT
+    return [(offset, min(slice_size, size - offset)) for offset in range(0, size, slice_size)] or [(0, 0)]
+
+class BulkTransfer:
+    """
+    Concurrent uploads and downloads against one bucket.
+
+    Files at or above composite_threshold bytes are uploaded as a parallel
+    composite upload: slices go up as temporary objects next to the
+    destination (<name>.__parts__/<id>/<n>), are composed into the
+    destination in one request and are then deleted. Composite objects have
+    a crc32c checksum but no md5Hash.
+    """
+
+    def __init__(self, bucket, workers: int = 8, composite_threshold: int = 64 * 1024 * 1024,
+                 composite_slices: int = 8, max_attempts: int = 3, base_delay: float = 1.0,
+                 max_delay: float = 30.0):
+        """
+        Args:
+            bucket: google.cloud.storage Bucket
+            workers: Concurrent requests
+            composite_threshold: File size in bytes from which uploads are sliced (0 disables)
+            composite_slices: Maximum slices per composite upload (up to 32)
+            max_attempts: Attempts per file or slice
+            base_delay: Initial retry delay in seconds (doubled per attempt)
+            max_delay: Upper bound on the retry delay in seconds
+        """
+        self.bucket = bucket
+        self.workers = max(1, workers)
+        self.composite_threshold = composite_threshold
+        self.composite_slices = composite_slices
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def upload_many(self, items: List[Tuple[str, str]]) -> Dict[str, Any]:
+        """
+        Upload files concurrently.
+
+        Small files are queued on the pool first. Large files are then sliced
+        one after another from the calling thread, with their slices fanned
+        out over the same pool, so the pool stays busy without workers
+        waiting on each other.
+
+        Args:
+            items: (local file path, blob name) pairs
+
+        Returns:
+            Summary with per-file results (including the new object generation), counts, bytes,
+            retries, seconds and throughput
+        """
+        start = time.perf_counter()
+        results: List[Dict[str, Any]] = []
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="gcs-upload") as pool:
+            futures: List[Tuple[Tuple[str, str], Future]] = []
+            large = []
+            for file_path, blob_name in items:
+                try:
+                    size = os.path.getsize(file_path)
+                except OSError as e:
+                    results.append(_failed(file_path, blob_name, e))
+                    continue
+                if self.composite_threshold and size >= self.composite_threshold:
+                    large.append((file_path, blob_name, size))
+                else:
+                    futures.append(((file_path, blob_name), pool.submit(self._upload_single, file_path, blob_name, size)))
+            for file_path, blob_name, size in large:
+                try:
+                    results.append(self._upload_composite(pool, file_path, blob_name, size))
+                except Exception as e:
+                    results.append(_failed(file_path, blob_name, e))
+            for (file_path, blob_name), future in futures:
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    results.append(_failed(file_path, blob_name, e))
+        return self._summary("upload", results, time.perf_counter() - start)
+
+    def download_many(self, items: List[Tuple[str, str]]) -> Dict[str, Any]:
+        """
+        Download blobs concurrently.
+
+        Args:
+            items: (blob name, local file path) pairs
+
+        Returns:
+            Summary with per-file results, counts, bytes, retries, seconds and throughput
+        """
+        start = time.perf_counter()
+        results: List[Dict[str, Any]] = []
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="gcs-download") as pool:
+            futures = [((file_path, blob_name), pool.submit(self._download_single, blob_name, file_path))
+                       for blob_name, file_path in items]
+            for (file_path, blob_name), future in futures:
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    results.append(_failed(file_path, blob_name, e))
+        return self._summary("download", results, time.perf_counter() - start)
+
+    def _retry(self, operation: Callable[[], Any], description: str) -> Tuple[Any, int]:
+        return retry_call(operation, self.max_attempts, self.base_delay, self.max_delay, description)
+
+    def _upload_single(self, file_path: str, blob_name: str, size: int) -> Dict[str, Any]:
+        blob = self.bucket.blob(blob_name)
+        # Guessed from the blob name: the file may be an extension-less content store object
+        blob.content_type = mimetypes.guess_type(blob_name)[0]
+        _, retries = self._retry(lambda: blob.upload_from_filename(file_path, content_type=blob.content_type),
+                                 f"Upload of {blob_name}")
+        return {"file": file_path, "blob_name": blob_name, "success": True, "bytes": size,
+                "retries": retries, "method": "single", "generation": blob.generation}
+
+    def _upload_composite(self, pool: ThreadPoolExecutor, file_path: str, blob_name: str, size: int) -> Dict[str, Any]:
+        ranges = slice_ranges(size, self.composite_slices)
+        prefix = f"{blob_name}.__parts__/{uuid.uuid4().hex}/"
+        parts = [self.bucket.blob(f"{prefix}{index:02d}") for index in range(len(ranges))]
+        retries = 0
+        try:
+            futures = [pool.submit(self._retry, _slice_uploader(part, file_path, offset, length),
+                                   f"Upload of {part.name}")
+                       for part, (offset, length) in zip(parts, ranges)]
+            wait(futures)
+            retries += sum(future.result()[1] for future in futures)
+
+            destination = self.bucket.blob(blob_name)
+            destination.content_type = mimetypes.guess_type(blob_name)[0] or "application/octet-stream"
+            _, compose_retries = self._retry(lambda: destination.compose(parts), f"Compose of {blob_name}")
+            retries += compose_retries
+        finally:
+            for part in parts:
+                try:
+                    part.delete()
+                except Exception:
+                    # A slice that was never uploaded, or a failed delete; parts
+                    # left behind can be removed by a lifecycle rule on __parts__
+                    pass
+        logger.debug(f"Uploaded {blob_name} as {len(parts)} composed slices")
+        return {"file": file_path, "blob_name": blob_name, "success": True, "bytes": size,
+                "retries": retries, "method": "composite", "slices": len(parts),
+                "generation": destination.generation}
+
+    def _download_single(self, blob_name: str, file_path: str) -> Dict[str, Any]:
+        directory = os.path.dirname(file_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        blob = self.bucket.blob(blob_name)
+        _, retries = self._retry(lambda: blob.download_to_filename(file_path), f"Download of {blob_name}")
+        return {"file": file_path, "blob_name": blob_name, "success": True,
+                "bytes": os.path.getsize(file_path), "retries": retries, "method": "single"}
+
+    def _summary(self, direction: str, results: List[Dict[str, Any]], seconds: float) -> Dict[str, Any]:
+        succeeded = [result for result in results if result["success"]]
+        total = sum(result["bytes"] for result in succeeded)
+        summary = {
+            "success": len(succeeded) == len(results),
+            "files": results,
+            "transferred": len(succeeded),
+            "failed": len(results) - len(succeeded),
+            "bytes": total,
+            "retries": sum(result.get("retries", 0) for result in results),
+            "seconds": seconds,
+            "throughput_mb_s": total / 1e6 / seconds if seconds > 0 else 0.0
+        }
+        logger.info(f"Bulk {direction}: {summary['transferred']} files, {total / 1e6:.1f} MB in {seconds:.2f}s "
+                    f"({summary['throughput_mb_s']:.1f} MB/s), {summary['failed']} failed, "
+                    f"{summary['retries']} retries")
+        return summary
+
+def _slice_uploader(part, file_path: str, offset: int, length: int) -> Callable[[], None]:
+    def upload() -> None:
+        with open(file_path, "rb") as f:
+            f.seek(offset)
+            part.upload_from_file(f, size=length, rewind=False)
+    return upload
+
+def _failed(file_path: str, blob_name: str, error: Exception) -> Dict[str, Any]:
+    logger.error(f"Transfer of {file_path} <-> {blob_name} failed: {error}")
+    return {"file": file_path, "blob_name": blob_name, "success": False, "bytes": 0, "error": str(error)}
@@ -0,0 +1,175 @@
+"""
+Ingest Manifest for The Elidoras Codex.
+Records which source files and text chunks have already been turned into
+memories, so re-running memory ingestion skips unchanged work and a crashed
+run resumes where it stopped.
+"""
+import os
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from typing import Dict, Any, List, Optional, Iterable, Tuple
+
+logger = logging.getLogger("TEC.IngestManifest")
+
+DEFAULT_MANIFEST_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "ingest_manifest.sqlite3")
+
+def file_sha256(path: str, block_size: int = 1 << 20) -> str:
+    """Hex SHA-256 of a file, read in blocks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def chunk_sha256(chunk: str) -> str:
+    """Hex SHA-256 of a text chunk."""
+    return hashlib.sha256(chunk.encode("utf-8")).hexdigest()
+
+class IngestManifest:
+    """
+    SQLite manifest of ingested files and chunks.
+
+    A file is "done" once every one of its chunks has been stored; until then
+    it stays "in_progress" and is re-read on the next run, where chunks that
+    were already stored (in this or any other file) are skipped by hash. A
+    done file whose size and mtime are unchanged is skipped without reading it.
+    """
+
+    def __init__(self, db_path: Optional[str] = None):
+        """
+        Open (or create) the manifest.
+
+        Args:
+            db_path: Path to the SQLite file (defaults to data/ingest_manifest.sqlite3)
+        """
+        self.db_path = db_path or DEFAULT_MANIFEST_PATH
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS ingest_files (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime REAL NOT NULL,
+                sha256 TEXT NOT NULL,
+                status TEXT NOT NULL,
+                chunks INTEGER NOT NULL DEFAULT 0,
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS ingest_chunks (
+                chunk_hash TEXT PRIMARY KEY,
+                file_path TEXT NOT NULL,
+                memory_id TEXT NOT NULL,
+                stored_at REAL NOT NULL
+            ) WITHOUT ROWID;
+            """
+        )
+        self._conn.commit()
+
+    def is_unchanged(self, path: str) -> bool:
+        """Whether a file was fully ingested and its size and mtime have not changed since."""
+        stat = os.stat(path)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT size, mtime, status FROM ingest_files WHERE path = ?", (_key(path),)
+            ).fetchone()
+        return row is not None and row[2] == "done" and row[0] == stat.st_size and row[1] == stat.st_mtime
+
+    def is_file_done(self, path: str, sha256: str) -> bool:
+        """
+        Whether a file with this content was fully ingested.
+
+        A match refreshes the recorded size and mtime, so the next run can skip
+        the file with is_unchanged() alone.
+        """
+        stat = os.stat(path)
+        with self._lock:
+            with self._conn:
+                cursor = self._conn.execute(
+                    "UPDATE ingest_files SET size = ?, mtime = ?, updated_at = ? "
+                    "WHERE path = ? AND sha256 = ? AND status = 'done'",
+                    (stat.st_size, stat.st_mtime, time.time(), _key(path), sha256)
+                )
+        return bool(cursor.rowcount)
+
+    def start_file(self, path: str, sha256: str, chunks: int = 0, size: Optional[int] = None,
+                   mtime: Optional[float] = None) -> None:
+        """Record that a file is being ingested."""
+        if size is None or mtime is None:
+            stat = os.stat(path)
+            size, mtime = stat.st_size, stat.st_mtime
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO ingest_files (path, size, mtime, sha256, status, chunks, updated_at) "
+                    "VALUES (?, ?, ?, ?, 'in_progress', ?, ?)",
+                    (_key(path), size, mtime, sha256, chunks, time.time())
+                )
+
+    def finish_file(self, path: str, chunks: Optional[int] = None) -> None:
+        """Mark a file as fully ingested, optionally recording its final chunk count."""
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    "UPDATE ingest_files SET status = 'done', chunks = COALESCE(?, chunks), updated_at = ? "
+                    "WHERE path = ?",
+                    (chunks, time.time(), _key(path))
+                )
+
+    def stored_chunks(self, chunk_hashes: Iterable[str]) -> set:
+        """Return the subset of chunk hashes that were already stored."""
+        chunk_hashes = list(chunk_hashes)
+        found = set()
+        with self._lock:
+            for start in range(0, len(chunk_hashes), 500):
+                batch = chunk_hashes[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                found.update(row[0] for row in self._conn.execute(
+                    f"SELECT chunk_hash FROM ingest_chunks WHERE chunk_hash IN ({placeholders})", batch
+                ))
+        return found
+
+    def checkpoint(self, entries: List[Tuple[str, str, str]]) -> None:
+        """
+        Record stored chunks in one transaction.
+
+        Args:
+            entries: (chunk_hash, file_path, memory_id) for each stored chunk
+        """
+        now = time.time()
+        with self._lock:
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO ingest_chunks (chunk_hash, file_path, memory_id, stored_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    [(chunk_hash, _key(path), memory_id, now) for chunk_hash, path, memory_id in entries]
+                )
+
+    def summary(self) -> Dict[str, Any]:
+        """Counts of files by status and of stored chunks."""
+        with self._lock:
+            files = dict(self._conn.execute("SELECT status, COUNT(*) FROM ingest_files GROUP BY status").fetchall())
+            chunks = self._conn.execute("SELECT COUNT(*) FROM ingest_chunks").fetchone()[0]
+        return {"files": files, "chunks": chunks}
+
+    def reset(self) -> None:
+        """Forget everything that was ingested."""
+        with self._lock:
+            with self._conn:
+                self._conn.execute("DELETE FROM ingest_files")
+                self._conn.execute("DELETE FROM ingest_chunks")
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+def _key(path: str) -> str:
+    return os.path.abspath(path)
@@ -0,0 +1,315 @@
+"""
+LLM Response Cache for The Elidoras Codex.
+Persists completions keyed on model, sampling settings and prompt hash so that
+repeated prompts (title generation for the same topic, re-runs of the pipeline)
+are answered locally instead of paying for another API call.
+"""
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger("TEC.LLMCache")
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "llm_cache.sqlite3")
+
+class LLMResponseCache:
+    """
+    Persistent, size-bounded cache of LLM responses.
+
+    Entries expire after ttl_seconds and the least recently used entries are
+    evicted once the cache holds more than max_entries. Calls with a temperature
+    above max_temperature are non-deterministic and bypass the cache unless the
+    caller forces caching.
+    """
+
+    def __init__(self, db_path: Optional[str] = None, ttl_seconds: Optional[float] = 7 * 24 * 3600,
+                 max_entries: int = 10000, max_temperature: float = 0.0):
+        """
+        Open (or create) the cache database.
+
+        Args:
+            db_path: Path to the SQLite file (defaults to data/llm_cache.sqlite3)
+            ttl_seconds: Lifetime of an entry in seconds (None keeps entries until evicted)
+            max_entries: Maximum number of cached responses
+            max_temperature: Highest temperature that is cached without forcing
+        """
+        self.db_path = db_path or DEFAULT_CACHE_PATH
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_temperature = max_temperature
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                temperature REAL NOT NULL,
+                max_tokens INTEGER NOT NULL,
+                response TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_accessed REAL NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 0
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_lru ON llm_cache (last_accessed)")
+        self._conn.commit()
+        self._entries = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+
+        self.stats = {"hits": 0, "misses": 0, "bypassed": 0, "stores": 0, "expired": 0, "evictions": 0}
+
+    @staticmethod
+    def make_key(model: str, prompt: str, temperature: float, max_tokens: int) -> str:
+        """
+        Build the cache key for a request.
+
+        Args:
+            model: Model or engine name
+            prompt: Fully rendered prompt
+            temperature: Sampling temperature
+            max_tokens: Maximum tokens in the response
+
+        Returns:
+            Hex digest identifying the request
+        """
+        prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        return hashlib.sha256(f"{model}\x00{temperature:.4f}\x00{max_tokens}\x00{prompt_hash}".encode()).hexdigest()
+
+    def is_cacheable(self, temperature: float, force: bool = False) -> bool:
+        """Whether a request with this temperature may be served from the cache."""
+        return force or temperature <= self.max_temperature
+
+    def contains(self, model: str, prompt: str, temperature: float, max_tokens: int,
+                 force: bool = False) -> bool:
+        """
+        Whether get() would return a response, without counting a hit or miss.
+
+        Args:
+            model: Model or engine name
+            prompt: Fully rendered prompt
+            temperature: Sampling temperature
+            max_tokens: Maximum tokens in the response
+            force: Use the cache even for non-deterministic settings
+
+        Returns:
+            True if an unexpired response is cached
+        """
+        if not self.is_cacheable(temperature, force):
+            return False
+        key = self.make_key(model, prompt, temperature, max_tokens)
+        with self._lock:
+            row = self._conn.execute("SELECT created_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return False
+        return self.ttl_seconds is None or time.time() - row[0] <= self.ttl_seconds
+
+    def get(self, model: str, prompt: str, temperature: float, max_tokens: int,
+            force: bool = False) -> Optional[str]:
+        """
+        Look up a cached response.
+
+        Args:
+            model: Model or engine name
+            prompt: Fully rendered prompt
+            temperature: Sampling temperature
+            max_tokens: Maximum tokens in the response
+            force: Use the cache even for non-deterministic settings
+
+        Returns:
+            The cached response, or None on a miss or bypass
+        """
+        if not self.is_cacheable(temperature, force):
+            self._count("bypassed")
+            return None
+
+        key = self.make_key(model, prompt, temperature, max_tokens)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.stats["misses"] += 1
+                return None
+            response, created_at = row
+            if self.ttl_seconds is not None and now - created_at > self.ttl_seconds:
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                self._entries -= 1
+                self.stats["expired"] += 1
+                self.stats["misses"] += 1
+                return None
+            self._conn.execute(
+                "UPDATE llm_cache SET last_accessed = ?, hits = hits + 1 WHERE key = ?", (now, key)
+            )
+            self._conn.commit()
+            self.stats["hits"] += 1
+        return response
+
+    def set(self, model: str, prompt: str, temperature: float, max_tokens: int, response: str,
+            force: bool = False) -> bool:
+        """
+        Store a response.
+
+        Args:
+            model: Model or engine name
+            prompt: Fully rendered prompt
+            temperature: Sampling temperature
+            max_tokens: Maximum tokens in the response
+            response: Generated text to cache
+            force: Cache even for non-deterministic settings
+
+        Returns:
+            True if the response was stored
+        """
+        if not self.is_cacheable(temperature, force):
+            return False
+
+        key = self.make_key(model, prompt, temperature, max_tokens)
+        now = time.time()
+        with self._lock:
+            exists = self._conn.execute("SELECT 1 FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if exists:
+                self._conn.execute(
+                    "UPDATE llm_cache SET response = ?, created_at = ?, last_accessed = ? WHERE key = ?",
+                    (response, now, now, key)
+                )
+            else:
+                self._conn.execute(
+                    "INSERT INTO llm_cache "
+                    "(key, model, temperature, max_tokens, response, created_at, last_accessed) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (key, model, temperature, max_tokens, response, now, now)
+                )
+                self._entries += 1
+            self.stats["stores"] += 1
+            if self._entries > self.max_entries:
+                self._evict()
+            self._conn.commit()
+        return True
+
+    def _evict(self) -> None:
+        # Trim a little below the limit so eviction does not run on every insert
+        target = int(self.max_entries * 0.9)
+        excess = self._entries - target
+        if excess <= 0:
+            return
+        cursor = self._conn.execute(
+            "DELETE FROM llm_cache WHERE key IN "
+            "(SELECT key FROM llm_cache ORDER BY last_accessed LIMIT ?)",
+            (excess,)
+        )
+        self._entries -= cursor.rowcount
+        self.stats["evictions"] += cursor.rowcount
+        logger.info(f"Evicted {cursor.rowcount} least recently used LLM responses")
+
+    def purge_expired(self) -> int:
+        """
+        Delete every expired entry.
+
+        Returns:
+            Number of entries removed
+        """
+        if self.ttl_seconds is None:
+            return 0
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM llm_cache WHERE created_at < ?", (time.time() - self.ttl_seconds,)
+            )
+            self._conn.commit()
+            self._entries -= cursor.rowcount
+            self.stats["expired"] += cursor.rowcount
+            return cursor.rowcount
+
+    def clear(self) -> None:
+        """Remove all cached responses."""
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+            self._conn.commit()
+            self._entries = 0
+
+    def metrics(self) -> Dict[str, Any]:
+        """
+        Report cache effectiveness.
+
+        Returns:
+            Dictionary with hit/miss/bypass counts, hit rate and current size
+        """
+        with self._lock:
+            stats = dict(self.stats)
+            entries = self._entries
+        lookups = stats["hits"] + stats["misses"]
+        stats["entries"] = entries
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+    def export_metrics(self, path: str) -> Dict[str, Any]:
+        """
+        Write the current metrics to a JSON file.
+
+        Args:
+            path: Destination file
+
+        Returns:
+            The exported metrics
+        """
+        metrics = self.metrics()
+        metrics["exported_at"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(metrics, f, indent=2)
+        return metrics
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self.stats[key] += 1
+
+_shared_caches: Dict[str, LLMResponseCache] = {}
+_shared_lock = threading.Lock()
+
+def get_llm_cache(config: Optional[Dict[str, Any]] = None, root_dir: Optional[str] = None) -> Optional[LLMResponseCache]:
+    """
+    Return the process-wide cache described by the llm_cache config section.
+
+    Agents constructed with the same settings share one cache (and one set of
+    metrics). Returns None when caching is disabled.
+
+    Args:
+        config: The llm_cache section of config.yaml
+        root_dir: Directory that relative cache paths are resolved against
+    """
+    config = config or {}
+    if not config.get("enabled", True):
+        return None
+
+    path = config.get("path") or DEFAULT_CACHE_PATH
+    if not os.path.isabs(path):
+        path = os.path.join(root_dir or os.path.dirname(os.path.dirname(__file__)), path)
+    path = os.path.abspath(path)
+
+    with _shared_lock:
+        cache = _shared_caches.get(path)
+        if cache is None:
+            cache = LLMResponseCache(
+                path,
+                ttl_seconds=config.get("ttl_seconds", 7 * 24 * 3600),
+                max_entries=config.get("max_entries", 10000),
+                max_temperature=config.get("max_temperature", 0.0)
+            )
+            _shared_caches[path] = cache
+        return cache
@@ -0,0 +1,229 @@
+"""
+Concurrent LLM Executor for The Elidoras Codex.
+Runs independent prompts in parallel on a shared thread pool while keeping the
+whole process inside the provider's requests-per-minute and tokens-per-minute limits.
+"""
+import time
+import logging
+import threading
+from typing import Dict, Any, List, Optional, Callable, Iterable, TypeVar
+from concurrent.futures import ThreadPoolExecutor, Future
+
+logger = logging.getLogger("TEC.LLMExecutor")
+
+T = TypeVar("T")
+
+def estimate_tokens(text: str, max_tokens: int = 0) -> int:
+    """
+    Rough token cost of a completion request.
+
+    Uses the common ~4 characters per token approximation for the prompt and
+    assumes the full completion budget is spent.
+
+    Args:
+        text: Prompt text
+        max_tokens: Maximum tokens requested for the completion
+
+    Returns:
+        Estimated total tokens
+    """
+    return len(text) // 4 + 1 + max_tokens
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at capacity per minute."""
+
+    def __init__(self, per_minute: float):
+        """
+        Args:
+            per_minute: Capacity of the bucket, refilled over one minute (0 disables the limit)
+        """
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self._available = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, amount: float = 1.0) -> float:
+        """
+        Block until amount can be taken from the bucket.
+
+        Requests larger than the whole bucket are clamped to its capacity so they
+        wait for a full refill instead of blocking forever.
+
+        Args:
+            amount: Units to take
+
+        Returns:
+            Seconds spent waiting
+        """
+        if self.capacity <= 0:
+            return 0.0
+        amount = min(float(amount), self.capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._available = min(self.capacity, self._available + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._available >= amount:
+                    self._available -= amount
+                    return waited
+                delay = (amount - self._available) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+class LLMExecutor:
+    """
+    Thread pool for LLM calls with request and token rate limits.
+
+    Every submitted call first takes one request and its estimated tokens from
+    the shared budgets, then runs on the pool. Use map() to fan a batch of
+    independent prompts out and collect the results in order. Calls submitted
+    from one of the pool's own workers run inline on that worker, so code
+    that waits on its futures cannot deadlock the pool.
+    """
+
+    def __init__(self, max_workers: int = 4, requests_per_minute: float = 60,
+                 tokens_per_minute: float = 90000):
+        """
+        Configure the executor.
+
+        Args:
+            max_workers: Maximum concurrent LLM calls
+            requests_per_minute: Request budget (0 disables the limit)
+            tokens_per_minute: Token budget (0 disables the limit)
+        """
+        self.max_workers = max(1, max_workers)
+        self.request_bucket = TokenBucket(requests_per_minute)
+        self.token_bucket = TokenBucket(tokens_per_minute)
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="llm")
+        self._worker = threading.local()
+        self._stats_lock = threading.Lock()
+        self.stats = {"submitted": 0, "completed": 0, "failed": 0, "tokens": 0, "throttled_seconds": 0.0}
+
+    def submit(self, fn: Callable[..., T], *args, estimated_tokens: int = 0, **kwargs) -> "Future[T]":
+        """
+        Schedule an LLM call.
+
+        Args:
+            fn: Callable that performs the request
+            *args: Positional arguments for fn
+            estimated_tokens: Tokens to charge against the per-minute budget
+            **kwargs: Keyword arguments for fn
+
+        Returns:
+            Future resolving to fn's return value
+        """
+        with self._stats_lock:
+            self.stats["submitted"] += 1
+        if getattr(self._worker, "active", False):
+            # Waiting for a free worker from inside the pool could block forever
+            future: Future = Future()
+            try:
+                future.set_result(self._run(fn, args, kwargs, estimated_tokens))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+        return self._pool.submit(self._run_on_worker, fn, args, kwargs, estimated_tokens)
+
+    def map(self, fn: Callable[[Any], T], items: Iterable[Any],
+            estimate: Optional[Callable[[Any], int]] = None,
+            return_exceptions: bool = False) -> List[Any]:
+        """
+        Apply fn to every item concurrently and return the results in order.
+
+        Args:
+            fn: Callable taking one item
+            items: Items to process
+            estimate: Callable returning the token estimate for an item
+            return_exceptions: Put raised exceptions in the result list instead of re-raising
+
+        Returns:
+            List of results (or exceptions) in the same order as items
+        """
+        futures = [
+            self.submit(fn, item, estimated_tokens=estimate(item) if estimate else 0)
+            for item in items
+        ]
+        results = []
+        for future in futures:
+            try:
+                results.append(future.result())
+            except Exception as e:
+                if not return_exceptions:
+                    raise
+                results.append(e)
+        return results
+
+    def acquire(self, estimated_tokens: int = 0) -> float:
+        """
+        Charge one request and its tokens to the budgets without using a worker.
+
+        For calls made directly on a thread that already holds a worker slot,
+        where submitting and waiting could deadlock the pool.
+
+        Args:
+            estimated_tokens: Tokens to charge against the per-minute budget
+
+        Returns:
+            Seconds spent waiting
+        """
+        throttled = self.request_bucket.acquire(1)
+        throttled += self.token_bucket.acquire(estimated_tokens) if estimated_tokens else 0.0
+        with self._stats_lock:
+            self.stats["tokens"] += estimated_tokens
+            self.stats["throttled_seconds"] += throttled
+        return throttled
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop accepting work and optionally wait for running calls."""
+        self._pool.shutdown(wait=wait)
+
+    def _run_on_worker(self, fn: Callable[..., T], args: tuple, kwargs: Dict[str, Any], estimated_tokens: int) -> T:
+        self._worker.active = True
+        try:
+            return self._run(fn, args, kwargs, estimated_tokens)
+        finally:
+            self._worker.active = False
+
+    def _run(self, fn: Callable[..., T], args: tuple, kwargs: Dict[str, Any], estimated_tokens: int) -> T:
+        throttled = self.request_bucket.acquire(1)
+        throttled += self.token_bucket.acquire(estimated_tokens) if estimated_tokens else 0.0
+        if throttled:
+            logger.debug(f"LLM call throttled for {throttled:.2f}s by rate limits")
+        try:
+            result = fn(*args, **kwargs)
+        except Exception:
+            with self._stats_lock:
+                self.stats["failed"] += 1
+                self.stats["throttled_seconds"] += throttled
+            raise
+        with self._stats_lock:
+            self.stats["completed"] += 1
+            self.stats["tokens"] += estimated_tokens
+            self.stats["throttled_seconds"] += throttled
+        return result
+
+_shared_executor: Optional[LLMExecutor] = None
+_shared_lock = threading.Lock()
+
+def get_llm_executor(config: Optional[Dict[str, Any]] = None) -> LLMExecutor:
+    """
+    Return the process-wide LLM executor.
+
+    The budgets are per API key, so every agent in the process shares one
+    executor; it is created from the llm_executor config section on first use.
+
+    Args:
+        config: The llm_executor section of config.yaml
+    """
+    global _shared_executor
+    with _shared_lock:
+        if _shared_executor is None:
+            config = config or {}
+            _shared_executor = LLMExecutor(
+                max_workers=config.get("max_workers", 4),
+                requests_per_minute=config.get("requests_per_minute", 60),
+                tokens_per_minute=config.get("tokens_per_minute", 90000)
+            )
+        return _shared_executor
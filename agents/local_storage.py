@@ -3,13 +3,21 @@ Local Storage integration for The Elidoras Codex.
 Handles storage and retrieval of files using local file system instead of cloud services.
 """
 import os
+import time
 import logging
-from typing import Dict, Any, Optional, BinaryIO
+import itertools
+from typing import Dict, Any, Optional, BinaryIO, List, Tuple
 from datetime import datetime
 import json
-import shutil
 
 from .base_agent import BaseAgent
+from .blob_store import ContentAddressedStore, normalize_name
+from .backup_segments import BackupIndex, LocalSegmentBackend, SegmentedBackup
+from .file_transfer import copy_file
+from .storage_index import StorageIndex, scan_tree
+
+# Blob name prefix of the WordPress backup segments
+SEGMENTS_PREFIX = "backups/segments/"
 
 class LocalStorageAgent(BaseAgent):
     """
@@ -28,7 +36,38 @@ class LocalStorageAgent(BaseAgent):
         os.makedirs(self.storage_dir, exist_ok=True)
         os.makedirs(os.path.join(self.storage_dir, "backups"), exist_ok=True)
         
-        self.logger.info(f"Local storage initialized at: {self.storage_dir}")
+        # With the content layout, files are kept once per distinct content and
+        # blob names are references; the files layout keeps one copy per name
+        local_config = self.config.get("storage", {}).get("local", {})
+        self.layout = local_config.get("layout", "files")
+        self.blob_store = ContentAddressedStore(self.storage_dir) if self.layout == "content" else None
+        # Hardlinks make a stored file and its source one file on disk, so
+        # they are opt-in and only used by the files layout
+        self.hardlinks = local_config.get("hardlinks", False) and not self.blob_store
+        
+        # Metadata index answering listings and totals without walking the tree;
+        # reconciled with the tree when new and then every reconcile_interval seconds
+        self.index = StorageIndex(os.path.join(self.storage_dir, ".index.sqlite3"))
+        reconcile_interval = local_config.get("reconcile_interval", 86400)
+        last_reconciled = self.index.last_reconciled()
+        if last_reconciled is None or (reconcile_interval and time.time() - last_reconciled > reconcile_interval):
+            self.reconcile_index()
+        
+        # WordPress backups: one JSON file per backup, or compressed records in
+        # rolling segment files with an index for lookups by post or task
+        backup_config = self.config.get("storage", {}).get("backups", {})
+        self.backups = None
+        if backup_config.get("format", "json") == "segments":
+            self.backups = SegmentedBackup(
+                LocalSegmentBackend(os.path.join(self.storage_dir, "backups", "segments")),
+                BackupIndex(os.path.join(self.storage_dir, ".backups.sqlite3")),
+                codec=backup_config.get("compression", "gzip"),
+                level=backup_config.get("compression_level", 3),
+                segment_bytes=int(backup_config.get("segment_mb", 64) * 1024 * 1024),
+                volatile_fields=tuple(backup_config.get("volatile_fields", ["timestamp"]))
+            )
+        
+        self.logger.info(f"Local storage initialized at: {self.storage_dir} ({self.layout} layout)")
     
     def upload_file(self, file_path: str, destination_blob_name: Optional[str] = None) -> Dict[str, Any]:
         """
@@ -46,20 +85,36 @@ class LocalStorageAgent(BaseAgent):
             if not destination_blob_name:
                 destination_blob_name = os.path.basename(file_path)
             
+            if self.blob_store:
+                blob = self.blob_store.put_file(file_path, destination_blob_name)
+                self.index.upsert(blob["name"], blob["size"], blob["updated_at"])
+                self.logger.info(f"File {file_path} stored as {blob['name']} "
+                                 f"({'existing content' if blob['deduplicated'] else 'new content'} {blob['sha256'][:12]})")
+                return {
+                    "success": True,
+                    "path": blob["path"],
+                    "blob_name": blob["name"],
+                    "sha256": blob["sha256"],
+                    "deduplicated": blob["deduplicated"],
+                    "transfer": blob["transfer"]
+                }
+            
             # Destination path
             destination_path = os.path.join(self.storage_dir, destination_blob_name)
             
             # Create directories if they don't exist
             os.makedirs(os.path.dirname(destination_path), exist_ok=True)
             
-            # Copy the file
-            shutil.copy2(file_path, destination_path)
+            # Copy the file (cloned or copied in the kernel where the filesystem allows)
+            transfer = copy_file(file_path, destination_path, hardlink=self.hardlinks, preserve_metadata=True)
+            self._index_file(destination_blob_name, destination_path)
             
-            self.logger.info(f"File {file_path} copied to {destination_path}")
+            self.logger.info(f"File {file_path} copied to {destination_path} ({transfer})")
             return {
                 "success": True,
                 "path": destination_path,
-                "blob_name": destination_blob_name
+                "blob_name": destination_blob_name,
+                "transfer": transfer
             }
             
         except Exception as e:
@@ -87,10 +142,21 @@ class LocalStorageAgent(BaseAgent):
             # Create destination directory if it doesn't exist
             os.makedirs(os.path.dirname(destination_file_path), exist_ok=True)
             
-            # Copy the file
-            shutil.copy2(source_path, destination_file_path)
+            # Files stored before the content layout was enabled are still plain files
+            if self.blob_store and self.blob_store.resolve(blob_name):
+                blob = self.blob_store.get_file(blob_name, destination_file_path)
+                self.index.touch(blob["name"])
+                self.logger.info(f"Blob {blob['name']} copied to {destination_file_path} ({blob['transfer']})")
+                return {
+                    "success": True,
+                    "file_path": destination_file_path
+                }
+            
+            # Copy the file (cloned or copied in the kernel where the filesystem allows)
+            transfer = copy_file(source_path, destination_file_path, hardlink=self.hardlinks, preserve_metadata=True)
+            self.index.touch(normalize_name(blob_name))
             
-            self.logger.info(f"File {source_path} copied to {destination_file_path}")
+            self.logger.info(f"File {source_path} copied to {destination_file_path} ({transfer})")
             return {
                 "success": True,
                 "file_path": destination_file_path
@@ -103,34 +169,49 @@ class LocalStorageAgent(BaseAgent):
                 "error": str(e)
             }
     
-    def list_files(self, prefix: Optional[str] = None) -> Dict[str, Any]:
+    def local_path(self, blob_name: str) -> Optional[str]:
+        """
+        Path of the file holding a stored blob, or None if it is not stored.
+        
+        With the content layout the file is shared by every name with the same
+        content, so it must only be read.
+        
+        Args:
+            blob_name: Name of the file in storage
+            
+        Returns:
+            Path on disk, or None
+        """
+        if self.blob_store:
+            blob = self.blob_store.resolve(blob_name)
+            if blob:
+                return blob["path"]
+        path = os.path.join(self.storage_dir, blob_name)
+        return path if os.path.isfile(path) else None
+    
+    def list_files(self, prefix: Optional[str] = None, updated_since: Optional[float] = None) -> Dict[str, Any]:
         """
         List files in local storage.
         
+        Answered from the metadata index; files changed outside the agent
+        appear after the next reconcile_index().
+        
         Args:
             prefix: Optional prefix to filter files
+            updated_since: Optional timestamp; only files modified at or after it are listed
             
         Returns:
             Dictionary with list of files
         """
         try:
-            file_list = []
-            
-            for root, _, files in os.walk(self.storage_dir):
-                for filename in files:
-                    full_path = os.path.join(root, filename)
-                    rel_path = os.path.relpath(full_path, self.storage_dir)
-                    
-                    # Apply prefix filter if specified
-                    if prefix and not rel_path.startswith(prefix):
-                        continue
-                    
-                    file_stats = os.stat(full_path)
-                    file_list.append({
-                        "name": rel_path,
-                        "size": file_stats.st_size,
-                        "updated": datetime.fromtimestamp(file_stats.st_mtime).isoformat()
-                    })
+            file_list = [
+                {
+                    "name": entry["name"],
+                    "size": entry["size"],
+                    "updated": datetime.fromtimestamp(entry["mtime"]).isoformat()
+                }
+                for entry in self.index.list(prefix, updated_since)
+            ]
             
             self.logger.info(f"Listed {len(file_list)} files in local storage")
             return {
@@ -145,6 +226,124 @@ class LocalStorageAgent(BaseAgent):
                 "error": str(e)
             }
     
+    def storage_summary(self, prefix: Optional[str] = None, updated_since: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Count and total size of stored files, from the metadata index.
+        
+        Args:
+            prefix: Optional prefix to filter files
+            updated_since: Optional timestamp; only files modified at or after it are counted
+            
+        Returns:
+            Dictionary with files and bytes
+        """
+        try:
+            return {"success": True, **self.index.totals(prefix, updated_since)}
+        except Exception as e:
+            self.logger.error(f"Failed to summarize storage: {e}")
+            return {
+                "success": False,
+                "error": str(e)
+            }
+    
+    def reconcile_index(self) -> Dict[str, Any]:
+        """
+        Rebuild the metadata index from the storage tree and the content store.
+        
+        Picks up files added, changed or removed behind the agent's back.
+        
+        Returns:
+            Dictionary with added, updated and removed counts
+        """
+        try:
+            entries = scan_tree(self.storage_dir)
+            if self.blob_store:
+                blobs = ((blob["name"], blob["size"], blob["updated_at"]) for blob in self.blob_store.list())
+                entries = itertools.chain(entries, blobs)
+            return {"success": True, **self.index.reconcile(entries)}
+        except Exception as e:
+            self.logger.error(f"Failed to reconcile storage index: {e}")
+            return {
+                "success": False,
+                "error": str(e)
+            }
+    
+    def delete_file(self, blob_name: str) -> Dict[str, Any]:
+        """
+        Delete a file from local storage.
+        
+        With the content layout the stored content is freed by collect_garbage()
+        once no other name refers to it.
+        
+        Args:
+            blob_name: Name of the file in storage
+            
+        Returns:
+            Dictionary with delete status
+        """
+        try:
+            if self.backups and normalize_name(blob_name).startswith(SEGMENTS_PREFIX):
+                # Keep the backup index from pointing into a removed segment
+                self.backups.forget_segment(normalize_name(blob_name)[len(SEGMENTS_PREFIX):])
+            deleted = bool(self.blob_store and self.blob_store.delete(blob_name))
+            file_path = os.path.join(self.storage_dir, blob_name)
+            if os.path.isfile(file_path):
+                os.remove(file_path)
+                deleted = True
+            self.index.remove(normalize_name(blob_name))
+            if not deleted:
+                return {
+                    "success": False,
+                    "error": f"File not found: {blob_name}"
+                }
+            
+            self.logger.info(f"Deleted {blob_name} from local storage")
+            return {
+                "success": True,
+                "blob_name": blob_name
+            }
+            
+        except Exception as e:
+            self.logger.error(f"Failed to delete file {blob_name}: {e}")
+            return {
+                "success": False,
+                "error": str(e)
+            }
+    
+    def eviction_candidates(self, limit: int = 1000, exclude_prefixes: Tuple[str, ...] = ()) -> List[Dict[str, Any]]:
+        """
+        Stored files, least recently used first (by last download, else last write).
+        
+        Args:
+            limit: Maximum number of files
+            exclude_prefixes: Skip names starting with any of these
+            
+        Returns:
+            List of dictionaries with name, size, mtime and accessed_at
+        """
+        return self.index.least_recently_used(limit, exclude_prefixes)
+    
+    def collect_garbage(self, grace_seconds: float = 3600) -> Dict[str, Any]:
+        """
+        Remove stored content that no file name refers to any more (content layout only).
+        
+        Args:
+            grace_seconds: Age after which files left by interrupted writes are removed
+            
+        Returns:
+            Dictionary with objects_removed, orphans_removed and bytes_reclaimed
+        """
+        if not self.blob_store:
+            return {"success": True, "objects_removed": 0, "orphans_removed": 0, "bytes_reclaimed": 0}
+        try:
+            return {"success": True, **self.blob_store.gc(grace_seconds)}
+        except Exception as e:
+            self.logger.error(f"Failed to collect garbage: {e}")
+            return {
+                "success": False,
+                "error": str(e)
+            }
+    
     def backup_wordpress_data(self, content_data: Dict[str, Any], backup_name: Optional[str] = None) -> Dict[str, Any]:
         """
         Backup WordPress post data to local storage.
@@ -165,6 +364,34 @@ class LocalStorageAgent(BaseAgent):
                 if not backup_name.endswith('.json'):
                     backup_name += '.json'
             
+            if self.backups:
+                record = self.backups.add(backup_name[:-len('.json')], content_data)
+                blob_name = f"{SEGMENTS_PREFIX}{record['segment']}"
+                if not record["deduplicated"]:
+                    self._index_file(blob_name, os.path.join(self.storage_dir, blob_name))
+                self.logger.info(f"WordPress data backed up to {blob_name} at offset {record['offset']}"
+                                 f"{' (unchanged)' if record['deduplicated'] else ''}")
+                return {
+                    "success": True,
+                    "path": os.path.join(self.storage_dir, blob_name),
+                    "blob_name": blob_name,
+                    "offset": record["offset"],
+                    "length": record["length"],
+                    "deduplicated": record["deduplicated"]
+                }
+            
+            if self.blob_store:
+                blob = self.blob_store.put_bytes(
+                    json.dumps(content_data, indent=2).encode("utf-8"), f"backups/{backup_name}"
+                )
+                self.index.upsert(blob["name"], blob["size"], blob["updated_at"])
+                self.logger.info(f"WordPress data backed up to {blob['name']}")
+                return {
+                    "success": True,
+                    "path": blob["path"],
+                    "blob_name": blob["name"]
+                }
+            
             # Backup path
             backup_path = os.path.join(self.storage_dir, "backups", backup_name)
             
@@ -174,6 +401,7 @@ class LocalStorageAgent(BaseAgent):
             # Write the data to a file
             with open(backup_path, 'w') as backup_file:
                 json.dump(content_data, backup_file, indent=2)
+            self._index_file(f"backups/{backup_name}", backup_path)
             
             self.logger.info(f"WordPress data backed up to {backup_path}")
             return {
@@ -189,6 +417,52 @@ class LocalStorageAgent(BaseAgent):
                 "error": str(e)
             }
     
+    def flush_backups(self) -> Dict[str, Any]:
+        """
+        Close the open backup segment, so its file is complete on disk.
+        
+        Returns:
+            Dictionary with flush status
+        """
+        if not self.backups:
+            return {"success": True}
+        try:
+            self.backups.flush()
+            return {"success": True}
+        except Exception as e:
+            self.logger.error(f"Failed to flush backups: {e}")
+            return {
+                "success": False,
+                "error": str(e)
+            }
+    
+    def find_backup(self, name: Optional[str] = None, post_id: Optional[str] = None,
+                    task_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Read back the latest segmented backup by backup name, post ID or task ID.
+        
+        Args:
+            name: Backup name (without .json)
+            post_id: WordPress post ID
+            task_id: ClickUp task ID
+            
+        Returns:
+            Dictionary with the backed-up data
+        """
+        if not self.backups:
+            return {"success": False, "error": "Backups are not stored in segments"}
+        try:
+            data = self.backups.get(name=name, post_id=post_id, task_id=task_id)
+            if data is None:
+                return {"success": False, "error": "No matching backup"}
+            return {"success": True, "data": data}
+        except Exception as e:
+            self.logger.error(f"Failed to read backup: {e}")
+            return {
+                "success": False,
+                "error": str(e)
+            }
+    
     def run(self) -> Dict[str, Any]:
         """
         Run the agent's main logic.
@@ -205,14 +479,17 @@ class LocalStorageAgent(BaseAgent):
         }
         
         try:
-            # List files as a test
-            file_list_result = self.list_files()
-            if file_list_result["success"]:
-                results["files_count"] = len(file_list_result["files"])
+            # Totals come from the metadata index, so this does not walk the tree
+            summary = self.storage_summary()
+            if summary["success"]:
+                results["files_count"] = summary["files"]
+                results["total_bytes"] = summary["bytes"]
                 self.logger.info(f"Found {results['files_count']} files in storage")
+                if self.blob_store:
+                    results["dedup"] = self.blob_store.stats()
             else:
                 results["status"] = "warning"
-                results["message"] = "Failed to list files"
+                results["message"] = "Failed to summarize storage"
             
         except Exception as e:
             self.logger.error(f"Error in LocalStorageAgent run: {e}")
@@ -221,6 +498,10 @@ class LocalStorageAgent(BaseAgent):
         
         return results
 
+    def _index_file(self, blob_name: str, path: str) -> None:
+        stat = os.stat(path)
+        self.index.upsert(normalize_name(blob_name), stat.st_size, stat.st_mtime)
+
 if __name__ == "__main__":
     # Create and run the agent
     config_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 
@@ -0,0 +1,333 @@
+"""
+Memory Deduplication for The Elidoras Codex.
+MinHash signatures and an LSH band index over memory content, used to spot
+near-duplicate memories (overlapping lore exports, re-ingested drafts) before
+they are stored.
+"""
+import re
+import hashlib
+import sqlite3
+import logging
+import threading
+from typing import Dict, Any, List, Optional, Tuple, Iterable
+
+import numpy as np
+
+from .memory_store import MemoryStore
+
+logger = logging.getLogger("TEC.MemoryDedup")
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+def shingles(text: str, size: int = 3) -> set:
+    """
+    Word shingles of a text.
+
+    Args:
+        text: Source text
+        size: Words per shingle (texts shorter than this yield their words)
+
+    Returns:
+        Set of shingle strings
+    """
+    words = re.findall(r"\w+", text.lower())
+    if len(words) < size:
+        return set(words)
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+def memory_content(memory: Dict[str, Any]) -> str:
+    """Text compared for near-duplicates: the content, or the title when there is none."""
+    return str(memory.get("content") or memory.get("title") or "")
+
+def lsh_bands(num_perm: int, threshold: float) -> Tuple[int, int]:
+    """
+    Choose (bands, rows) for an LSH index.
+
+    The S-curve of b bands of r rows rises around (1/b)^(1/r); the split whose
+    midpoint is closest to, but not above, the threshold is used so that true
+    duplicates are rarely missed and candidates are then verified exactly.
+
+    Args:
+        num_perm: Signature length
+        threshold: Jaccard similarity to detect
+
+    Returns:
+        Tuple of (bands, rows per band)
+    """
+    best = (num_perm, 1)
+    best_gap = None
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        midpoint = (1.0 / bands) ** (1.0 / rows)
+        if midpoint <= threshold and (best_gap is None or threshold - midpoint < best_gap):
+            best, best_gap = (bands, rows), threshold - midpoint
+    return best
+
+class MinHasher:
+    """Deterministic MinHash signatures using seeded universal hash permutations."""
+
+    def __init__(self, num_perm: int = 128, seed: int = 1):
+        """
+        Args:
+            num_perm: Number of permutations (signature length)
+            seed: Seed for the permutation parameters
+        """
+        self.num_perm = num_perm
+        generator = np.random.RandomState(seed)
+        self._a = generator.randint(1, int(_MERSENNE_PRIME), size=num_perm, dtype=np.uint64)
+        self._b = generator.randint(0, int(_MERSENNE_PRIME), size=num_perm, dtype=np.uint64)
+
+    def signature(self, features: Iterable[str]) -> np.ndarray:
+        """
+        MinHash signature of a set of features.
+
+        Args:
+            features: Shingles or other string features
+
+        Returns:
+            uint32 array of length num_perm (all max values for an empty set)
+        """
+        hashes = np.array(
+            [int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=4).digest(), "little")
+             for feature in features],
+            dtype=np.uint64
+        )
+        if not len(hashes):
+            return np.full(self.num_perm, int(_MAX_HASH), dtype=np.uint32)
+        # Wrapping uint64 arithmetic is intended; the result is still a fixed, well-mixed permutation
+        with np.errstate(over="ignore"):
+            permuted = (np.outer(hashes, self._a) + self._b) % _MERSENNE_PRIME & _MAX_HASH
+        return permuted.min(axis=0).astype(np.uint32)
+
+    @staticmethod
+    def similarity(first: np.ndarray, second: np.ndarray) -> float:
+        """Estimated Jaccard similarity of two signatures."""
+        return float(np.count_nonzero(first == second)) / len(first)
+
+class MinHashLSHIndex:
+    """
+    Persistent MinHash LSH index over a MemoryStore.
+
+    Each memory's signature is split into bands and every band is hashed into
+    a bucket; memories sharing any bucket are candidates, which are then
+    verified against the full signatures. A lookup therefore costs one indexed
+    query per band regardless of how many memories are stored. Signatures and
+    buckets live in the store's SQLite file and follow the store through its
+    listener hooks.
+    """
+
+    def __init__(self, store: MemoryStore, threshold: float = 0.8, num_perm: int = 128,
+                 shingle_size: int = 3, db_path: Optional[str] = None):
+        """
+        Open the index and keep it in step with the store.
+
+        Args:
+            store: Memory store to index
+            threshold: Jaccard similarity at which memories count as near-duplicates
+            num_perm: Signature length
+            shingle_size: Words per shingle
+            db_path: SQLite file for the index (defaults to the store's file)
+        """
+        self.store = store
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+        self.hasher = MinHasher(num_perm)
+        self.bands, self.rows = lsh_bands(num_perm, threshold)
+        self.db_path = db_path or store.db_path
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS minhash_signatures (
+                memory_id TEXT PRIMARY KEY,
+                signature BLOB NOT NULL
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS minhash_buckets (
+                band INTEGER NOT NULL,
+                bucket INTEGER NOT NULL,
+                memory_id TEXT NOT NULL,
+                PRIMARY KEY (band, bucket, memory_id)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS idx_minhash_buckets_memory ON minhash_buckets (memory_id);
+            CREATE TABLE IF NOT EXISTS minhash_meta (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            );
+            """
+        )
+        self._conn.commit()
+
+        layout = f"{num_perm}:{self.bands}x{self.rows}:{shingle_size}"
+        row = self._conn.execute("SELECT value FROM minhash_meta WHERE key = 'layout'").fetchone()
+        indexed = self._conn.execute("SELECT COUNT(*) FROM minhash_signatures").fetchone()[0]
+        if row is None or row[0] != layout or indexed != store.count():
+            with self._conn:
+                self._conn.execute("INSERT OR REPLACE INTO minhash_meta (key, value) VALUES ('layout', ?)", (layout,))
+            self.rebuild()
+        store.add_listener(self)
+
+    def signature(self, memory: Dict[str, Any]) -> np.ndarray:
+        """MinHash signature of a memory's content."""
+        return self.hasher.signature(shingles(memory_content(memory), self.shingle_size))
+
+    def rebuild(self, batch_size: int = 2000) -> int:
+        """
+        Re-index the whole store.
+
+        Returns:
+            Number of memories indexed
+        """
+        logger.info("Rebuilding MinHash LSH index")
+        with self._lock:
+            with self._conn:
+                self._conn.execute("DELETE FROM minhash_signatures")
+                self._conn.execute("DELETE FROM minhash_buckets")
+        batch = []
+        indexed = 0
+        for memory in self.store.iter_all():
+            batch.append(memory)
+            if len(batch) >= batch_size:
+                self.on_memories_added(batch)
+                indexed += len(batch)
+                batch = []
+        if batch:
+            self.on_memories_added(batch)
+            indexed += len(batch)
+        logger.info(f"Indexed {indexed} memories for near-duplicate detection")
+        return indexed
+
+    def on_memories_added(self, memories: Iterable[Dict[str, Any]]) -> None:
+        """Index new or replaced memories (MemoryStore listener)."""
+        entries = [(memory["id"], self.signature(memory)) for memory in memories]
+        with self._lock:
+            with self._conn:
+                for memory_id, signature in entries:
+                    self._conn.execute("DELETE FROM minhash_buckets WHERE memory_id = ?", (memory_id,))
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO minhash_signatures (memory_id, signature) VALUES (?, ?)",
+                        (memory_id, signature.tobytes())
+                    )
+                    self._conn.executemany(
+                        "INSERT OR IGNORE INTO minhash_buckets (band, bucket, memory_id) VALUES (?, ?, ?)",
+                        [(band, bucket, memory_id) for band, bucket in self._buckets(signature)]
+                    )
+
+    def on_memory_removed(self, memory_id: str) -> None:
+        """Drop a deleted memory from the index (MemoryStore listener)."""
+        with self._lock:
+            with self._conn:
+                self._conn.execute("DELETE FROM minhash_buckets WHERE memory_id = ?", (memory_id,))
+                self._conn.execute("DELETE FROM minhash_signatures WHERE memory_id = ?", (memory_id,))
+
+    def query(self, signature: np.ndarray, threshold: Optional[float] = None) -> List[Tuple[str, float]]:
+        """
+        Find stored memories similar to a signature.
+
+        Args:
+            signature: MinHash signature to look up
+            threshold: Minimum estimated Jaccard similarity (defaults to the index threshold)
+
+        Returns:
+            List of (memory_id, similarity), most similar first
+        """
+        threshold = self.threshold if threshold is None else threshold
+        with self._lock:
+            candidates = set()
+            for band, bucket in self._buckets(signature):
+                candidates.update(row[0] for row in self._conn.execute(
+                    "SELECT memory_id FROM minhash_buckets WHERE band = ? AND bucket = ?", (band, bucket)
+                ))
+            if not candidates:
+                return []
+            candidates = list(candidates)
+            placeholders = ",".join("?" * len(candidates))
+            rows = self._conn.execute(
+                f"SELECT memory_id, signature FROM minhash_signatures WHERE memory_id IN ({placeholders})",
+                candidates
+            ).fetchall()
+        matches = []
+        for memory_id, blob in rows:
+            similarity = self.hasher.similarity(signature, np.frombuffer(blob, dtype=np.uint32))
+            if similarity >= threshold:
+                matches.append((memory_id, similarity))
+        return sorted(matches, key=lambda match: match[1], reverse=True)
+
+    def find_duplicate(self, memory: Dict[str, Any]) -> Optional[Tuple[str, float]]:
+        """
+        Return the closest stored near-duplicate of a memory, ignoring the memory itself.
+
+        Returns:
+            Tuple of (memory_id, similarity), or None
+        """
+        for memory_id, similarity in self.query(self.signature(memory)):
+            if memory_id != memory.get("id"):
+                return memory_id, similarity
+        return None
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+    def _buckets(self, signature: np.ndarray) -> List[Tuple[int, int]]:
+        buckets = []
+        for band in range(self.bands):
+            digest = hashlib.blake2b(signature[band * self.rows:(band + 1) * self.rows].tobytes(), digest_size=8)
+            buckets.append((band, int.from_bytes(digest.digest(), "little", signed=True)))
+        return buckets
+
+def merge_memories(existing: Dict[str, Any], incoming: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Fold a near-duplicate into an existing memory.
+
+    The existing id, type, timestamp and title are kept; the longer content
+    wins; emotional signatures, associated entities and sensory tags are
+    combined; and the higher priority level is kept.
+
+    Args:
+        existing: Stored memory
+        incoming: Near-duplicate being added
+
+    Returns:
+        The merged memory
+    """
+    merged = dict(existing)
+    if len(str(incoming.get("content") or "")) > len(str(existing.get("content") or "")):
+        merged["content"] = incoming["content"]
+
+    signatures = [part.strip() for memory in (existing, incoming)
+                  for part in str(memory.get("emotional_signature") or "").split(",") if part.strip()]
+    if signatures:
+        merged["emotional_signature"] = ", ".join(_unique(signatures))
+    merged["associated_entities"] = _unique(
+        list(existing.get("associated_entities") or []) + list(incoming.get("associated_entities") or [])
+    )
+
+    meta = dict(existing.get("meta") or {})
+    incoming_meta = incoming.get("meta") or {}
+    try:
+        meta["priority_level"] = max(int(meta.get("priority_level", 0)), int(incoming_meta.get("priority_level", 0)))
+    except (TypeError, ValueError):
+        pass
+    tags = _unique(list(meta.get("sensory_tags") or []) + list(incoming_meta.get("sensory_tags") or []))
+    if tags:
+        meta["sensory_tags"] = tags
+    meta["merged_count"] = int(meta.get("merged_count", 0)) + 1
+    merged["meta"] = meta
+    return merged
+
+def _unique(values: List[Any]) -> List[Any]:
+    seen = set()
+    result = []
+    for value in values:
+        key = str(value).strip().lower()
+        if key and key not in seen:
+            seen.add(key)
+            result.append(value)
+    return result
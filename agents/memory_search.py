@@ -0,0 +1,322 @@
+"""
+Memory Search for The Elidoras Codex.
+BM25 ranking over Airth's memories, backed by a persistent postings index that
+is updated incrementally as memories are added or removed.
+"""
+import re
+import math
+import heapq
+import sqlite3
+import logging
+import threading
+from collections import Counter
+from typing import Dict, Any, List, Optional, Tuple, Iterable
+
+from .memory_store import MemoryStore
+
+logger = logging.getLogger("TEC.MemorySearch")
+
+STOPWORDS = frozenset("""
+a about above after again against all am an and any are as at be because been before being below between
+both but by can could did do does doing down during each few for from further had has have having he her
+here hers herself him himself his how i if in into is it its itself just me more most my myself no nor not
+now of off on once only or other our ours ourselves out over own same she should so some such than that the
+their theirs them themselves then there these they this those through to too under until up very was we were
+what when where which while who whom why will with would you your yours yourself yourselves
+""".split())
+
+# Relative weight of each memory field in a document's term frequencies
+FIELD_WEIGHTS = {
+    "title": 2.0,
+    "content": 1.0,
+    "emotional_signature": 1.0,
+    "associated_entities": 2.0
+}
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens with stopwords and single characters removed."""
+    return [token for token in re.findall(r"\w+", text.lower()) if len(token) > 1 and token not in STOPWORDS]
+
+def memory_terms(memory: Dict[str, Any]) -> Counter:
+    """
+    Weighted term frequencies of a memory across the indexed fields.
+
+    Args:
+        memory: Memory document
+
+    Returns:
+        Counter mapping term to weighted frequency
+    """
+    terms: Counter = Counter()
+    for field, weight in FIELD_WEIGHTS.items():
+        value = memory.get(field) or ""
+        if isinstance(value, list):
+            value = " ".join(str(item) for item in value)
+        for token in tokenize(str(value)):
+            terms[token] += weight
+    return terms
+
+class BM25Index:
+    """
+    Persistent BM25 index over a MemoryStore.
+
+    Postings (term, memory, weighted tf), per-document lengths, document
+    frequencies and corpus totals live in SQLite next to the memories, and are
+    updated for each added or removed memory rather than rebuilt. The memory's
+    meta.priority_level is applied as a multiplicative boost.
+
+    Each posting also stores its BM25 term weight at indexing time ("impact"),
+    indexed per term in descending order. A query reads at most max_postings
+    postings per term, so very common terms cost the same as rare ones; when a
+    term's list is cut short, the best candidates are re-scored exactly.
+    """
+
+    def __init__(self, store: MemoryStore, db_path: Optional[str] = None, k1: float = 1.2,
+                 b: float = 0.75, priority_boost: float = 0.05, max_postings: int = 1000):
+        """
+        Open the index and keep it in step with the store.
+
+        Args:
+            store: Memory store to index
+            db_path: SQLite file for the index (defaults to the store's file)
+            k1: BM25 term-frequency saturation
+            b: BM25 length normalization
+            priority_boost: Score multiplier added per priority level (0.05 => priority 10 scores x1.5)
+            max_postings: Highest-impact postings read per query term
+        """
+        self.store = store
+        self.db_path = db_path or store.db_path
+        self.k1 = k1
+        self.b = b
+        self.priority_boost = priority_boost
+        self.max_postings = max_postings
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS bm25_postings (
+                term TEXT NOT NULL,
+                memory_id TEXT NOT NULL,
+                tf REAL NOT NULL,
+                impact REAL NOT NULL,
+                PRIMARY KEY (term, memory_id)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS idx_bm25_postings_memory ON bm25_postings (memory_id);
+            CREATE INDEX IF NOT EXISTS idx_bm25_postings_impact ON bm25_postings (term, impact DESC);
+            CREATE TABLE IF NOT EXISTS bm25_terms (
+                term TEXT PRIMARY KEY,
+                df INTEGER NOT NULL
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS bm25_docs (
+                memory_id TEXT PRIMARY KEY,
+                length REAL NOT NULL,
+                priority INTEGER NOT NULL
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS bm25_stats (
+                key TEXT PRIMARY KEY,
+                value REAL NOT NULL
+            );
+            """
+        )
+        self._conn.commit()
+
+        if self._doc_count() != store.count():
+            self.rebuild()
+        store.add_listener(self)
+
+    def rebuild(self, batch_size: int = 2000) -> int:
+        """
+        Rebuild the index from the whole store.
+
+        Returns:
+            Number of memories indexed
+        """
+        logger.info("Rebuilding BM25 memory index")
+        with self._lock:
+            with self._conn:
+                self._conn.execute("DELETE FROM bm25_postings")
+                self._conn.execute("DELETE FROM bm25_terms")
+                self._conn.execute("DELETE FROM bm25_docs")
+                self._conn.execute("DELETE FROM bm25_stats")
+        batch = []
+        indexed = 0
+        for memory in self.store.iter_all():
+            batch.append(memory)
+            if len(batch) >= batch_size:
+                self.on_memories_added(batch)
+                indexed += len(batch)
+                batch = []
+        if batch:
+            self.on_memories_added(batch)
+            indexed += len(batch)
+        logger.info(f"Indexed {indexed} memories for BM25 search")
+        return indexed
+
+    def on_memories_added(self, memories: Iterable[Dict[str, Any]]) -> None:
+        """Index new or replaced memories (MemoryStore listener)."""
+        with self._lock:
+            with self._conn:
+                doc_count, total_length = self._stats()
+                for memory in memories:
+                    # A replaced memory leaves the collection stats; keep the
+                    # batch's running totals in step with the stored ones
+                    removed_length = self._remove(memory["id"])
+                    if removed_length is not None:
+                        doc_count -= 1
+                        total_length -= removed_length
+                    terms = memory_terms(memory)
+                    length = sum(terms.values())
+                    avg_length = total_length / doc_count if doc_count else length
+                    try:
+                        priority = int((memory.get("meta") or {}).get("priority_level", 0))
+                    except (TypeError, ValueError):
+                        priority = 0
+                    self._conn.execute(
+                        "INSERT INTO bm25_docs (memory_id, length, priority) VALUES (?, ?, ?)",
+                        (memory["id"], length, priority)
+                    )
+                    self._conn.executemany(
+                        "INSERT INTO bm25_postings (term, memory_id, tf, impact) VALUES (?, ?, ?, ?)",
+                        [(term, memory["id"], tf, self._term_weight(tf, length, avg_length))
+                         for term, tf in terms.items()]
+                    )
+                    self._conn.executemany(
+                        "INSERT INTO bm25_terms (term, df) VALUES (?, 1) "
+                        "ON CONFLICT(term) DO UPDATE SET df = df + 1",
+                        [(term,) for term in terms]
+                    )
+                    self._bump_stats(1, length)
+                    doc_count += 1
+                    total_length += length
+
+    def on_memory_removed(self, memory_id: str) -> None:
+        """Drop a deleted memory from the index (MemoryStore listener)."""
+        with self._lock:
+            with self._conn:
+                self._remove(memory_id)
+
+    def search(self, query: str, limit: int = 10) -> List[Tuple[str, float]]:
+        """
+        Rank memories against a query.
+
+        Args:
+            query: Free-text query
+            limit: Number of results
+
+        Returns:
+            List of (memory_id, score), best first
+        """
+        # Long inputs (whole chat messages) are capped to keep the query bounded
+        terms = list(dict.fromkeys(tokenize(query)))[:64]
+        if not terms:
+            return []
+
+        with self._lock:
+            doc_count, total_length = self._stats()
+            if not doc_count:
+                return []
+            avg_length = total_length / doc_count
+
+            placeholders = ",".join("?" * len(terms))
+            idf = {}
+            truncated = False
+            for term, df in self._conn.execute(
+                f"SELECT term, df FROM bm25_terms WHERE term IN ({placeholders})", terms
+            ):
+                idf[term] = math.log(1 + (doc_count - df + 0.5) / (df + 0.5))
+                truncated = truncated or df > self.max_postings
+            if not idf:
+                return []
+
+            # Accumulate scores from the highest-impact postings of each term
+            raw_scores: Dict[str, float] = {}
+            priorities: Dict[str, int] = {}
+            for term, term_idf in idf.items():
+                for memory_id, tf, length, priority in self._conn.execute(
+                    "SELECT p.memory_id, p.tf, d.length, d.priority FROM bm25_postings p "
+                    "JOIN bm25_docs d ON d.memory_id = p.memory_id "
+                    "WHERE p.term = ? ORDER BY p.impact DESC LIMIT ?",
+                    (term, self.max_postings)
+                ):
+                    raw_scores[memory_id] = raw_scores.get(memory_id, 0.0) + \
+                        term_idf * self._term_weight(tf, length, avg_length)
+                    priorities[memory_id] = priority
+
+            if truncated:
+                # Candidates may be missing contributions from cut-off lists; re-score the best exactly
+                candidates = heapq.nlargest(limit * 10, raw_scores, key=lambda m: self._boost(raw_scores[m], priorities[m]))
+                raw_scores = self._exact_scores(candidates, idf, avg_length)
+
+        ranked = heapq.nlargest(limit, raw_scores.items(), key=lambda item: self._boost(item[1], priorities[item[0]]))
+        return [(memory_id, self._boost(score, priorities[memory_id])) for memory_id, score in ranked]
+
+    def search_memories(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        Rank memories against a query and return the documents.
+
+        Args:
+            query: Free-text query
+            limit: Number of results
+
+        Returns:
+            Memory documents, best first
+        """
+        return self.store.get_many([memory_id for memory_id, _ in self.search(query, limit)])
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+    def _term_weight(self, tf: float, length: float, avg_length: float) -> float:
+        return tf * (self.k1 + 1) / (tf + self.k1 * (1 - self.b + self.b * length / avg_length))
+
+    def _boost(self, score: float, priority: int) -> float:
+        return score * (1 + self.priority_boost * priority)
+
+    def _exact_scores(self, memory_ids: List[str], idf: Dict[str, float], avg_length: float) -> Dict[str, float]:
+        scores = {memory_id: 0.0 for memory_id in memory_ids}
+        if not memory_ids:
+            return scores
+        memory_placeholders = ",".join("?" * len(memory_ids))
+        term_placeholders = ",".join("?" * len(idf))
+        for memory_id, term, tf, length in self._conn.execute(
+            "SELECT p.memory_id, p.term, p.tf, d.length FROM bm25_postings p "
+            "JOIN bm25_docs d ON d.memory_id = p.memory_id "
+            f"WHERE p.memory_id IN ({memory_placeholders}) AND p.term IN ({term_placeholders})",
+            memory_ids + list(idf)
+        ):
+            scores[memory_id] += idf[term] * self._term_weight(tf, length, avg_length)
+        return scores
+
+    def _remove(self, memory_id: str) -> Optional[float]:
+        row = self._conn.execute("SELECT length FROM bm25_docs WHERE memory_id = ?", (memory_id,)).fetchone()
+        if row is None:
+            return None
+        terms = [term for (term,) in self._conn.execute(
+            "SELECT term FROM bm25_postings WHERE memory_id = ?", (memory_id,)
+        )]
+        self._conn.executemany("UPDATE bm25_terms SET df = df - 1 WHERE term = ?", [(term,) for term in terms])
+        self._conn.executemany("DELETE FROM bm25_terms WHERE term = ? AND df <= 0", [(term,) for term in terms])
+        self._conn.execute("DELETE FROM bm25_postings WHERE memory_id = ?", (memory_id,))
+        self._conn.execute("DELETE FROM bm25_docs WHERE memory_id = ?", (memory_id,))
+        self._bump_stats(-1, -row[0])
+        return row[0]
+
+    def _bump_stats(self, docs: int, length: float) -> None:
+        self._conn.executemany(
+            "INSERT INTO bm25_stats (key, value) VALUES (?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = value + excluded.value",
+            [("doc_count", docs), ("total_length", length)]
+        )
+
+    def _stats(self) -> Tuple[int, float]:
+        stats = dict(self._conn.execute("SELECT key, value FROM bm25_stats").fetchall())
+        return int(stats.get("doc_count", 0)), stats.get("total_length", 0.0)
+
+    def _doc_count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM bm25_docs").fetchone()[0]
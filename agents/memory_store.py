@@ -0,0 +1,304 @@
+"""
+Memory Store for The Elidoras Codex.
+Indexed SQLite storage for Airth's memories, replacing the single memories.json
+document so that adding or looking up one memory never loads or rewrites the
+whole corpus.
+"""
+import os
+import json
+import sqlite3
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional, Iterable, Iterator
+
+logger = logging.getLogger("TEC.MemoryStore")
+
+ROOT_DIR = os.path.dirname(os.path.dirname(__file__))
+DEFAULT_STORE_PATH = os.path.join(ROOT_DIR, "data", "memories.sqlite3")
+DEFAULT_SEED_PATH = os.path.join(ROOT_DIR, "memories.json")
+
+MEMORY_TYPES = ("personal", "faction", "event", "relationship", "knowledge")
+
+class MemoryStore:
+    """
+    SQLite-backed memory store.
+
+    Each memory is one row keyed by its id, with B-tree indexes on type and
+    priority and a separate (entity, memory_id) table for entity lookups, so
+    inserts and lookups are O(log n). Writes are committed per call (or per
+    batch with add_many), never by rewriting the corpus.
+
+    Other components can register listeners with add_listener() to keep their
+    own indexes in step with the store.
+    """
+
+    def __init__(self, db_path: Optional[str] = None, seed_path: Optional[str] = DEFAULT_SEED_PATH):
+        """
+        Open (or create) the memory store.
+
+        Args:
+            db_path: Path to the SQLite file (defaults to data/memories.sqlite3)
+            seed_path: memories.json document imported when the store is first created
+        """
+        self.db_path = db_path or DEFAULT_STORE_PATH
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+
+        self._lock = threading.RLock()
+        self._listeners = []
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS memories (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                id TEXT NOT NULL UNIQUE,
+                type TEXT,
+                timestamp TEXT,
+                title TEXT,
+                priority INTEGER NOT NULL DEFAULT 0,
+                data TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_memories_type ON memories (type, timestamp);
+            CREATE INDEX IF NOT EXISTS idx_memories_priority ON memories (priority);
+            CREATE TABLE IF NOT EXISTS memory_entities (
+                entity TEXT NOT NULL,
+                memory_id TEXT NOT NULL,
+                PRIMARY KEY (entity, memory_id)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS idx_memory_entities_memory ON memory_entities (memory_id);
+            """
+        )
+        self._conn.commit()
+
+        if seed_path and self.count() == 0 and os.path.exists(seed_path):
+            imported = self.import_json(seed_path)
+            logger.info(f"Seeded memory store with {imported} memories from {seed_path}")
+
+    def add_listener(self, listener) -> None:
+        """
+        Register an object notified of changes.
+
+        The listener may implement on_memories_added(memories) and
+        on_memory_removed(memory_id); both are called after the change is committed.
+        """
+        self._listeners.append(listener)
+
+    def add(self, memory: Dict[str, Any]) -> str:
+        """
+        Insert or replace a single memory.
+
+        Args:
+            memory: Memory document (an id is generated if missing)
+
+        Returns:
+            ID of the stored memory
+        """
+        return self.add_many([memory])[0]
+
+    def add_many(self, memories: Iterable[Dict[str, Any]]) -> List[str]:
+        """
+        Insert or replace several memories in one transaction.
+
+        Args:
+            memories: Memory documents (ids are generated where missing)
+
+        Returns:
+            IDs of the stored memories, in input order
+        """
+        stored = []
+        with self._lock:
+            with self._conn:
+                for memory in memories:
+                    memory = self._normalize(memory)
+                    self._conn.execute("DELETE FROM memory_entities WHERE memory_id = ?", (memory["id"],))
+                    self._conn.execute(
+                        "INSERT INTO memories (id, type, timestamp, title, priority, data) "
+                        "VALUES (?, ?, ?, ?, ?, ?) "
+                        "ON CONFLICT(id) DO UPDATE SET type = excluded.type, timestamp = excluded.timestamp, "
+                        "title = excluded.title, priority = excluded.priority, data = excluded.data",
+                        (memory["id"], memory.get("type"), memory.get("timestamp"), memory.get("title"),
+                         _priority(memory), json.dumps(memory))
+                    )
+                    self._conn.executemany(
+                        "INSERT OR IGNORE INTO memory_entities (entity, memory_id) VALUES (?, ?)",
+                        [(_entity_key(entity), memory["id"]) for entity in memory.get("associated_entities", [])
+                         if entity]
+                    )
+                    stored.append(memory)
+        self._notify("on_memories_added", stored)
+        return [memory["id"] for memory in stored]
+
+    def get(self, memory_id: str) -> Optional[Dict[str, Any]]:
+        """Return a memory by id, or None."""
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM memories WHERE id = ?", (memory_id,)).fetchone()
+        return json.loads(row["data"]) if row else None
+
+    def get_many(self, memory_ids: List[str]) -> List[Dict[str, Any]]:
+        """
+        Return several memories by id, in the order requested.
+
+        Unknown ids are skipped.
+        """
+        if not memory_ids:
+            return []
+        found = {}
+        with self._lock:
+            # Stay well under SQLite's bound-parameter limit
+            for start in range(0, len(memory_ids), 500):
+                batch = memory_ids[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                for row in self._conn.execute(
+                    f"SELECT id, data FROM memories WHERE id IN ({placeholders})", batch
+                ):
+                    found[row["id"]] = json.loads(row["data"])
+        return [found[memory_id] for memory_id in memory_ids if memory_id in found]
+
+    def delete(self, memory_id: str) -> bool:
+        """
+        Delete a memory.
+
+        Returns:
+            True if a memory was removed
+        """
+        with self._lock:
+            with self._conn:
+                self._conn.execute("DELETE FROM memory_entities WHERE memory_id = ?", (memory_id,))
+                cursor = self._conn.execute("DELETE FROM memories WHERE id = ?", (memory_id,))
+        if cursor.rowcount:
+            self._notify("on_memory_removed", memory_id)
+        return bool(cursor.rowcount)
+
+    def by_type(self, memory_type: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Return memories of a type, newest first."""
+        query = "SELECT data FROM memories WHERE type = ? ORDER BY timestamp DESC"
+        params: List[Any] = [memory_type]
+        if limit:
+            query += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [json.loads(row["data"]) for row in rows]
+
+    def by_entity(self, entity: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Return memories associated with an entity (case-insensitive), highest priority first."""
+        query = (
+            "SELECT m.data FROM memory_entities e JOIN memories m ON m.id = e.memory_id "
+            "WHERE e.entity = ? ORDER BY m.priority DESC, m.timestamp DESC"
+        )
+        params: List[Any] = [_entity_key(entity)]
+        if limit:
+            query += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [json.loads(row["data"]) for row in rows]
+
+    def entities(self) -> List[str]:
+        """Return every known entity key."""
+        with self._lock:
+            rows = self._conn.execute("SELECT DISTINCT entity FROM memory_entities").fetchall()
+        return [row["entity"] for row in rows]
+
+    def iter_all(self, batch_size: int = 1000) -> Iterator[Dict[str, Any]]:
+        """Yield every memory in insertion order without loading the corpus at once."""
+        last_seq = 0
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT seq, data FROM memories WHERE seq > ? ORDER BY seq LIMIT ?",
+                    (last_seq, batch_size)
+                ).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield json.loads(row["data"])
+            last_seq = rows[-1]["seq"]
+
+    def count(self) -> int:
+        """Number of stored memories."""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM memories").fetchone()[0]
+
+    def import_json(self, path: str) -> int:
+        """
+        Import a memories.json document.
+
+        Args:
+            path: Path to a file holding {"memories": [...]} or a bare list
+
+        Returns:
+            Number of memories imported
+        """
+        with open(path, "r", encoding="utf-8") as f:
+            document = json.load(f)
+        memories = document.get("memories", []) if isinstance(document, dict) else document
+        return len(self.add_many(memories))
+
+    def export_json(self, path: str, version: str = "1.0.0") -> int:
+        """
+        Write the store out in the memories.json document format.
+
+        Args:
+            path: Destination file
+            version: Version string recorded in the document
+
+        Returns:
+            Number of memories exported
+        """
+        memories = list(self.iter_all())
+        document = {
+            "version": version,
+            "last_updated": datetime.now().strftime("%Y-%m-%d"),
+            "memories": memories
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(document, f, indent=2)
+        return len(memories)
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+    def _normalize(self, memory: Dict[str, Any]) -> Dict[str, Any]:
+        memory = dict(memory)
+        if not memory.get("id"):
+            memory["id"] = self._next_id()
+        memory.setdefault("timestamp", datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"))
+        memory.setdefault("associated_entities", [])
+        memory.setdefault("meta", {})
+        return memory
+
+    def _next_id(self) -> str:
+        # sqlite_sequence keeps the largest seq ever assigned, so deleting the
+        # newest memory never hands its id out again (MAX(seq) would)
+        row = self._conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'memories'").fetchone()
+        first = seq = (row[0] if row else 0) + 1
+        while self._conn.execute("SELECT 1 FROM memories WHERE id = ?", (f"mem{seq:03d}",)).fetchone():
+            seq += 1
+        if seq != first:
+            # Skipped past imported ids: the row about to be inserted takes this seq
+            self._conn.execute("UPDATE sqlite_sequence SET seq = ? WHERE name = 'memories'", (seq - 1,))
+        return f"mem{seq:03d}"
+
+    def _notify(self, event: str, payload: Any) -> None:
+        for listener in self._listeners:
+            handler = getattr(listener, event, None)
+            if handler:
+                try:
+                    handler(payload)
+                except Exception as e:
+                    logger.error(f"Memory store listener {listener!r} failed on {event}: {e}")
+
+def _priority(memory: Dict[str, Any]) -> int:
+    try:
+        return int((memory.get("meta") or {}).get("priority_level", 0))
+    except (TypeError, ValueError):
+        return 0
+
+def _entity_key(entity: str) -> str:
+    return str(entity).strip().lower()
@@ -0,0 +1,368 @@
+"""
+Memory Vectors for The Elidoras Codex.
+Embedding retrieval over Airth's memories: vectors are kept in a contiguous,
+memory-mapped float32 matrix and ranked by cosine similarity, alone or fused
+with BM25 keyword scores.
+"""
+import os
+import hashlib
+import sqlite3
+import logging
+import threading
+from typing import Dict, Any, List, Optional, Tuple, Iterable
+
+import numpy as np
+
+from .memory_store import MemoryStore
+from .memory_search import BM25Index, FIELD_WEIGHTS, tokenize
+
+logger = logging.getLogger("TEC.MemoryVectors")
+
+def memory_text(memory: Dict[str, Any]) -> str:
+    """
+    Text of a memory used for embedding, with fields repeated by their weight.
+
+    Args:
+        memory: Memory document
+
+    Returns:
+        Text to embed
+    """
+    parts = []
+    for field, weight in FIELD_WEIGHTS.items():
+        value = memory.get(field) or ""
+        if isinstance(value, list):
+            value = " ".join(str(item) for item in value)
+        parts.extend([str(value)] * int(weight))
+    return " ".join(parts)
+
+class HashingEmbedder:
+    """
+    Deterministic, offline text embedder.
+
+    Words and their character trigrams are hashed (with a stable digest, not
+    Python's salted hash) into a fixed number of signed buckets and the result
+    is L2-normalized. Trigrams let related word forms ("goddess", "goddesses")
+    share dimensions, which plain keyword matching cannot do.
+
+    Any object with name, dim and embed(texts) can be used in its place, e.g. a
+    wrapper around a hosted embedding model.
+    """
+
+    def __init__(self, dim: int = 256, trigram_weight: float = 0.5):
+        """
+        Args:
+            dim: Embedding dimensionality
+            trigram_weight: Weight of each character trigram relative to a whole word
+        """
+        self.dim = dim
+        self.trigram_weight = trigram_weight
+        self.name = f"hashing-v1:{dim}:{trigram_weight}"
+        self._buckets: Dict[str, Tuple[int, float]] = {}
+
+    def embed(self, texts: Iterable[str]) -> np.ndarray:
+        """
+        Embed texts.
+
+        Args:
+            texts: Texts to embed
+
+        Returns:
+            float32 array of shape (len(texts), dim) with unit-length rows (zero rows for empty text)
+        """
+        texts = list(texts)
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            vector = vectors[row]
+            for token in tokenize(text):
+                index, sign = self._bucket(token)
+                vector[index] += sign
+                padded = f"<{token}>"
+                for start in range(len(padded) - 2):
+                    index, sign = self._bucket(padded[start:start + 3])
+                    vector[index] += sign * self.trigram_weight
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        np.divide(vectors, norms, out=vectors, where=norms > 0)
+        return vectors
+
+    def _bucket(self, feature: str) -> Tuple[int, float]:
+        bucket = self._buckets.get(feature)
+        if bucket is None:
+            digest = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+            bucket = (digest % self.dim, 1.0 if digest >> 63 else -1.0)
+            if len(self._buckets) < 500000:
+                self._buckets[feature] = bucket
+        return bucket
+
+class VectorIndex:
+    """
+    Embedding index over a MemoryStore.
+
+    Vectors live in one contiguous float32 file that is memory-mapped, so the
+    corpus is scanned with a single matrix-vector product and top-k is taken
+    with argpartition instead of a full sort. The row assigned to each memory is
+    kept in the store's SQLite file; rows of deleted memories are reused. Like
+    BM25Index, the index follows the store through its listener hooks.
+    """
+
+    def __init__(self, store: MemoryStore, path: Optional[str] = None, embedder=None,
+                 db_path: Optional[str] = None):
+        """
+        Open the index and keep it in step with the store.
+
+        Args:
+            store: Memory store to index
+            path: Vector file (defaults to the store's path with a .vectors.f32 suffix)
+            embedder: Embedding backend (defaults to HashingEmbedder)
+            db_path: SQLite file for the row mapping (defaults to the store's file)
+        """
+        self.store = store
+        self.embedder = embedder or HashingEmbedder()
+        self.dim = self.embedder.dim
+        self.path = path or os.path.splitext(store.db_path)[0] + ".vectors.f32"
+        self.db_path = db_path or store.db_path
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS memory_vectors (
+                memory_id TEXT PRIMARY KEY,
+                row INTEGER NOT NULL UNIQUE
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS memory_vector_meta (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            );
+            """
+        )
+        self._conn.commit()
+
+        self._matrix: Optional[np.memmap] = None
+        self._ids: List[Optional[str]] = []
+        self._rows: Dict[str, int] = {}
+        self._free: List[int] = []
+        self._load()
+
+        if self._matrix is None or len(self._rows) != store.count():
+            self.rebuild()
+        store.add_listener(self)
+
+    def rebuild(self, batch_size: int = 2000) -> int:
+        """
+        Re-embed the whole store.
+
+        Returns:
+            Number of memories indexed
+        """
+        logger.info(f"Rebuilding memory vector index with {self.embedder.name}")
+        with self._lock:
+            with self._conn:
+                self._conn.execute("DELETE FROM memory_vectors")
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO memory_vector_meta (key, value) VALUES ('embedder', ?)",
+                    (self.embedder.name,)
+                )
+            self._ids, self._rows, self._free = [], {}, []
+            self._open_matrix(max(1024, self.store.count()), reset=True)
+        batch = []
+        indexed = 0
+        for memory in self.store.iter_all():
+            batch.append(memory)
+            if len(batch) >= batch_size:
+                self.on_memories_added(batch)
+                indexed += len(batch)
+                batch = []
+        if batch:
+            self.on_memories_added(batch)
+            indexed += len(batch)
+        logger.info(f"Embedded {indexed} memories")
+        return indexed
+
+    def on_memories_added(self, memories: Iterable[Dict[str, Any]]) -> None:
+        """Embed new or replaced memories (MemoryStore listener)."""
+        memories = list(memories)
+        if not memories:
+            return
+        vectors = self.embedder.embed([memory_text(memory) for memory in memories])
+        with self._lock:
+            assigned = []
+            for memory, vector in zip(memories, vectors):
+                row = self._rows.get(memory["id"])
+                if row is None:
+                    row = self._allocate_row()
+                    self._ids[row] = memory["id"]
+                    self._rows[memory["id"]] = row
+                self._matrix[row] = vector
+                assigned.append((memory["id"], row))
+            # Vectors reach the file before the mapping that points at them is committed
+            self._matrix.flush()
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO memory_vectors (memory_id, row) VALUES (?, ?)", assigned
+                )
+
+    def on_memory_removed(self, memory_id: str) -> None:
+        """Drop a deleted memory from the index (MemoryStore listener)."""
+        with self._lock:
+            row = self._rows.pop(memory_id, None)
+            if row is None:
+                return
+            self._ids[row] = None
+            self._matrix[row] = 0.0
+            self._free.append(row)
+            with self._conn:
+                self._conn.execute("DELETE FROM memory_vectors WHERE memory_id = ?", (memory_id,))
+
+    def search(self, query: str, limit: int = 10) -> List[Tuple[str, float]]:
+        """
+        Rank memories by cosine similarity to a query.
+
+        Args:
+            query: Free-text query
+            limit: Number of results
+
+        Returns:
+            List of (memory_id, similarity), best first
+        """
+        vector = self.embedder.embed([query])[0]
+        if not vector.any():
+            return []
+        with self._lock:
+            used = len(self._ids)
+            if not self._rows or not used:
+                return []
+            # Rows are unit length, so the dot product is the cosine similarity
+            scores = self._matrix[:used] @ vector
+            if self._free:
+                scores[self._free] = -np.inf
+            k = min(limit, len(self._rows))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [(self._ids[row], float(scores[row])) for row in top]
+
+    def search_memories(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        Rank memories by similarity to a query and return the documents.
+
+        Args:
+            query: Free-text query
+            limit: Number of results
+
+        Returns:
+            Memory documents, best first
+        """
+        return self.store.get_many([memory_id for memory_id, _ in self.search(query, limit)])
+
+    def close(self) -> None:
+        """Flush the vectors and close the database connection."""
+        with self._lock:
+            if self._matrix is not None:
+                self._matrix.flush()
+                self._matrix = None
+            self._conn.close()
+
+    def _load(self) -> None:
+        if self._meta("embedder") != self.embedder.name or not os.path.exists(self.path):
+            return
+        rows = self._conn.execute("SELECT memory_id, row FROM memory_vectors").fetchall()
+        used = max((row for _, row in rows), default=-1) + 1
+        capacity = os.path.getsize(self.path) // (4 * self.dim)
+        if capacity < used:
+            return
+        self._open_matrix(capacity)
+        self._ids = [None] * used
+        for memory_id, row in rows:
+            self._ids[row] = memory_id
+            self._rows[memory_id] = row
+        self._free = [row for row, memory_id in enumerate(self._ids) if memory_id is None]
+
+    def _allocate_row(self) -> int:
+        if self._free:
+            return self._free.pop()
+        row = len(self._ids)
+        if row >= self._matrix.shape[0]:
+            self._open_matrix(self._matrix.shape[0] * 2)
+        self._ids.append(None)
+        return row
+
+    def _open_matrix(self, capacity: int, reset: bool = False) -> None:
+        if self._matrix is not None:
+            self._matrix.flush()
+            self._matrix = None
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with open(self.path, "wb" if reset else "ab") as f:
+            # Growing the file zero-fills the new rows
+            f.truncate(capacity * self.dim * 4)
+        self._matrix = np.memmap(self.path, dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+
+    def _meta(self, key: str) -> Optional[str]:
+        row = self._conn.execute("SELECT value FROM memory_vector_meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+class HybridSearch:
+    """
+    Fuses BM25 and vector rankings.
+
+    Each index contributes its top candidates; scores are min-max normalized
+    per index and combined as alpha * bm25 + (1 - alpha) * vector, so memories
+    that match on keywords and on theme rise to the top while either signal
+    alone can still surface a result.
+    """
+
+    def __init__(self, bm25: BM25Index, vectors: VectorIndex, alpha: float = 0.5, candidates: int = 5):
+        """
+        Args:
+            bm25: Keyword index
+            vectors: Embedding index
+            alpha: Weight of the BM25 score (0 = vectors only, 1 = BM25 only)
+            candidates: Candidates fetched from each index per requested result
+        """
+        self.bm25 = bm25
+        self.vectors = vectors
+        self.store = bm25.store
+        self.alpha = alpha
+        self.candidates = candidates
+
+    def search(self, query: str, limit: int = 10) -> List[Tuple[str, float]]:
+        """
+        Rank memories against a query using both indexes.
+
+        Args:
+            query: Free-text query
+            limit: Number of results
+
+        Returns:
+            List of (memory_id, fused score in [0, 1]), best first
+        """
+        pool = limit * self.candidates
+        fused: Dict[str, float] = {}
+        for weight, results in ((self.alpha, self.bm25.search(query, pool)),
+                                (1 - self.alpha, self.vectors.search(query, pool))):
+            for memory_id, score in _normalize(results):
+                fused[memory_id] = fused.get(memory_id, 0.0) + weight * score
+        return sorted(fused.items(), key=lambda item: item[1], reverse=True)[:limit]
+
+    def search_memories(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        Rank memories against a query and return the documents.
+
+        Args:
+            query: Free-text query
+            limit: Number of results
+
+        Returns:
+            Memory documents, best first
+        """
+        return self.store.get_many([memory_id for memory_id, _ in self.search(query, limit)])
+
+def _normalize(results: List[Tuple[str, float]]) -> List[Tuple[str, float]]:
+    if not results:
+        return []
+    high = results[0][1]
+    low = results[-1][1]
+    if high == low:
+        return [(memory_id, 1.0) for memory_id, _ in results]
+    return [(memory_id, (score - low) / (high - low)) for memory_id, score in results]
@@ -0,0 +1,190 @@
+"""
+Prompt Templates for The Elidoras Codex.
+Compiles the {{variable}} templates in config/prompts.json once and renders
+them in a single pass. A process-wide registry shares the compiled templates
+between agents and reloads them only when the file changes on disk.
+"""
+import os
+import re
+import json
+import logging
+import threading
+from typing import Dict, Any, List, Optional, Tuple
+
+logger = logging.getLogger("TEC.Prompts")
+
+DEFAULT_PROMPTS_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "config", "prompts.json")
+
+_PLACEHOLDER = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+_MISSING = (0, -1)
+
+class PromptTemplate:
+    """
+    A prompt template parsed into literal text and variable slots.
+
+    Rendering joins the pieces once, so the cost does not grow with the number
+    of variables, and substituted values are never scanned for placeholders
+    themselves (user text containing "{{...}}" is left as it is).
+    """
+
+    def __init__(self, name: str, text: str):
+        """
+        Compile a template.
+
+        Args:
+            name: Template name (its key in prompts.json)
+            text: Template text with {{variable}} placeholders
+        """
+        self.name = name
+        self.text = text
+        self._literals: List[str] = []
+        self._slots: List[str] = []
+        position = 0
+        for match in _PLACEHOLDER.finditer(text):
+            self._literals.append(text[position:match.start()])
+            self._slots.append(match.group(1))
+            position = match.end()
+        self._literals.append(text[position:])
+        self.variables = frozenset(self._slots)
+
+    def missing(self, variables: Dict[str, Any]) -> List[str]:
+        """Names of required variables absent from a mapping, sorted."""
+        return sorted(name for name in self.variables if name not in variables)
+
+    def render(self, variables: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Fill in the template.
+
+        Args:
+            variables: Values for the placeholders (converted with str(); extra keys are ignored)
+
+        Returns:
+            The rendered prompt
+
+        Raises:
+            ValueError: If a required variable is missing
+        """
+        variables = variables or {}
+        missing = self.missing(variables)
+        if missing:
+            raise ValueError(f"Prompt template '{self.name}' is missing variables: {', '.join(missing)}")
+        parts = [self._literals[0]]
+        for slot, literal in zip(self._slots, self._literals[1:]):
+            parts.append(str(variables[slot]))
+            parts.append(literal)
+        return "".join(parts)
+
+class PromptRegistry:
+    """
+    Compiled templates from a prompts.json file.
+
+    Every lookup checks the file's modification time and size, and the file is
+    parsed and compiled again only when they change. A file that fails to load
+    keeps the previously loaded templates in service.
+
+    Lookups with get() return the raw template text, so the registry can stand
+    in wherever the agents used the plain prompts dictionary.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Args:
+            path: Path to the prompts JSON file (defaults to config/prompts.json)
+        """
+        self.path = os.path.abspath(path or DEFAULT_PROMPTS_PATH)
+        self._lock = threading.Lock()
+        self._templates: Dict[str, PromptTemplate] = {}
+        self._signature: Optional[Tuple[int, int]] = None
+        self.reloads = 0
+        self._refresh()
+
+    def template(self, name: str) -> Optional[PromptTemplate]:
+        """Return the compiled template, or None if there is no template with that name."""
+        self._refresh()
+        return self._templates.get(name)
+
+    def render(self, name: str, variables: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Render a template by name.
+
+        Args:
+            name: Template name
+            variables: Values for the placeholders
+
+        Returns:
+            The rendered prompt
+
+        Raises:
+            ValueError: If the template does not exist or a required variable is missing
+        """
+        template = self.template(name)
+        if template is None:
+            raise ValueError(f"Prompt template '{name}' not found")
+        return template.render(variables)
+
+    def get(self, name: str, default: Optional[str] = None) -> Optional[str]:
+        """Raw text of a template, or default if there is none."""
+        template = self.template(name)
+        return template.text if template is not None else default
+
+    def names(self) -> List[str]:
+        """Names of the loaded templates."""
+        self._refresh()
+        return sorted(self._templates)
+
+    def __contains__(self, name: str) -> bool:
+        return self.template(name) is not None
+
+    def __len__(self) -> int:
+        self._refresh()
+        return len(self._templates)
+
+    def _refresh(self) -> None:
+        try:
+            stat = os.stat(self.path)
+        except OSError as e:
+            # Log once per disappearance rather than on every lookup
+            if self._signature != _MISSING:
+                logger.error(f"Failed to load prompts: {e}")
+                self._signature = _MISSING
+            return
+        signature = (stat.st_mtime_ns, stat.st_size)
+        if signature == self._signature:
+            return
+        with self._lock:
+            if signature == self._signature:
+                return
+            try:
+                with open(self.path, "r") as f:
+                    prompts = json.load(f)
+                templates = {name: PromptTemplate(name, text) for name, text in prompts.items()
+                             if isinstance(text, str)}
+            except Exception as e:
+                logger.error(f"Failed to load prompts: {e}")
+                self._signature = signature
+                return
+            self._templates = templates
+            self._signature = signature
+            self.reloads += 1
+            logger.info(f"Loaded {len(templates)} prompts from {self.path}")
+
+_shared_registries: Dict[str, PromptRegistry] = {}
+_shared_lock = threading.Lock()
+
+def get_prompt_registry(path: Optional[str] = None) -> PromptRegistry:
+    """
+    Return the process-wide registry for a prompts file.
+
+    Agents share one registry per file, so the templates are parsed once per
+    process (and again only after the file is edited).
+
+    Args:
+        path: Path to the prompts JSON file (defaults to config/prompts.json)
+    """
+    path = os.path.abspath(path or DEFAULT_PROMPTS_PATH)
+    with _shared_lock:
+        registry = _shared_registries.get(path)
+        if registry is None:
+            registry = PromptRegistry(path)
+            _shared_registries[path] = registry
+        return registry
@@ -0,0 +1,383 @@
+"""
+Retention Policies for The Elidoras Codex.
+Applies per-prefix retention and tiering rules to local storage and to plain
+directories such as output/images: keep the last N files, keep one file per
+day for D days, gzip files older than X days and move files older than Y
+days to the remote store. Rules are evaluated from the metadata index, so a
+run reads no directory listings or file stats, and every file is looked at
+by exactly one rule.
+"""
+import os
+import re
+import gzip
+import time
+import uuid
+import shutil
+import logging
+from datetime import datetime
+from collections import defaultdict
+from typing import Dict, Any, List, Optional
+
+from .storage_index import StorageIndex, scan_tree
+
+logger = logging.getLogger("TEC.Retention")
+
+# Not worth gzipping again
+COMPRESSED_EXTENSIONS = (".gz", ".zst", ".zip", ".png", ".jpg", ".jpeg", ".webp", ".gif", ".mp4")
+
+_DAY = 86400
+
+class RetentionRule:
+    """
+    Retention and tiering for the files under one prefix of a store.
+
+    Files are grouped (all together, or by the first capture group of the
+    group regex, e.g. one group per post) and ranked newest first by
+    modification time. A file is kept if it is among the keep_last newest of
+    its group, or the newest of its day within the last keep_daily_days days;
+    the rest are deleted. Without keep_last and keep_daily_days nothing is
+    deleted. Kept files older than compress_after_days are gzipped (name +
+    ".gz"), and those older than remote_after_days are moved to the remote
+    store as remote_prefix + name.
+    """
+
+    def __init__(self, prefix: str, store: str = "storage", keep_last: Optional[int] = None,
+                 keep_daily_days: Optional[float] = None, compress_after_days: Optional[float] = None,
+                 remote_after_days: Optional[float] = None, group: Optional[str] = None,
+                 remote_prefix: Optional[str] = None):
+        """
+        Args:
+            prefix: Names the rule applies to
+            store: "storage" for local storage, or a directory relative to the project root
+            keep_last: Newest files kept per group
+            keep_daily_days: Days for which the newest file of each day is kept
+            compress_after_days: Age after which kept files are gzipped
+            remote_after_days: Age after which kept files are moved to the remote store
+            group: Regex whose first capture group (or whole match) groups names
+            remote_prefix: Prefix of remote names (default: "" for storage, else "<store>/")
+        """
+        self.prefix = prefix
+        self.store = store
+        self.keep_last = keep_last
+        self.keep_daily_days = keep_daily_days
+        self.compress_after_days = compress_after_days
+        self.remote_after_days = remote_after_days
+        self.group = re.compile(group) if group else None
+        if remote_prefix is None:
+            remote_prefix = "" if store == "storage" else store.strip("/") + "/"
+        self.remote_prefix = remote_prefix
+
+    @classmethod
+    def from_config(cls, rule: Dict[str, Any]) -> "RetentionRule":
+        """Build a rule from one entry of storage.retention.rules."""
+        known = ("prefix", "store", "keep_last", "keep_daily_days", "compress_after_days",
+                 "remote_after_days", "group", "remote_prefix")
+        unknown = set(rule) - set(known)
+        if unknown:
+            raise ValueError(f"Unknown retention rule keys: {', '.join(sorted(unknown))}")
+        return cls(**{key: rule[key] for key in known if key in rule})
+
+    def group_key(self, name: str) -> str:
+        """Group a name belongs to; names the group regex does not match share one group."""
+        if not self.group:
+            return ""
+        match = self.group.search(name)
+        if not match:
+            return ""
+        return match.group(1) if match.groups() else match.group(0)
+
+    def evaluate(self, entries: List[Dict[str, Any]], now: float, grace_seconds: float = 3600) -> List[Dict[str, Any]]:
+        """
+        Decide what happens to each file.
+
+        Args:
+            entries: Index entries (name, size, mtime) under the prefix
+            now: Current timestamp
+            grace_seconds: Files modified more recently than this are never touched
+
+        Returns:
+            Entries with a file needing action, each extended with delete, compress and remote flags
+        """
+        groups = defaultdict(list)
+        for entry in entries:
+            groups[self.group_key(entry["name"])].append(entry)
+
+        prunes = self.keep_last is not None or self.keep_daily_days is not None
+        actions = []
+        for members in groups.values():
+            members.sort(key=lambda entry: entry["mtime"], reverse=True)
+            days_seen = set()
+            for rank, entry in enumerate(members):
+                age = now - entry["mtime"]
+                day = datetime.fromtimestamp(entry["mtime"]).date()
+                newest_of_day = day not in days_seen
+                days_seen.add(day)
+                if age < grace_seconds:
+                    continue
+
+                keep = not prunes
+                if self.keep_last is not None and rank < self.keep_last:
+                    keep = True
+                if self.keep_daily_days is not None and newest_of_day and age <= self.keep_daily_days * _DAY:
+                    keep = True
+                if not keep:
+                    actions.append({**entry, "delete": True, "compress": False, "remote": False})
+                    continue
+
+                compress = (self.compress_after_days is not None and age >= self.compress_after_days * _DAY
+                            and not entry["name"].lower().endswith(COMPRESSED_EXTENSIONS))
+                remote = self.remote_after_days is not None and age >= self.remote_after_days * _DAY
+                if compress or remote:
+                    actions.append({**entry, "delete": False, "compress": compress, "remote": remote})
+        return actions
+
+class DirectoryStore:
+    """
+    A plain directory (such as output/images) with its own metadata index,
+    offering the parts of the LocalStorageAgent interface retention uses.
+    The index lives in .index.sqlite3 inside the directory and is rescanned
+    when new and then at most every reconcile_interval seconds.
+    """
+
+    def __init__(self, root: str, reconcile_interval: float = 86400):
+        """
+        Args:
+            root: Directory holding the files
+            reconcile_interval: Seconds between rescans of the directory into the index (0 = only when new)
+        """
+        self.storage_dir = root
+        os.makedirs(root, exist_ok=True)
+        self.index = StorageIndex(os.path.join(root, ".index.sqlite3"))
+        last_reconciled = self.index.last_reconciled()
+        if last_reconciled is None or (reconcile_interval and time.time() - last_reconciled > reconcile_interval):
+            self.index.reconcile(scan_tree(root))
+
+    def local_path(self, name: str) -> Optional[str]:
+        """Path of a file, or None if it does not exist."""
+        path = os.path.join(self.storage_dir, name)
+        return path if os.path.isfile(path) else None
+
+    def upload_file(self, file_path: str, destination_blob_name: str) -> Dict[str, Any]:
+        """Copy a file into the directory under a name."""
+        try:
+            destination = os.path.join(self.storage_dir, destination_blob_name)
+            os.makedirs(os.path.dirname(destination), exist_ok=True)
+            shutil.copy2(file_path, destination)
+            stat = os.stat(destination)
+            self.index.upsert(destination_blob_name, stat.st_size, stat.st_mtime)
+            return {"success": True, "path": destination, "blob_name": destination_blob_name}
+        except OSError as e:
+            return {"success": False, "error": str(e)}
+
+    def delete_file(self, blob_name: str) -> Dict[str, Any]:
+        """Delete a file from the directory."""
+        try:
+            os.remove(os.path.join(self.storage_dir, blob_name))
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            return {"success": False, "error": str(e)}
+        self.index.remove(blob_name)
+        return {"success": True, "blob_name": blob_name}
+
+    def collect_garbage(self) -> Dict[str, Any]:
+        """Deleting a file frees its space directly."""
+        return {"success": True, "bytes_reclaimed": 0}
+
+    def close(self) -> None:
+        """Close the index."""
+        self.index.close()
+
+class RetentionEngine:
+    """
+    Applies retention rules to their stores.
+
+    Each store is read once per rule prefix from its metadata index; when
+    prefixes overlap, a file belongs to the most specific rule only. Deletes,
+    compression and moves go through the store, so the index (and for local
+    storage the content store and backup index) stays consistent.
+    """
+
+    def __init__(self, rules: List[RetentionRule], stores: Dict[str, Any], remote=None,
+                 compression_level: int = 6, grace_seconds: float = 3600):
+        """
+        Args:
+            rules: Rules to apply
+            stores: Store per rule store name (LocalStorageAgent or DirectoryStore)
+            remote: Store that files are moved to (e.g. GCPStorageAgent); needed for remote_after_days
+            compression_level: gzip level for compressed files
+            grace_seconds: Files modified more recently than this are never touched
+        """
+        missing = {rule.store for rule in rules} - set(stores)
+        if missing:
+            raise ValueError(f"No store for retention rules on: {', '.join(sorted(missing))}")
+        self.rules = rules
+        self.stores = stores
+        self.remote = remote
+        self.compression_level = compression_level
+        self.grace_seconds = grace_seconds
+
+    def run(self, dry_run: bool = False) -> Dict[str, Any]:
+        """
+        Evaluate every rule and apply the results.
+
+        Args:
+            dry_run: Only report what would happen
+
+        Returns:
+            Dictionary with per-rule and total counts of files deleted,
+            compressed and moved, bytes_reclaimed (by file size), the bytes
+            garbage collection freed per store, and errors
+        """
+        start = time.perf_counter()
+        now = time.time()
+        claimed: Dict[str, set] = defaultdict(set)
+        reports = []
+        # Most specific prefix first, so each file is handled by one rule
+        for rule in sorted(self.rules, key=lambda rule: len(rule.prefix), reverse=True):
+            store = self.stores[rule.store]
+            entries = [entry for entry in store.index.list(rule.prefix or None)
+                       if entry["name"] not in claimed[rule.store]]
+            claimed[rule.store].update(entry["name"] for entry in entries)
+            actions = rule.evaluate(entries, now, self.grace_seconds)
+            report = {"store": rule.store, "prefix": rule.prefix, "files": len(entries), "deleted": 0,
+                      "compressed": 0, "moved": 0, "bytes_reclaimed": 0, "errors": []}
+            for action in actions:
+                if dry_run:
+                    self._count(report, action)
+                    continue
+                try:
+                    self._apply(rule, store, action, report)
+                except Exception as e:
+                    logger.error(f"Retention of {rule.store}:{action['name']} failed: {e}")
+                    report["errors"].append({"name": action["name"], "error": str(e)})
+            reports.append(report)
+
+        # Local storage only frees content no other name refers to
+        collected = {}
+        if not dry_run:
+            for name, store in self.stores.items():
+                if any(report["store"] == name and (report["deleted"] or report["compressed"] or report["moved"])
+                       for report in reports):
+                    collected[name] = store.collect_garbage().get("bytes_reclaimed", 0)
+
+        totals = {key: sum(report[key] for report in reports)
+                  for key in ("files", "deleted", "compressed", "moved", "bytes_reclaimed")}
+        result = {
+            "success": not any(report["errors"] for report in reports),
+            "dry_run": dry_run,
+            "rules": reports,
+            **totals,
+            "garbage_collected_bytes": collected,
+            "seconds": time.perf_counter() - start
+        }
+        logger.info(f"Retention{' (dry run)' if dry_run else ''}: {totals['deleted']} deleted, "
+                    f"{totals['compressed']} compressed, {totals['moved']} moved to remote, "
+                    f"{totals['bytes_reclaimed'] / 1e6:.1f} MB reclaimed from {totals['files']} files "
+                    f"in {result['seconds']:.2f}s")
+        return result
+
+    def _count(self, report: Dict[str, Any], action: Dict[str, Any]) -> None:
+        # Dry run: compressed sizes are unknown, so only deletes and moves count as reclaimed
+        if action["delete"]:
+            report["deleted"] += 1
+            report["bytes_reclaimed"] += action["size"]
+            return
+        if action["compress"]:
+            report["compressed"] += 1
+        if action["remote"]:
+            report["moved"] += 1
+            report["bytes_reclaimed"] += action["size"]
+
+    def _apply(self, rule: RetentionRule, store, action: Dict[str, Any], report: Dict[str, Any]) -> None:
+        name = action["name"]
+        if action["delete"]:
+            result = store.delete_file(name)
+            if not result.get("success"):
+                raise RuntimeError(result.get("error"))
+            report["deleted"] += 1
+            report["bytes_reclaimed"] += action["size"]
+            return
+
+        size = action["size"]
+        if action["compress"]:
+            name, compressed_size = self._compress(store, name, action["mtime"])
+            report["compressed"] += 1
+            report["bytes_reclaimed"] += size - compressed_size
+            size = compressed_size
+
+        if action["remote"]:
+            if self.remote is None:
+                raise RuntimeError("remote_after_days is set but no remote store is configured")
+            path = store.local_path(name)
+            if path is None:
+                raise RuntimeError("File disappeared before it could be moved")
+            result = self.remote.upload_file(path, rule.remote_prefix + name)
+            if not result.get("success"):
+                raise RuntimeError(result.get("error"))
+            result = store.delete_file(name)
+            if not result.get("success"):
+                raise RuntimeError(result.get("error"))
+            report["moved"] += 1
+            report["bytes_reclaimed"] += size
+
+    def _compress(self, store, name: str, mtime: float):
+        path = store.local_path(name)
+        if path is None:
+            raise RuntimeError("File disappeared before it could be compressed")
+        tmp_dir = os.path.join(store.storage_dir, ".retention_tmp")
+        os.makedirs(tmp_dir, exist_ok=True)
+        tmp_path = os.path.join(tmp_dir, uuid.uuid4().hex)
+        compressed_name = name + ".gz"
+        try:
+            with open(path, "rb") as source, gzip.open(tmp_path, "wb", compresslevel=self.compression_level) as target:
+                shutil.copyfileobj(source, target, 1 << 20)
+            # Keep the original age, so later rules (remote_after_days) still
+            # apply on time; every store carries the source mtime over, into
+            # the file itself or the content store's reference, so it also
+            # survives a later reconcile of the index
+            os.utime(tmp_path, (mtime, mtime))
+            result = store.upload_file(tmp_path, compressed_name)
+            if not result.get("success"):
+                raise RuntimeError(result.get("error"))
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        compressed_size = os.path.getsize(store.local_path(compressed_name))
+        result = store.delete_file(name)
+        if not result.get("success"):
+            raise RuntimeError(result.get("error"))
+        return compressed_name, compressed_size
+
+def build_retention_engine(config: Dict[str, Any], root_dir: str, local=None, remote=None) -> RetentionEngine:
+    """
+    Build the engine described by storage.retention in the config.
+
+    Args:
+        config: Parsed config.yaml
+        root_dir: Project root that directory stores are relative to
+        local: LocalStorageAgent for rules on "storage"
+        remote: Store for remote_after_days (e.g. GCPStorageAgent)
+
+    Returns:
+        RetentionEngine
+    """
+    storage_config = config.get("storage", {})
+    retention_config = storage_config.get("retention", {})
+    rules = [RetentionRule.from_config(rule) for rule in retention_config.get("rules", [])]
+    reconcile_interval = retention_config.get("reconcile_interval", 43200)
+    stores: Dict[str, Any] = {}
+    for rule in rules:
+        if rule.store in stores:
+            continue
+        if rule.store == "storage":
+            if local is None:
+                raise ValueError("Retention rules on storage need a LocalStorageAgent")
+            stores["storage"] = local
+        else:
+            stores[rule.store] = DirectoryStore(os.path.join(root_dir, rule.store), reconcile_interval)
+    return RetentionEngine(
+        rules, stores, remote=remote,
+        compression_level=retention_config.get("compression_level", 6),
+        grace_seconds=retention_config.get("grace_seconds", 3600)
+    )
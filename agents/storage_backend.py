@@ -0,0 +1,72 @@
+"""
+Storage Backends for The Elidoras Codex.
+The interface shared by LocalStorageAgent, GCPStorageAgent and
+TieredStorageAgent, and a factory that builds the backend selected in
+config.yaml, so callers do not hard-wire one storage service.
+"""
+from typing import Dict, Any, Optional, Protocol, runtime_checkable
+
+@runtime_checkable
+class StorageBackend(Protocol):
+    """
+    Operations every storage backend provides.
+
+    Every method returns a dictionary with "success" and, on failure,
+    "error", like the rest of the agents. Blob names are forward-slash
+    paths relative to the store (e.g. "images/cover.png").
+    """
+
+    def upload_file(self, file_path: str, destination_blob_name: Optional[str] = None) -> Dict[str, Any]:
+        """Store a local file under a blob name (default: the file name)."""
+        ...
+
+    def download_file(self, blob_name: str, destination_file_path: str) -> Dict[str, Any]:
+        """Copy a stored blob to a local file."""
+        ...
+
+    def list_files(self, prefix: Optional[str] = None) -> Dict[str, Any]:
+        """List stored blobs as "files": [{"name", "size", "updated"}]."""
+        ...
+
+    def delete_file(self, blob_name: str) -> Dict[str, Any]:
+        """Remove a stored blob."""
+        ...
+
+    def backup_wordpress_data(self, content_data: Dict[str, Any], backup_name: Optional[str] = None) -> Dict[str, Any]:
+        """Back up WordPress post data."""
+        ...
+
+    def flush_backups(self) -> Dict[str, Any]:
+        """Persist backups that are still buffered."""
+        ...
+
+def create_storage_backend(config_path: Optional[str] = None, default: str = "local") -> StorageBackend:
+    """
+    Build the storage backend selected by storage.backend in the config.
+
+    Args:
+        config_path: Path to config.yaml
+        default: Backend used when the config does not choose one
+                 ("local", "gcp" or "tiered")
+
+    Returns:
+        LocalStorageAgent, GCPStorageAgent or TieredStorageAgent
+    """
+    config = {}
+    if config_path:
+        import yaml
+        with open(config_path, "r") as f:
+            config = yaml.safe_load(f) or {}
+    backend = config.get("storage", {}).get("backend", default)
+
+    # Imported on demand so local-only setups never load the cloud client
+    if backend == "local":
+        from .local_storage import LocalStorageAgent
+        return LocalStorageAgent(config_path)
+    if backend == "gcp":
+        from .gcp_storage import GCPStorageAgent
+        return GCPStorageAgent(config_path)
+    if backend == "tiered":
+        from .tiered_storage import TieredStorageAgent
+        return TieredStorageAgent(config_path)
+    raise ValueError(f"Unknown storage backend: {backend}")
@@ -0,0 +1,275 @@
+"""
+Storage Index for The Elidoras Codex.
+A SQLite catalogue of the files in local storage (name, size, modification
+and access times), kept current by the storage agent as it writes and
+reconciled with the directory tree by an os.scandir scan, so listings and
+totals never have to walk the tree.
+"""
+import os
+import time
+import sqlite3
+import logging
+import threading
+from typing import Dict, Any, List, Optional, Iterable, Iterator, Tuple
+
+from .blob_store import prefix_upper_bound
+
+logger = logging.getLogger("TEC.StorageIndex")
+
+class StorageIndex:
+    """
+    Persistent metadata index of stored files.
+
+    Rows are keyed by file name (forward-slash relative path), so prefix
+    listings are range scans of the primary key. Totals are kept in a one-row
+    table by triggers, which makes the whole-store count and size O(1).
+    """
+
+    def __init__(self, db_path: str):
+        """
+        Open (or create) the index.
+
+        Args:
+            db_path: Path to the SQLite file
+        """
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS storage_files (
+                name TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime REAL NOT NULL,
+                accessed_at REAL
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS idx_storage_files_mtime ON storage_files (mtime);
+            CREATE INDEX IF NOT EXISTS idx_storage_files_last_used ON storage_files (COALESCE(accessed_at, mtime));
+            CREATE TABLE IF NOT EXISTS storage_totals (
+                id INTEGER PRIMARY KEY CHECK (id = 0),
+                files INTEGER NOT NULL,
+                bytes INTEGER NOT NULL
+            );
+            INSERT OR IGNORE INTO storage_totals (id, files, bytes) VALUES (0, 0, 0);
+            CREATE TRIGGER IF NOT EXISTS storage_files_insert AFTER INSERT ON storage_files BEGIN
+                UPDATE storage_totals SET files = files + 1, bytes = bytes + NEW.size WHERE id = 0;
+            END;
+            CREATE TRIGGER IF NOT EXISTS storage_files_delete AFTER DELETE ON storage_files BEGIN
+                UPDATE storage_totals SET files = files - 1, bytes = bytes - OLD.size WHERE id = 0;
+            END;
+            CREATE TRIGGER IF NOT EXISTS storage_files_update AFTER UPDATE OF size ON storage_files BEGIN
+                UPDATE storage_totals SET bytes = bytes - OLD.size + NEW.size WHERE id = 0;
+            END;
+            CREATE TABLE IF NOT EXISTS storage_index_meta (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            );
+            """
+        )
+        self._conn.commit()
+
+    def upsert(self, name: str, size: int, mtime: float) -> None:
+        """Record a file that was written."""
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    "INSERT INTO storage_files (name, size, mtime) VALUES (?, ?, ?) "
+                    "ON CONFLICT (name) DO UPDATE SET size = excluded.size, mtime = excluded.mtime",
+                    (name, size, mtime)
+                )
+
+    def touch(self, name: str, accessed_at: Optional[float] = None) -> None:
+        """Record that a file was read."""
+        with self._lock:
+            with self._conn:
+                self._conn.execute("UPDATE storage_files SET accessed_at = ? WHERE name = ?",
+                                   (accessed_at or time.time(), name))
+
+    def remove(self, name: str) -> None:
+        """Forget a deleted file."""
+        with self._lock:
+            with self._conn:
+                self._conn.execute("DELETE FROM storage_files WHERE name = ?", (name,))
+
+    def get(self, name: str) -> Optional[Dict[str, Any]]:
+        """Metadata of one file, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT name, size, mtime, accessed_at FROM storage_files WHERE name = ?", (name,)
+            ).fetchone()
+        return _row(row) if row else None
+
+    def list(self, prefix: Optional[str] = None, updated_since: Optional[float] = None,
+             limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        List files, sorted by name.
+
+        Args:
+            prefix: Only names starting with this
+            updated_since: Only files modified at or after this timestamp
+            limit: Maximum number of files
+
+        Returns:
+            List of dictionaries with name, size, mtime and accessed_at
+        """
+        where, params = _filters(prefix, updated_since)
+        query = f"SELECT name, size, mtime, accessed_at FROM storage_files{where} ORDER BY name"
+        if limit:
+            query += " LIMIT ?"
+            params += (limit,)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [_row(row) for row in rows]
+
+    def least_recently_used(self, limit: int = 1000,
+                            exclude_prefixes: Tuple[str, ...] = ()) -> List[Dict[str, Any]]:
+        """
+        Files in order of last use (access time, or modification time if never read).
+
+        Args:
+            limit: Maximum number of files
+            exclude_prefixes: Skip names starting with any of these
+
+        Returns:
+            List of dictionaries with name, size, mtime and accessed_at, least recently used first
+        """
+        clauses = []
+        params: tuple = ()
+        for prefix in exclude_prefixes:
+            clauses.append("NOT (name >= ? AND name < ?)")
+            params += (prefix, prefix_upper_bound(prefix))
+        where = " WHERE " + " AND ".join(clauses) if clauses else ""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT name, size, mtime, accessed_at FROM storage_files{where} "
+                "ORDER BY COALESCE(accessed_at, mtime), name LIMIT ?", params + (limit,)
+            ).fetchall()
+        return [_row(row) for row in rows]
+
+    def totals(self, prefix: Optional[str] = None, updated_since: Optional[float] = None) -> Dict[str, int]:
+        """
+        Number and total size of files.
+
+        Without filters this reads the trigger-maintained totals; with a prefix
+        it is a range scan over the matching names only.
+
+        Returns:
+            Dictionary with files and bytes
+        """
+        with self._lock:
+            if not prefix and updated_since is None:
+                files, total = self._conn.execute("SELECT files, bytes FROM storage_totals WHERE id = 0").fetchone()
+            else:
+                where, params = _filters(prefix, updated_since)
+                files, total = self._conn.execute(
+                    f"SELECT COUNT(*), COALESCE(SUM(size), 0) FROM storage_files{where}", params
+                ).fetchone()
+        return {"files": files, "bytes": total}
+
+    def last_reconciled(self) -> Optional[float]:
+        """Time of the last reconcile, or None if the index was never reconciled."""
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM storage_index_meta WHERE key = 'last_reconciled'").fetchone()
+        return float(row[0]) if row else None
+
+    def reconcile(self, entries: Iterable[Tuple[str, int, float]], batch_size: int = 5000) -> Dict[str, int]:
+        """
+        Make the index match a full listing of storage.
+
+        The listing is staged in a temporary table and compared in SQL, so
+        memory use stays flat however many files there are. Access times of
+        files that are still present are kept.
+
+        Args:
+            entries: (name, size, mtime) of every stored file
+            batch_size: Rows staged per insert
+
+        Returns:
+            Dictionary with added, updated and removed counts
+        """
+        with self._lock:
+            self._conn.execute("DROP TABLE IF EXISTS temp.storage_scan")
+            self._conn.execute(
+                "CREATE TEMP TABLE storage_scan (name TEXT PRIMARY KEY, size INTEGER, mtime REAL) WITHOUT ROWID"
+            )
+            batch = []
+            for entry in entries:
+                batch.append(entry)
+                if len(batch) >= batch_size:
+                    self._conn.executemany("INSERT OR REPLACE INTO storage_scan VALUES (?, ?, ?)", batch)
+                    batch = []
+            if batch:
+                self._conn.executemany("INSERT OR REPLACE INTO storage_scan VALUES (?, ?, ?)", batch)
+
+            with self._conn:
+                removed = self._conn.execute(
+                    "DELETE FROM storage_files WHERE name NOT IN (SELECT name FROM storage_scan)"
+                ).rowcount
+                updated = self._conn.execute(
+                    "UPDATE storage_files SET size = s.size, mtime = s.mtime FROM storage_scan AS s "
+                    "WHERE storage_files.name = s.name "
+                    "AND (storage_files.size != s.size OR storage_files.mtime != s.mtime)"
+                ).rowcount
+                added = self._conn.execute(
+                    "INSERT INTO storage_files (name, size, mtime) SELECT name, size, mtime FROM storage_scan "
+                    "WHERE name NOT IN (SELECT name FROM storage_files)"
+                ).rowcount
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO storage_index_meta (key, value) VALUES ('last_reconciled', ?)",
+                    (str(time.time()),)
+                )
+            self._conn.execute("DROP TABLE temp.storage_scan")
+        result = {"added": added, "updated": updated, "removed": removed}
+        logger.info(f"Reconciled storage index: {added} added, {updated} updated, {removed} removed")
+        return result
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+def scan_tree(root: str, skip_hidden_root: bool = True) -> Iterator[Tuple[str, int, float]]:
+    """
+    Yield (name, size, mtime) for every file under root using os.scandir.
+
+    Args:
+        root: Directory to scan
+        skip_hidden_root: Skip dot-entries directly under root (internal stores and indexes)
+    """
+    stack = [("", root)]
+    while stack:
+        relative, directory = stack.pop()
+        try:
+            entries = os.scandir(directory)
+        except OSError as e:
+            logger.warning(f"Cannot scan {directory}: {e}")
+            continue
+        with entries:
+            for entry in entries:
+                if skip_hidden_root and not relative and entry.name.startswith("."):
+                    continue
+                name = f"{relative}/{entry.name}" if relative else entry.name
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append((name, entry.path))
+                    elif entry.is_file():
+                        stat = entry.stat()
+                        yield name, stat.st_size, stat.st_mtime
+                except OSError:
+                    continue
+
+def _filters(prefix: Optional[str], updated_since: Optional[float]) -> Tuple[str, tuple]:
+    clauses = []
+    params: tuple = ()
+    if prefix:
+        clauses.append("name >= ? AND name < ?")
+        params += (prefix, prefix_upper_bound(prefix))
+    if updated_since is not None:
+        clauses.append("mtime >= ?")
+        params += (updated_since,)
+    return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+def _row(row: tuple) -> Dict[str, Any]:
+    return {"name": row[0], "size": row[1], "mtime": row[2], "accessed_at": row[3]}
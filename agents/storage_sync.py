@@ -0,0 +1,356 @@
+"""
+Storage Sync for The Elidoras Codex.
+Mirrors local storage to a Cloud Storage bucket (or back) the way rsync does:
+local entries from the metadata index are compared with the bucket listing
+by size and checksum, and only files that differ are transferred, in
+parallel. A sync state table remembers the local size/mtime and the remote
+generation of every file that was in sync, so unchanged files are skipped
+without being read again and a nightly mirror costs a listing plus the
+changes.
+"""
+import os
+import time
+import uuid
+import base64
+import shutil
+import sqlite3
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
+
+try:
+    import google_crc32c
+except ImportError:  # pragma: no cover - installed with google-cloud-storage
+    google_crc32c = None
+
+logger = logging.getLogger("TEC.StorageSync")
+
+# Temporary objects of composite uploads are never mirrored
+_PARTS_MARKER = ".__parts__/"
+
+class SyncState:
+    """
+    Last known in-sync state of each file: local size and mtime, remote
+    generation and the local checksums computed for it.
+    """
+
+    def __init__(self, db_path: str):
+        """
+        Open (or create) the state table.
+
+        Args:
+            db_path: Path to the SQLite file
+        """
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS sync_state (
+                name TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime REAL NOT NULL,
+                generation INTEGER,
+                md5_hash TEXT,
+                crc32c TEXT,
+                synced_at REAL NOT NULL
+            ) WITHOUT ROWID
+            """
+        )
+        self._conn.commit()
+
+    def load(self, prefix: str = "") -> Dict[str, Dict[str, Any]]:
+        """State of every file under a prefix, keyed by name."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT name, size, mtime, generation, md5_hash, crc32c FROM sync_state "
+                "WHERE name >= ? AND name < ?", (prefix, prefix + "\U0010ffff")
+            ).fetchall()
+        return {row[0]: {"size": row[1], "mtime": row[2], "generation": row[3], "md5_hash": row[4],
+                         "crc32c": row[5]} for row in rows}
+
+    def record(self, entries: List[Tuple[str, int, float, Optional[int], Optional[str], Optional[str]]]) -> None:
+        """Store (name, size, mtime, generation, md5_hash, crc32c) rows."""
+        if not entries:
+            return
+        now = time.time()
+        with self._lock:
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO sync_state (name, size, mtime, generation, md5_hash, crc32c, synced_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)", [(*entry, now) for entry in entries]
+                )
+
+    def remove(self, names: List[str]) -> None:
+        """Forget files that no longer exist on either side."""
+        with self._lock:
+            with self._conn:
+                self._conn.executemany("DELETE FROM sync_state WHERE name = ?", [(name,) for name in names])
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+def file_checksums(path: str, block_size: int = 1 << 20) -> Tuple[str, Optional[str]]:
+    """
+    MD5 and CRC32C of a file in one read, base64-encoded as Cloud Storage reports them.
+
+    Returns:
+        Tuple of (md5_hash, crc32c); crc32c is None without google-crc32c
+    """
+    md5 = hashlib.md5()
+    crc = google_crc32c.Checksum() if google_crc32c else None
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(block_size)
+            if not block:
+                break
+            md5.update(block)
+            if crc:
+                crc.update(block)
+    return (base64.b64encode(md5.digest()).decode(),
+            base64.b64encode(crc.digest()).decode() if crc else None)
+
+class StorageSync:
+    """
+    One-way sync between a LocalStorageAgent and a GCPStorageAgent.
+
+    direction "upload" makes the bucket match local storage; "download"
+    makes local storage match the bucket. Files present only on the
+    destination are deleted when delete is set, and reported otherwise.
+    A file is unchanged when its local size and mtime and its remote
+    generation match the last sync; failing that, when sizes match and the
+    local MD5 (or CRC32C for composite objects, which have no MD5) matches
+    the remote checksum.
+    """
+
+    def __init__(self, local, remote, state_path: Optional[str] = None, workers: Optional[int] = None):
+        """
+        Args:
+            local: LocalStorageAgent
+            remote: GCPStorageAgent
+            state_path: Sync state database (default: .sync.sqlite3 in the storage directory)
+            workers: Concurrent checksums and deletes (default: the remote's transfer workers)
+        """
+        self.local = local
+        self.remote = remote
+        self.state = SyncState(state_path or os.path.join(local.storage_dir, ".sync.sqlite3"))
+        self.workers = max(1, workers or remote.transfer_config.get("workers", 8))
+
+    def plan(self, prefix: str = "", direction: str = "upload", delete: bool = False,
+             exclude_prefixes: Tuple[str, ...] = ()) -> Dict[str, Any]:
+        """
+        Work out what a sync would transfer, without changing either side.
+
+        Args:
+            prefix: Only sync names starting with this
+            direction: "upload" (local to bucket) or "download" (bucket to local)
+            delete: Delete files that exist only on the destination
+            exclude_prefixes: Skip names starting with any of these
+
+        Returns:
+            Dictionary with transfer (name, reason, bytes), delete and extraneous
+            name lists, unchanged and hashed counts, and transfer_bytes
+        """
+        return self._plan(prefix, direction, delete, exclude_prefixes)[0]
+
+    def sync(self, prefix: str = "", direction: str = "upload", delete: bool = False,
+             dry_run: bool = False, exclude_prefixes: Tuple[str, ...] = ()) -> Dict[str, Any]:
+        """
+        Make the destination match the source under a prefix.
+
+        Args:
+            prefix: Only sync names starting with this
+            direction: "upload" (local to bucket) or "download" (bucket to local)
+            delete: Delete files that exist only on the destination
+            dry_run: Only report what would be transferred and deleted
+            exclude_prefixes: Skip names starting with any of these
+
+        Returns:
+            The plan, plus transferred/failed/deleted counts, retries and
+            throughput when not a dry run
+        """
+        start = time.perf_counter()
+        plan, remote = self._plan(prefix, direction, delete, exclude_prefixes)
+        result = {"success": True, "dry_run": dry_run, **plan}
+        logger.info(f"Sync {direction} {prefix or '(all)'}: {len(plan['transfer'])} to transfer "
+                    f"({plan['transfer_bytes'] / 1e6:.1f} MB), {len(plan['delete'])} to delete, "
+                    f"{plan['unchanged']} unchanged ({plan['hashed']} checksummed)")
+        if dry_run:
+            result["seconds"] = time.perf_counter() - start
+            return result
+
+        names = [item["name"] for item in plan["transfer"]]
+        if direction == "upload":
+            summary = self._upload(names)
+            deleted = self._delete_remote(plan["delete"])
+        else:
+            summary = self._download(names, remote)
+            deleted = self._delete_local(plan["delete"])
+        self.state.remove(deleted)
+
+        result.update({
+            "success": summary["failed"] == 0 and len(deleted) == len(plan["delete"]),
+            "transferred": summary["transferred"],
+            "failed": summary["failed"],
+            "errors": [{"name": item["blob_name"], "error": item["error"]}
+                       for item in summary["files"] if not item["success"]],
+            "deleted": len(deleted),
+            "bytes": summary["bytes"],
+            "retries": summary["retries"],
+            "seconds": time.perf_counter() - start,
+            "throughput_mb_s": summary["throughput_mb_s"]
+        })
+        return result
+
+    def close(self) -> None:
+        """Close the sync state database."""
+        self.state.close()
+
+    def _plan(self, prefix: str, direction: str, delete: bool,
+              exclude_prefixes: Tuple[str, ...]) -> Tuple[Dict[str, Any], Dict[str, Dict[str, Any]]]:
+        if direction not in ("upload", "download"):
+            raise ValueError(f"Unknown sync direction: {direction}")
+        listing = self.remote.list_files(prefix or None)
+        if not listing.get("success"):
+            raise RuntimeError(f"Cannot list bucket: {listing.get('error')}")
+
+        def included(name: str) -> bool:
+            return _PARTS_MARKER not in name and not name.startswith(tuple(exclude_prefixes))
+
+        local = {entry["name"]: entry for entry in self.local.index.list(prefix or None) if included(entry["name"])}
+        remote = {entry["name"]: entry for entry in listing["files"] if included(entry["name"])}
+        state = self.state.load(prefix)
+
+        transfer, unchanged, to_hash = [], [], []
+        for name in sorted(local.keys() & remote.keys()):
+            l, r, s = local[name], remote[name], state.get(name)
+            if s and s["size"] == l["size"] and s["mtime"] == l["mtime"] and s["generation"] == r["generation"]:
+                unchanged.append(name)
+            elif l["size"] != r["size"]:
+                transfer.append((name, "size"))
+            else:
+                to_hash.append(name)
+
+        recorded = []
+        for name, matches, checksums in self._compare_checksums(to_hash, local, remote, state):
+            if matches:
+                unchanged.append(name)
+                recorded.append((name, local[name]["size"], local[name]["mtime"], remote[name]["generation"],
+                                 *checksums))
+            else:
+                transfer.append((name, "checksum"))
+        # Files found equal by checksum now match on size, mtime and generation
+        self.state.record(recorded)
+
+        source, destination = (local, remote) if direction == "upload" else (remote, local)
+        transfer.extend((name, "new") for name in sorted(source.keys() - destination.keys()))
+        only_destination = sorted(destination.keys() - source.keys())
+        transfer = [{"name": name, "reason": reason, "bytes": source[name]["size"]}
+                    for name, reason in sorted(transfer)]
+        return {
+            "direction": direction,
+            "prefix": prefix,
+            "transfer": transfer,
+            "delete": only_destination if delete else [],
+            "extraneous": [] if delete else only_destination,
+            "unchanged": len(unchanged),
+            "hashed": len(to_hash),
+            "transfer_bytes": sum(item["bytes"] for item in transfer)
+        }, remote
+
+    def _compare_checksums(self, names: List[str], local: Dict[str, Dict[str, Any]],
+                           remote: Dict[str, Dict[str, Any]], state: Dict[str, Dict[str, Any]]):
+        def compare(name: str):
+            l, r, s = local[name], remote[name], state.get(name)
+            if s and s["size"] == l["size"] and s["mtime"] == l["mtime"] and s["md5_hash"]:
+                # Local file unchanged since it was last hashed; only the remote moved
+                checksums = (s["md5_hash"], s["crc32c"])
+            else:
+                path = self.local.local_path(name)
+                if path is None:
+                    return name, False, (None, None)
+                checksums = file_checksums(path)
+            if r.get("md5_hash"):
+                return name, checksums[0] == r["md5_hash"], checksums
+            if r.get("crc32c") and checksums[1]:
+                return name, checksums[1] == r["crc32c"], checksums
+            # Nothing to compare against; transferring is the safe choice
+            return name, False, checksums
+
+        if not names:
+            return []
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="sync-hash") as pool:
+            return list(pool.map(compare, names))
+
+    def _upload(self, names: List[str]) -> Dict[str, Any]:
+        items, sizes, missing = [], {}, []
+        for name in names:
+            path = self.local.local_path(name)
+            entry = self.local.index.get(name)
+            if path is None or entry is None:
+                missing.append({"file": None, "blob_name": name, "success": False, "bytes": 0,
+                                "error": "Local file disappeared during sync"})
+                continue
+            items.append((path, name))
+            sizes[name] = entry
+        summary = self.remote.bulk_transfer().upload_many(items) if items else _empty_summary()
+        self.state.record([(item["blob_name"], sizes[item["blob_name"]]["size"], sizes[item["blob_name"]]["mtime"],
+                            item.get("generation"), None, None)
+                           for item in summary["files"] if item["success"]])
+        return _with_failures(summary, missing)
+
+    def _download(self, names: List[str], remote: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        staging = os.path.join(self.local.storage_dir, ".sync_tmp", uuid.uuid4().hex)
+        items = [(name, os.path.join(staging, f"{index:08d}")) for index, name in enumerate(names)]
+        try:
+            summary = self.remote.bulk_transfer().download_many(items) if items else _empty_summary()
+            recorded = []
+            for item in summary["files"]:
+                if not item["success"]:
+                    continue
+                stored = self.local.upload_file(item["file"], item["blob_name"])
+                entry = self.local.index.get(item["blob_name"]) if stored.get("success") else None
+                if entry is None:
+                    item.update(success=False, error=stored.get("error", "Not recorded in the local index"))
+                    continue
+                recorded.append((item["blob_name"], entry["size"], entry["mtime"],
+                                 remote[item["blob_name"]]["generation"], None, None))
+            self.state.record(recorded)
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+        failed = [item for item in summary["files"] if not item["success"]]
+        summary.update(transferred=len(summary["files"]) - len(failed), failed=len(failed),
+                       bytes=sum(item["bytes"] for item in summary["files"] if item["success"]))
+        return summary
+
+    def _delete_remote(self, names: List[str]) -> List[str]:
+        def delete(name: str) -> bool:
+            result = self.remote.delete_file(name)
+            return result.get("success") or result.get("not_found", False)
+
+        if not names:
+            return []
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="sync-delete") as pool:
+            return [name for name, ok in zip(names, pool.map(delete, names)) if ok]
+
+    def _delete_local(self, names: List[str]) -> List[str]:
+        deleted = [name for name in names if self.local.delete_file(name).get("success")]
+        if deleted:
+            self.local.collect_garbage()
+        return deleted
+
+def _empty_summary() -> Dict[str, Any]:
+    return {"files": [], "transferred": 0, "failed": 0, "bytes": 0, "retries": 0, "seconds": 0.0,
+            "throughput_mb_s": 0.0}
+
+def _with_failures(summary: Dict[str, Any], failures: List[Dict[str, Any]]) -> Dict[str, Any]:
+    if failures:
+        summary = {**summary, "files": summary["files"] + failures, "failed": summary["failed"] + len(failures)}
+    return summary
@@ -3,11 +3,13 @@ TECBot - The primary automation bot for The Elidoras Codex.
 Handles interactions with AI services and workflow orchestration.
 """
 import os
-import json
 import logging
 from typing import Dict, Any, List, Optional
+import openai
 
 from .base_agent import BaseAgent
+from .llm_cache import get_llm_cache
+from .prompt_templates import get_prompt_registry
 
 class TECBot(BaseAgent):
     """
@@ -19,65 +21,104 @@ class TECBot(BaseAgent):
         super().__init__("TECBot", config_path)
         self.logger.info("TECBot initialized")
         
-        # Load prompts for AI interactions
-        self.prompts = self._load_prompts()
+        # Compiled prompt templates, shared with the other agents in this process
+        self.prompts = get_prompt_registry()
         
         # Initialize API keys for AI services
         self.openai_api_key = os.getenv("OPENAI_API_KEY")
-        if not self.openai_api_key:
+        if self.openai_api_key:
+            openai.api_key = self.openai_api_key
+        else:
             self.logger.warning("OpenAI API key not found in environment variables.")
+        
+        # Model settings and the shared response cache
+        tecbot_config = self.config.get("agents", {}).get("tecbot", {})
+        self.model = tecbot_config.get("model", "gpt-4")
+        self.max_tokens = tecbot_config.get("max_tokens", 2000)
+        self.temperature = tecbot_config.get("temperature", 0.7)
+        cache_config = self.config.get("llm_cache", {})
+        self.llm_cache = get_llm_cache(cache_config)
+        self.cache_forced_prompts = set(cache_config.get("force_prompts", ["post_title_generator"]))
     
-    def _load_prompts(self) -> Dict[str, str]:
+    def is_cached(self, prompt_key: str, variables: Dict[str, str], force_cache: Optional[bool] = None) -> bool:
         """
-        Load prompts for AI interactions from the prompts.json file.
+        Whether generate_content would be answered from the response cache.
+        
+        Lets callers that rate-limit API calls send only the misses through the limiter.
+        
+        Args:
+            prompt_key: Key of the prompt template in prompts.json
+            variables: Variables to substitute in the prompt template
+            force_cache: As for generate_content
         
         Returns:
-            Dictionary of prompts for different AI interactions
+            True if the rendered prompt has a cached response
         """
-        try:
-            prompts_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 
-                                       "config", "prompts.json")
-            with open(prompts_path, 'r') as f:
-                prompts = json.load(f)
-            self.logger.info(f"Loaded {len(prompts)} prompts from {prompts_path}")
-            return prompts
-        except Exception as e:
-            self.logger.error(f"Failed to load prompts: {e}")
-            return {}
+        if not self.llm_cache:
+            return False
+        template = self.prompts.template(prompt_key)
+        if template is None or template.missing(variables):
+            return False
+        if force_cache is None:
+            force_cache = prompt_key in self.cache_forced_prompts
+        return self.llm_cache.contains(self.model, template.render(variables), self.temperature,
+                                       self.max_tokens, force=force_cache)
     
-    def generate_content(self, prompt_key: str, variables: Dict[str, str]) -> str:
+    def generate_content(self, prompt_key: str, variables: Dict[str, str],
+                         force_cache: Optional[bool] = None) -> str:
         """
         Generate content using AI based on a prompt template.
         
         Args:
             prompt_key: Key of the prompt template in prompts.json
             variables: Variables to substitute in the prompt template
+            force_cache: Cache the response even at a non-deterministic temperature
+                         (defaults to whether the prompt is listed in llm_cache.force_prompts)
         
         Returns:
             Generated content from the AI
         """
-        if not self.openai_api_key:
-            self.logger.error("Cannot generate content: OpenAI API key not set")
-            return "Error: OpenAI API key not configured"
+        if force_cache is None:
+            force_cache = prompt_key in self.cache_forced_prompts
         
         try:
-            # Get the prompt template
-            prompt_template = self.prompts.get(prompt_key)
-            if not prompt_template:
+            # Get the compiled prompt template
+            template = self.prompts.template(prompt_key)
+            if template is None:
                 self.logger.error(f"Prompt template '{prompt_key}' not found")
                 return f"Error: Prompt template '{prompt_key}' not found"
             
-            # Substitute variables in the prompt template
-            prompt = prompt_template
-            for key, value in variables.items():
-                prompt = prompt.replace(f"{{{{{key}}}}}", value)
+            # Check the variables before rendering (and before any API call)
+            missing = template.missing(variables)
+            if missing:
+                self.logger.error(f"Prompt template '{prompt_key}' is missing variables: {', '.join(missing)}")
+                return f"Error: Prompt template '{prompt_key}' is missing variables: {', '.join(missing)}"
+            prompt = template.render(variables)
+            
+            if self.llm_cache:
+                cached = self.llm_cache.get(self.model, prompt, self.temperature, self.max_tokens,
+                                            force=force_cache)
+                if cached is not None:
+                    self.logger.info(f"Served content for prompt '{prompt_key}' from cache")
+                    return cached
+            
+            if not self.openai_api_key:
+                self.logger.error("Cannot generate content: OpenAI API key not set")
+                return "Error: OpenAI API key not configured"
             
-            # Here you would call the OpenAI API to generate content
-            # This is a placeholder for actual API implementation
             self.logger.info(f"Generating content for prompt '{prompt_key}'")
-            # content = call_openai_api(prompt)
-            content = f"This is placeholder content for {prompt_key}"
+            response = openai.chat.completions.create(
+                model=self.model,
+                messages=[{"role": "user", "content": prompt}],
+                max_tokens=self.max_tokens,
+                n=1,
+                temperature=self.temperature,
+            )
+            content = (response.choices[0].message.content or "").strip()
             
+            if self.llm_cache:
+                self.llm_cache.set(self.model, prompt, self.temperature, self.max_tokens, content,
+                                   force=force_cache)
             return content
         except Exception as e:
             self.logger.error(f"Failed to generate content: {e}")
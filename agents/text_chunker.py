@@ -0,0 +1,199 @@
+"""
+Text Chunker for The Elidoras Codex.
+Streams paragraphs out of text and DOCX sources and packs them into
+size-bounded, optionally overlapping chunks, so large exports are chunked
+without ever holding the whole document in memory.
+"""
+import os
+import zipfile
+import logging
+from collections import deque
+from xml.etree import ElementTree
+from typing import Iterator, Iterable, Callable, Union
+
+logger = logging.getLogger("TEC.TextChunker")
+
+TEXT_EXTENSIONS = (".txt", ".md", ".text")
+DOCX_EXTENSIONS = (".docx",)
+
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+def count_chars(text: str) -> int:
+    """Size of a text in characters."""
+    return len(text)
+
+def count_tokens(text: str) -> int:
+    """Approximate size of a text in tokens (~4 characters per token)."""
+    return max(1, (len(text) + 3) // 4)
+
+SIZE_FUNCTIONS = {"chars": count_chars, "tokens": count_tokens}
+
+def iter_text_paragraphs(file_path: str, encoding: str = "utf-8",
+                         max_paragraph_chars: int = 65536) -> Iterator[str]:
+    """
+    Yield the blank-line separated paragraphs of a text file.
+
+    The file is read in bounded pieces, so a file without blank lines (or with
+    one enormous line) is yielded in max_paragraph_chars slices instead of
+    being loaded whole.
+
+    Args:
+        file_path: Path to the text file
+        encoding: File encoding
+        max_paragraph_chars: Longest paragraph yielded in one piece
+    """
+    pieces = []
+    size = 0
+    with open(file_path, "r", encoding=encoding) as f:
+        for piece in iter(lambda: f.readline(max_paragraph_chars), ""):
+            if not piece.strip() and piece.endswith("\n"):
+                if pieces:
+                    yield "".join(pieces).strip()
+                    pieces, size = [], 0
+                continue
+            pieces.append(piece)
+            size += len(piece)
+            if size >= max_paragraph_chars:
+                yield "".join(pieces).strip()
+                pieces, size = [], 0
+    if pieces and "".join(pieces).strip():
+        yield "".join(pieces).strip()
+
+def iter_docx_paragraphs(file_path: str) -> Iterator[str]:
+    """
+    Yield the non-empty paragraphs of a DOCX file, tables included.
+
+    word/document.xml is parsed incrementally straight from the archive and
+    finished elements are discarded as it goes, so memory use does not grow
+    with the document.
+
+    Args:
+        file_path: Path to the DOCX file
+    """
+    with zipfile.ZipFile(file_path) as archive:
+        with archive.open("word/document.xml") as document:
+            body = None
+            texts = []
+            for event, element in ElementTree.iterparse(document, events=("start", "end")):
+                if event == "start":
+                    if element.tag == _W + "body":
+                        body = element
+                    continue
+                tag = element.tag
+                if tag == _W + "t":
+                    texts.append(element.text or "")
+                elif tag == _W + "tab":
+                    texts.append("\t")
+                elif tag in (_W + "br", _W + "cr"):
+                    texts.append("\n")
+                elif tag == _W + "p":
+                    paragraph = "".join(texts)
+                    texts = []
+                    if paragraph.strip():
+                        yield paragraph
+                if body is not None and element in body:
+                    # A top-level block (paragraph, table, ...) is complete; drop it
+                    body.remove(element)
+
+def iter_paragraphs(file_path: str) -> Iterator[str]:
+    """
+    Yield the paragraphs of a supported file.
+
+    Args:
+        file_path: Path to a .txt, .md, .text or .docx file
+
+    Raises:
+        ValueError: If the file extension is not supported
+    """
+    ext = os.path.splitext(file_path)[1].lower()
+    if ext in DOCX_EXTENSIONS:
+        return iter_docx_paragraphs(file_path)
+    if ext in TEXT_EXTENSIONS:
+        return iter_text_paragraphs(file_path)
+    raise ValueError(f"Unsupported file extension: {ext}")
+
+def iter_chunks(paragraphs: Iterable[str], max_size: int = 1000, overlap: int = 0,
+                size: Union[str, Callable[[str], int]] = "chars") -> Iterator[str]:
+    """
+    Pack paragraphs into chunks of at most max_size.
+
+    Paragraphs are kept whole where possible and joined with blank lines;
+    a paragraph larger than max_size is split on whitespace. With overlap,
+    each chunk starts with the trailing paragraphs of the previous one, up to
+    overlap in size.
+
+    Args:
+        paragraphs: Paragraph iterator (consumed lazily)
+        max_size: Maximum chunk size
+        overlap: Size of the trailing context repeated at the start of the next chunk
+        size: "chars", "tokens" or a callable measuring a text
+
+    Yields:
+        Chunks of text
+    """
+    measure = SIZE_FUNCTIONS[size] if isinstance(size, str) else size
+    joiner_size = measure("\n\n")
+    window = deque()
+    # Size of the window's pieces; the joined chunk adds a joiner between each pair
+    total = 0
+    fresh = False
+    for paragraph in paragraphs:
+        for piece in _split_oversized(paragraph.strip(), max_size, measure):
+            piece_size = measure(piece)
+            if fresh and total + piece_size + joiner_size * len(window) > max_size:
+                yield "\n\n".join(text for text, _ in window)
+                fresh = False
+                while window and total + joiner_size * (len(window) - 1) > overlap:
+                    total -= window.popleft()[1]
+            while window and total + piece_size + joiner_size * len(window) > max_size:
+                total -= window.popleft()[1]
+            window.append((piece, piece_size))
+            total += piece_size
+            fresh = True
+    if fresh:
+        yield "\n\n".join(text for text, _ in window)
+
+def iter_file_chunks(file_path: str, max_size: int = 1000, overlap: int = 0,
+                     size: Union[str, Callable[[str], int]] = "chars") -> Iterator[str]:
+    """
+    Stream a file's chunks.
+
+    Args:
+        file_path: Path to a supported file
+        max_size: Maximum chunk size
+        overlap: Size of the trailing context repeated at the start of the next chunk
+        size: "chars", "tokens" or a callable measuring a text
+
+    Yields:
+        Chunks of text
+    """
+    return iter_chunks(iter_paragraphs(file_path), max_size, overlap, size)
+
+def _split_oversized(paragraph: str, max_size: int, measure: Callable[[str], int]) -> Iterator[str]:
+    if not paragraph:
+        return
+    if measure(paragraph) <= max_size:
+        yield paragraph
+        return
+    words = []
+    total = 0
+    for word in _split_words(paragraph, max_size, measure):
+        word_size = measure(word) + 1
+        if words and total + word_size > max_size:
+            yield " ".join(words)
+            words, total = [], 0
+        words.append(word)
+        total += word_size
+    if words:
+        yield " ".join(words)
+
+def _split_words(paragraph: str, max_size: int, measure: Callable[[str], int]) -> Iterator[str]:
+    for word in paragraph.split():
+        word_size = measure(word)
+        if word_size < max_size:
+            yield word
+            continue
+        # A single run of text longer than a chunk (e.g. an encoded blob) is cut into slices
+        step = max(1, int(len(word) * (max_size - 1) / word_size))
+        for start in range(0, len(word), step):
+            yield word[start:start + step]
@@ -0,0 +1,665 @@
+"""
+Tiered Storage for The Elidoras Codex.
+Puts the local store in front of a remote one: writes land locally and are
+replicated to the remote in the background through a durable queue, and
+reads are served from the local store, which keeps recently used remote
+files as an LRU cache. The pipeline only ever waits on the local disk.
+"""
+import os
+import json
+import time
+import uuid
+import sqlite3
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+
+from .base_agent import BaseAgent
+from .blob_store import normalize_name
+from .storage_backend import StorageBackend
+
+logger = logging.getLogger("TEC.ReplicationQueue")
+
+class ReplicationQueue:
+    """
+    Durable queue of changes waiting to be applied to the remote store.
+
+    Entries are uploads, deletes or backups. A newer upload or delete of a
+    name replaces an older one that has not started, and a name is never
+    replicated by two workers at once, so the remote ends up in the order
+    the changes were made. The queue also remembers which names are known
+    to be on the remote; only those may be evicted from the local store.
+    """
+
+    def __init__(self, db_path: str):
+        """
+        Open (or create) the queue.
+
+        Args:
+            db_path: Path to the SQLite file
+        """
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS replication_queue (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                op TEXT NOT NULL,
+                name TEXT NOT NULL,
+                payload TEXT,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at REAL NOT NULL,
+                last_error TEXT,
+                created_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_replication_due ON replication_queue (status, next_attempt_at);
+            CREATE INDEX IF NOT EXISTS idx_replication_name ON replication_queue (name, status);
+            CREATE TABLE IF NOT EXISTS remote_names (
+                name TEXT PRIMARY KEY,
+                replicated_at REAL NOT NULL
+            ) WITHOUT ROWID;
+            """
+        )
+        self._conn.commit()
+
+        with self._lock:
+            recovered = self._conn.execute(
+                "UPDATE replication_queue SET status = 'pending' WHERE status = 'in_flight'"
+            ).rowcount
+            self._conn.commit()
+        if recovered:
+            logger.info(f"Returned {recovered} in-flight replications to pending in {db_path}")
+
+    def enqueue(self, op: str, name: str, payload: Optional[str] = None) -> int:
+        """
+        Queue a change for the remote store.
+
+        Args:
+            op: "upload", "delete" or "backup"
+            name: Blob or backup name
+            payload: Data for the operation (backups: the JSON document)
+
+        Returns:
+            ID of the queue entry
+        """
+        now = time.time()
+        with self._lock:
+            with self._conn:
+                if op in ("upload", "delete"):
+                    self._conn.execute(
+                        "DELETE FROM replication_queue WHERE name = ? AND op IN ('upload', 'delete') "
+                        "AND status IN ('pending', 'failed')", (name,)
+                    )
+                cursor = self._conn.execute(
+                    "INSERT INTO replication_queue (op, name, payload, next_attempt_at, created_at) "
+                    "VALUES (?, ?, ?, ?, ?)", (op, name, payload, now, now)
+                )
+            return cursor.lastrowid
+
+    def claim(self, limit: int = 1) -> List[Dict[str, Any]]:
+        """
+        Claim due entries whose name is not already being replicated, and mark them in flight.
+
+        Returns:
+            List of entries with id, op, name, payload and attempts
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, op, name, payload, attempts FROM replication_queue "
+                "WHERE status = 'pending' AND next_attempt_at <= ? "
+                "AND name NOT IN (SELECT name FROM replication_queue WHERE status = 'in_flight') "
+                "ORDER BY id LIMIT ?", (time.time(), limit)
+            ).fetchall()
+            if not rows:
+                return []
+            with self._conn:
+                self._conn.executemany(
+                    "UPDATE replication_queue SET status = 'in_flight', attempts = attempts + 1 WHERE id = ?",
+                    [(row["id"],) for row in rows]
+                )
+        return [{**dict(row), "attempts": row["attempts"] + 1} for row in rows]
+
+    def mark_done(self, entry: Dict[str, Any]) -> None:
+        """Remove a replicated entry and record whether its name is now on the remote."""
+        with self._lock:
+            with self._conn:
+                self._conn.execute("DELETE FROM replication_queue WHERE id = ?", (entry["id"],))
+                if entry["op"] == "upload":
+                    self._conn.execute("INSERT OR REPLACE INTO remote_names (name, replicated_at) VALUES (?, ?)",
+                                       (entry["name"], time.time()))
+                elif entry["op"] == "delete":
+                    self._conn.execute("DELETE FROM remote_names WHERE name = ?", (entry["name"],))
+
+    def mark_failed(self, entry_id: int, error: str, retry_delay: Optional[float] = None) -> None:
+        """
+        Record a failed replication attempt.
+
+        Args:
+            entry_id: ID of the queue entry
+            error: Error message from the attempt
+            retry_delay: Seconds until the entry is due again, or None to give up
+        """
+        with self._lock:
+            with self._conn:
+                if retry_delay is None:
+                    self._conn.execute("UPDATE replication_queue SET status = 'failed', last_error = ? WHERE id = ?",
+                                       (error, entry_id))
+                else:
+                    self._conn.execute(
+                        "UPDATE replication_queue SET status = 'pending', last_error = ?, next_attempt_at = ? "
+                        "WHERE id = ?", (error, time.time() + retry_delay, entry_id)
+                    )
+
+    def retry_failed(self) -> int:
+        """
+        Return entries that were given up on to pending.
+
+        Returns:
+            Number of entries requeued
+        """
+        with self._lock:
+            with self._conn:
+                return self._conn.execute(
+                    "UPDATE replication_queue SET status = 'pending', attempts = 0, next_attempt_at = ? "
+                    "WHERE status = 'failed'", (time.time(),)
+                ).rowcount
+
+    def mark_remote(self, name: str) -> None:
+        """Record that a name is on the remote (e.g. after fetching it from there)."""
+        with self._lock:
+            with self._conn:
+                self._conn.execute("INSERT OR REPLACE INTO remote_names (name, replicated_at) VALUES (?, ?)",
+                                   (name, time.time()))
+
+    def evictable(self, name: str) -> bool:
+        """True if a name is on the remote and has no change waiting to be replicated."""
+        with self._lock:
+            on_remote = self._conn.execute("SELECT 1 FROM remote_names WHERE name = ?", (name,)).fetchone()
+            waiting = self._conn.execute(
+                "SELECT 1 FROM replication_queue WHERE name = ? AND op IN ('upload', 'delete') LIMIT 1", (name,)
+            ).fetchone()
+        return on_remote is not None and waiting is None
+
+    def counts(self) -> Dict[str, int]:
+        """Count entries by status."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT status, COUNT(*) AS n FROM replication_queue GROUP BY status"
+            ).fetchall()
+        counts = {"pending": 0, "in_flight": 0, "failed": 0}
+        counts.update({row["status"]: row["n"] for row in rows})
+        return counts
+
+    def next_due_in(self) -> Optional[float]:
+        """Seconds until the next pending entry is due, or None if nothing is pending."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MIN(next_attempt_at) AS due FROM replication_queue WHERE status = 'pending'"
+            ).fetchone()
+        if row["due"] is None:
+            return None
+        return max(0.0, row["due"] - time.time())
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+class TieredStorageAgent(BaseAgent):
+    """
+    Local storage in front of a remote store.
+
+    Writes (uploads, deletes, backups) are applied to the local store and
+    queued for the remote; a background replicator drains the queue with
+    retries and exponential backoff, and anything still queued when the
+    process exits is replicated on the next run. Reads come from the local
+    store; a file that is only on the remote is fetched once and kept.
+    When the local store grows past cache_mb, the least recently used files
+    that are already on the remote are evicted.
+    """
+
+    def __init__(self, config_path: Optional[str] = None, local: Optional[StorageBackend] = None,
+                 remote: Optional[StorageBackend] = None):
+        """
+        Args:
+            config_path: Path to config.yaml
+            local: Local tier (defaults to a LocalStorageAgent)
+            remote: Remote tier (defaults to a GCPStorageAgent)
+        """
+        super().__init__("TieredStorageAgent", config_path)
+        if local is None:
+            from .local_storage import LocalStorageAgent
+            local = LocalStorageAgent(config_path)
+        if remote is None:
+            from .gcp_storage import GCPStorageAgent
+            remote = GCPStorageAgent(config_path)
+        self.local = local
+        self.remote = remote
+
+        tier_config = self.config.get("storage", {}).get("tiered", {})
+        self.cache_bytes = int(tier_config.get("cache_mb", 1024) * 1024 * 1024)
+        self.pinned_prefixes = tuple(tier_config.get("pinned_prefixes", ["backups/"]))
+        self.workers = max(1, tier_config.get("workers", 4))
+        self.max_attempts = tier_config.get("max_attempts", 8)
+        self.base_delay = tier_config.get("retry_base_delay", 2.0)
+        self.max_delay = tier_config.get("retry_max_delay", 300.0)
+        self.drain_timeout = tier_config.get("drain_timeout", 60.0)
+        self.poll_interval = 0.5
+
+        self.tmp_dir = os.path.join(self.local.storage_dir, ".tier_tmp")
+        os.makedirs(self.tmp_dir, exist_ok=True)
+        self.queue = ReplicationQueue(os.path.join(self.local.storage_dir, ".replication.sqlite3"))
+
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._remote_lock = threading.Lock()
+        self._remote_ok: Optional[bool] = None
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._slots = threading.Semaphore(self.workers)
+        self._inflight = 0
+        self._inflight_lock = threading.Lock()
+        # Backups the remote accepted into its buffer (segmented backups on
+        # GCP); they stay in flight in the queue until that buffer is uploaded
+        self._buffered_backups: List[Dict[str, Any]] = []
+        self._evict_when_idle = False
+        self._evict_lock = threading.Lock()
+        # Striped per-name locks: a local write and its enqueue happen under
+        # the same lock as an eviction's evictable check and delete
+        self._name_locks = [threading.Lock() for _ in range(64)]
+        self.stats = {"replicated": 0, "retried": 0, "failed": 0, "cache_hits": 0, "cache_misses": 0,
+                      "evicted": 0, "evicted_bytes": 0}
+
+        if self.queue.next_due_in() is not None:
+            self._start_replicator()
+        self.logger.info(f"Tiered storage initialized with a {self.cache_bytes / 1e6:.0f} MB local cache")
+
+    def upload_file(self, file_path: str, destination_blob_name: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Store a file locally and queue it for the remote.
+
+        Args:
+            file_path: Path to the local file
+            destination_blob_name: Name to store the file as (if None, uses file name)
+
+        Returns:
+            Dictionary with the local upload result and replication "queued"
+        """
+        name = destination_blob_name or os.path.basename(file_path)
+        # Until the upload is queued the name still looks replicated, and an
+        # eviction would delete the new content
+        with self._name_lock(name):
+            result = self.local.upload_file(file_path, destination_blob_name)
+            if not result.get("success"):
+                return result
+            self._enqueue("upload", result["blob_name"])
+        self._evict_if_needed()
+        return {**result, "replication": "queued"}
+
+    def download_file(self, blob_name: str, destination_file_path: str) -> Dict[str, Any]:
+        """
+        Copy a stored file to a local path, fetching it from the remote if it is not cached.
+
+        Args:
+            blob_name: Name of the file in storage
+            destination_file_path: Local path to save the file
+
+        Returns:
+            Dictionary with download status and cache "hit" or "miss"
+        """
+        if self.local.local_path(blob_name):
+            self._count("cache_hits")
+            return {**self.local.download_file(blob_name, destination_file_path), "cache": "hit"}
+
+        self._count("cache_misses")
+        tmp_path = os.path.join(self.tmp_dir, uuid.uuid4().hex)
+        try:
+            fetched = self.remote.download_file(blob_name, tmp_path)
+            if not fetched.get("success"):
+                return fetched
+            stored = self.local.upload_file(tmp_path, blob_name)
+            if not stored.get("success"):
+                return stored
+            self.queue.mark_remote(stored["blob_name"])
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        self._evict_if_needed()
+        return {**self.local.download_file(blob_name, destination_file_path), "cache": "miss"}
+
+    def list_files(self, prefix: Optional[str] = None) -> Dict[str, Any]:
+        """
+        List files in either tier; local entries win for names in both.
+
+        Args:
+            prefix: Optional prefix to filter files
+
+        Returns:
+            Dictionary with list of files (and "remote_error" if the remote could not be listed)
+        """
+        local = self.local.list_files(prefix)
+        if not local.get("success"):
+            return local
+        remote = self.remote.list_files(prefix)
+        files = {entry["name"]: entry for entry in remote.get("files", [])}
+        files.update({entry["name"]: entry for entry in local["files"]})
+        result = {"success": True, "files": [files[name] for name in sorted(files)]}
+        if not remote.get("success"):
+            result["remote_error"] = remote.get("error")
+        return result
+
+    def delete_file(self, blob_name: str) -> Dict[str, Any]:
+        """
+        Delete a file locally and queue the delete for the remote.
+
+        Args:
+            blob_name: Name of the file in storage
+
+        Returns:
+            Dictionary with delete status
+        """
+        result = self.local.delete_file(blob_name)
+        if not result.get("success") and self.local.local_path(blob_name):
+            return result
+        self._enqueue("delete", blob_name)
+        return {"success": True, "blob_name": blob_name, "replication": "queued"}
+
+    def backup_wordpress_data(self, content_data: Dict[str, Any], backup_name: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Back up WordPress post data locally and queue the backup for the remote.
+
+        Args:
+            content_data: Dictionary of WordPress post data
+            backup_name: Optional custom backup name
+
+        Returns:
+            Dictionary with the local backup result and replication status
+        """
+        backup_name = backup_name or f"wp_backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        result = self.local.backup_wordpress_data(content_data, backup_name)
+        if not result.get("success"):
+            return result
+        if result.get("deduplicated"):
+            # Unchanged since the last backup, which was already replicated
+            return {**result, "replication": "unchanged"}
+        self._enqueue("backup", backup_name, json.dumps(content_data, default=str))
+        return {**result, "replication": "queued"}
+
+    def flush_backups(self) -> Dict[str, Any]:
+        """
+        Close the local backup segment, wait up to drain_timeout for queued
+        changes to reach the remote, then flush the remote's buffered backups.
+        Returns early when only retries due after the deadline are left, or
+        when the remote is unavailable. Changes still queued afterwards are
+        replicated on the next run.
+
+        Returns:
+            Dictionary with flush status and queue counts
+        """
+        local = self.local.flush_backups()
+        drained = self.drain(self.drain_timeout)
+        remote = self._flush_remote_backups()
+        counts = self.queue.counts()
+        if not drained:
+            self.logger.warning(f"Replication did not finish in this run; "
+                                f"{counts['pending']} changes stay queued for the next run")
+        return {
+            "success": bool(local.get("success") and remote.get("success")),
+            "error": local.get("error") or remote.get("error"),
+            "drained": drained,
+            "queue": counts
+        }
+
+    def drain(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until nothing is queued or in flight.
+
+        Args:
+            timeout: Maximum seconds to wait (None waits indefinitely)
+
+        Returns:
+            True if the queue drained
+        """
+        deadline = time.time() + timeout if timeout is not None else None
+        while True:
+            with self._inflight_lock:
+                busy = self._inflight > 0
+            due_in = self.queue.next_due_in()
+            if not busy and due_in is None:
+                return True
+            if not self._remote_available():
+                return False
+            self._start_replicator()
+            if deadline is not None:
+                remaining = deadline - time.time()
+                # Nothing will run before the deadline when only backoff delays are left
+                if remaining <= 0 or (not busy and due_in > remaining):
+                    return False
+            self._wake.set()
+            time.sleep(min(self.poll_interval, 0.1))
+
+    def close(self, drain: bool = True) -> Dict[str, int]:
+        """
+        Stop the replicator.
+
+        Args:
+            drain: Flush backups and wait up to drain_timeout for queued changes first
+
+        Returns:
+            Queue counts after stopping
+        """
+        if drain:
+            self.flush_backups()
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join()
+        if self._executor:
+            self._executor.shutdown(wait=True)
+        self._thread = None
+        self._executor = None
+        return self.queue.counts()
+
+    def run(self) -> Dict[str, Any]:
+        """
+        Report the state of both tiers.
+
+        Returns:
+            Dictionary with local usage, cache capacity, queue counts and stats
+        """
+        self.logger.info("Running TieredStorageAgent")
+        results = {"status": "success", "cache_bytes": self.cache_bytes}
+        try:
+            summary = self.local.storage_summary()
+            results["local_files"] = summary.get("files", 0)
+            results["local_bytes"] = summary.get("bytes", 0)
+            results["queue"] = self.queue.counts()
+            results["stats"] = dict(self.stats)
+            if results["queue"]["failed"]:
+                results["status"] = "warning"
+                results["message"] = f"{results['queue']['failed']} changes failed to replicate"
+        except Exception as e:
+            self.logger.error(f"Error in TieredStorageAgent run: {e}")
+            results["status"] = "error"
+            results["message"] = str(e)
+        return results
+
+    def _enqueue(self, op: str, name: str, payload: Optional[str] = None) -> None:
+        self.queue.enqueue(op, name, payload)
+        self._start_replicator()
+        self._wake.set()
+
+    def _name_lock(self, name: str) -> threading.Lock:
+        try:
+            name = normalize_name(name)
+        except ValueError:
+            # Rejected by the local store; any lock will do
+            pass
+        return self._name_locks[hash(name) % len(self._name_locks)]
+
+    def _count(self, key: str, amount: int = 1) -> None:
+        with self._inflight_lock:
+            self.stats[key] += amount
+
+    def _remote_available(self) -> bool:
+        """
+        False when the remote has no bucket (no credentials or bucket name).
+        The agent then works local-only: changes stay queued for a run that
+        can reach the remote, and nothing waits on replication.
+        """
+        with self._remote_lock:
+            if self._remote_ok is None:
+                self._remote_ok = getattr(self.remote, "bucket", True) is not None
+                if not self._remote_ok:
+                    self.logger.warning("Remote storage is not available; working local-only, "
+                                        "changes stay queued for a later run")
+            return self._remote_ok
+
+    def _start_replicator(self) -> None:
+        if self._remote_ok is False:
+            return
+        with self._start_lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="tier-replicator")
+            self._thread = threading.Thread(target=self._run_replicator, name="tier-replication", daemon=True)
+            self._thread.start()
+
+    def _run_replicator(self) -> None:
+        # Checked here rather than on the writer's thread, since the first
+        # check connects to the remote
+        if not self._remote_available():
+            return
+        while not self._stop.is_set():
+            if not self._slots.acquire(timeout=self.poll_interval):
+                continue
+            entries = self.queue.claim(limit=1)
+            if not entries:
+                self._slots.release()
+                self._flush_remote_backups_when_idle()
+                if self._evict_when_idle:
+                    # Files that were waiting for replication may be evictable now
+                    self._evict_when_idle = False
+                    self._evict_if_needed()
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+                continue
+            with self._inflight_lock:
+                self._inflight += 1
+            self._executor.submit(self._replicate, entries[0])
+
+    def _flush_remote_backups_when_idle(self) -> None:
+        # Upload buffered remote backups once the queue has nothing more to add
+        with self._inflight_lock:
+            if self._inflight or not self._buffered_backups:
+                return
+        result = self._flush_remote_backups()
+        if not result.get("success"):
+            self.logger.warning(f"Failed to flush remote backups: {result.get('error')}")
+
+    def _flush_remote_backups(self) -> Dict[str, Any]:
+        """Flush the remote's buffered backups and mark the backups they held as replicated."""
+        with self._inflight_lock:
+            entries, self._buffered_backups = self._buffered_backups, []
+        result = self.remote.flush_backups()
+        if not result.get("success"):
+            # The remote keeps its buffer after a failed flush; try again later
+            with self._inflight_lock:
+                self._buffered_backups = entries + self._buffered_backups
+            return result
+        for entry in entries:
+            self.queue.mark_done(entry)
+        self._count("replicated", len(entries))
+        return result
+
+    def _replicate(self, entry: Dict[str, Any]) -> None:
+        try:
+            try:
+                result = self._apply(entry)
+            except Exception as e:
+                result = {"success": False, "error": str(e)}
+
+            if result.get("success"):
+                if entry["op"] == "backup" and result.get("buffered"):
+                    # Not on the remote until its buffer is flushed
+                    with self._inflight_lock:
+                        self._buffered_backups.append(entry)
+                    return
+                self.queue.mark_done(entry)
+                self._count("replicated")
+                if entry["op"] == "upload":
+                    self._evict_when_idle = True
+                return
+
+            error = result.get("error", "Unknown error")
+            if entry["attempts"] >= self.max_attempts:
+                self.logger.error(f"Giving up replicating {entry['op']} of {entry['name']} after "
+                                  f"{entry['attempts']} attempts: {error}")
+                self.queue.mark_failed(entry["id"], error)
+                self._count("failed")
+            else:
+                delay = min(self.max_delay, self.base_delay * (2 ** (entry["attempts"] - 1)))
+                self.logger.warning(f"Replicating {entry['op']} of {entry['name']} failed ({error}); "
+                                    f"retrying in {delay:.1f}s")
+                self.queue.mark_failed(entry["id"], error, retry_delay=delay)
+                self._count("retried")
+        finally:
+            with self._inflight_lock:
+                self._inflight -= 1
+            self._slots.release()
+            self._wake.set()
+
+    def _apply(self, entry: Dict[str, Any]) -> Dict[str, Any]:
+        if entry["op"] == "upload":
+            path = self.local.local_path(entry["name"])
+            if path is None:
+                # Deleted locally since; the queued delete takes care of the remote
+                return {"success": True}
+            return self.remote.upload_file(path, entry["name"])
+        if entry["op"] == "delete":
+            result = self.remote.delete_file(entry["name"])
+            return {"success": True} if result.get("not_found") else result
+        if entry["op"] == "backup":
+            return self.remote.backup_wordpress_data(json.loads(entry["payload"]), entry["name"])
+        return {"success": False, "error": f"Unknown replication operation: {entry['op']}"}
+
+    def _evict_if_needed(self) -> None:
+        """Evict least recently used replicated files until the local store is 90% of cache_bytes."""
+        if not self.cache_bytes or not self._evict_lock.acquire(blocking=False):
+            return
+        try:
+            total = self.local.storage_summary().get("bytes", 0)
+            if total <= self.cache_bytes:
+                return
+            target = self.cache_bytes * 0.9
+            evicted = freed = 0
+            for candidate in self.local.eviction_candidates(exclude_prefixes=self.pinned_prefixes):
+                if total <= target:
+                    break
+                with self._name_lock(candidate["name"]):
+                    deleted = (self.queue.evictable(candidate["name"])
+                               and self.local.delete_file(candidate["name"]).get("success"))
+                if deleted:
+                    total -= candidate["size"]
+                    evicted += 1
+                    freed += candidate["size"]
+            if evicted:
+                self.local.collect_garbage()
+                self._count("evicted", evicted)
+                self._count("evicted_bytes", freed)
+                self.logger.info(f"Evicted {evicted} files ({freed / 1e6:.1f} MB) from the local cache")
+            if total > self.cache_bytes:
+                self.logger.debug(f"Local store is {total / 1e6:.1f} MB, over the {self.cache_bytes / 1e6:.0f} MB "
+                                  f"cache, until queued files reach the remote")
+        finally:
+            self._evict_lock.release()
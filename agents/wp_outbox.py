@@ -0,0 +1,389 @@
+"""
+WordPress Publishing Outbox for The Elidoras Codex.
+Stores generated posts durably in SQLite and publishes them in the background,
+so content generation never blocks on (or loses work to) a slow WordPress site.
+"""
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from typing import Dict, Any, List, Optional, Callable, Set
+from concurrent.futures import ThreadPoolExecutor
+
+from .wp_poster import WordPressAgent
+
+logger = logging.getLogger("TEC.WordPressOutbox")
+
+DEFAULT_OUTBOX_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "wp_outbox.sqlite3")
+
+class WordPressOutbox:
+    """
+    Durable queue of WordPress posts waiting to be published.
+
+    Entries move through the states pending -> in_flight -> published, or back to
+    pending with a backoff delay when publishing fails, until max attempts are spent
+    and the entry is marked failed. Entries left in flight by a crashed run are
+    returned to pending when the outbox is opened again. An entry may carry a
+    key (such as its ClickUp task ID); a post is not queued twice under the
+    same key while an earlier one is still pending or in flight.
+    """
+
+    def __init__(self, db_path: Optional[str] = None):
+        """
+        Open (or create) the outbox database.
+
+        Args:
+            db_path: Path to the SQLite file (defaults to data/wp_outbox.sqlite3)
+        """
+        self.db_path = db_path or DEFAULT_OUTBOX_PATH
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                created_at REAL NOT NULL,
+                post TEXT NOT NULL,
+                metadata TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at REAL NOT NULL,
+                last_error TEXT,
+                result TEXT,
+                dedupe_key TEXT
+            )
+            """
+        )
+        # Outboxes created before entries had keys
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(outbox)")}
+        if "dedupe_key" not in columns:
+            self._conn.execute("ALTER TABLE outbox ADD COLUMN dedupe_key TEXT")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox (status, next_attempt_at)")
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_outbox_key ON outbox (dedupe_key, status) WHERE dedupe_key IS NOT NULL"
+        )
+        self._conn.commit()
+
+        recovered = self.release_in_flight()
+        if recovered:
+            logger.info(f"Returned {recovered} in-flight entries to pending in {self.db_path}")
+
+    def enqueue(self, post: Dict[str, Any], metadata: Optional[Dict[str, Any]] = None,
+                key: Optional[str] = None) -> int:
+        """
+        Add a post to the outbox.
+
+        Args:
+            post: Keyword arguments for WordPressAgent.create_post (title, content, ...)
+            metadata: Extra data carried along for the on-published callback (e.g. task_id)
+            key: Deduplication key (e.g. the ClickUp task ID)
+
+        Returns:
+            ID of the outbox entry, or of the pending or in-flight entry already queued under key
+        """
+        now = time.time()
+        with self._lock:
+            if key is not None:
+                row = self._conn.execute(
+                    "SELECT id FROM outbox WHERE dedupe_key = ? AND status IN ('pending', 'in_flight') "
+                    "ORDER BY id LIMIT 1", (key,)
+                ).fetchone()
+                if row is not None:
+                    logger.info(f"Post for {key} is already queued as entry {row['id']}")
+                    return row["id"]
+            cursor = self._conn.execute(
+                "INSERT INTO outbox (created_at, post, metadata, next_attempt_at, dedupe_key) VALUES (?, ?, ?, ?, ?)",
+                (now, json.dumps(post), json.dumps(metadata or {}), now, key)
+            )
+            self._conn.commit()
+            return cursor.lastrowid
+
+    def queued_keys(self) -> Set[str]:
+        """
+        Keys of the entries that are pending or in flight.
+
+        Returns:
+            Set of deduplication keys
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT DISTINCT dedupe_key FROM outbox "
+                "WHERE dedupe_key IS NOT NULL AND status IN ('pending', 'in_flight')"
+            ).fetchall()
+        return {row["dedupe_key"] for row in rows}
+
+    def claim(self, limit: int = 1) -> List[Dict[str, Any]]:
+        """
+        Claim due pending entries for publishing and mark them in flight.
+
+        Args:
+            limit: Maximum number of entries to claim
+
+        Returns:
+            List of claimed entries
+        """
+        now = time.time()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM outbox WHERE status = 'pending' AND next_attempt_at <= ? "
+                "ORDER BY next_attempt_at, id LIMIT ?",
+                (now, limit)
+            ).fetchall()
+            if not rows:
+                return []
+            self._conn.executemany(
+                "UPDATE outbox SET status = 'in_flight', attempts = attempts + 1 WHERE id = ?",
+                [(row["id"],) for row in rows]
+            )
+            self._conn.commit()
+        return [self._row_to_entry(row, attempts_offset=1) for row in rows]
+
+    def mark_published(self, entry_id: int, result: Dict[str, Any]) -> None:
+        """Record a successful publish."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE outbox SET status = 'published', result = ?, last_error = NULL WHERE id = ?",
+                (json.dumps(result), entry_id)
+            )
+            self._conn.commit()
+
+    def mark_failed(self, entry_id: int, error: str, retry_delay: Optional[float] = None) -> None:
+        """
+        Record a failed publish attempt.
+
+        Args:
+            entry_id: ID of the outbox entry
+            error: Error message from the attempt
+            retry_delay: Seconds until the entry is due again, or None to give up
+        """
+        with self._lock:
+            if retry_delay is None:
+                self._conn.execute(
+                    "UPDATE outbox SET status = 'failed', last_error = ? WHERE id = ?",
+                    (error, entry_id)
+                )
+            else:
+                self._conn.execute(
+                    "UPDATE outbox SET status = 'pending', last_error = ?, next_attempt_at = ? WHERE id = ?",
+                    (error, time.time() + retry_delay, entry_id)
+                )
+            self._conn.commit()
+
+    def release_in_flight(self) -> int:
+        """
+        Return entries stuck in flight (e.g. after a crash) to pending.
+
+        Returns:
+            Number of entries released
+        """
+        with self._lock:
+            cursor = self._conn.execute("UPDATE outbox SET status = 'pending' WHERE status = 'in_flight'")
+            self._conn.commit()
+            return cursor.rowcount
+
+    def counts(self) -> Dict[str, int]:
+        """
+        Count entries by status.
+
+        Returns:
+            Dictionary mapping status to number of entries
+        """
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) AS n FROM outbox GROUP BY status").fetchall()
+        counts = {"pending": 0, "in_flight": 0, "published": 0, "failed": 0}
+        counts.update({row["status"]: row["n"] for row in rows})
+        return counts
+
+    def next_due_in(self) -> Optional[float]:
+        """
+        Seconds until the next pending entry is due.
+
+        Returns:
+            Delay in seconds (0 if something is due now), or None if nothing is pending
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MIN(next_attempt_at) AS due FROM outbox WHERE status = 'pending'"
+            ).fetchone()
+        if row["due"] is None:
+            return None
+        return max(0.0, row["due"] - time.time())
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+    @staticmethod
+    def _row_to_entry(row: sqlite3.Row, attempts_offset: int = 0) -> Dict[str, Any]:
+        return {
+            "id": row["id"],
+            "created_at": row["created_at"],
+            "post": json.loads(row["post"]),
+            "metadata": json.loads(row["metadata"]),
+            "attempts": row["attempts"] + attempts_offset,
+            "last_error": row["last_error"]
+        }
+
+class OutboxPublisher:
+    """
+    Background publisher that drains a WordPressOutbox concurrently.
+
+    Failed attempts are retried with exponential backoff. An optional callback is
+    invoked from a worker thread after each successful publish, so follow-up work
+    (backups, ClickUp updates) happens as soon as the post is live.
+    """
+
+    def __init__(self, outbox: WordPressOutbox, wp_agent: WordPressAgent, workers: int = 4,
+                 max_attempts: int = 5, base_delay: float = 2.0, max_delay: float = 300.0,
+                 poll_interval: float = 0.5,
+                 on_published: Optional[Callable[[Dict[str, Any], Dict[str, Any]], None]] = None,
+                 on_failed: Optional[Callable[[Dict[str, Any], str], None]] = None):
+        """
+        Configure the publisher.
+
+        Args:
+            outbox: Outbox to drain
+            wp_agent: WordPressAgent used to create the posts
+            workers: Number of concurrent publish requests
+            max_attempts: Attempts before an entry is marked failed
+            base_delay: Initial retry delay in seconds (doubled per attempt)
+            max_delay: Upper bound on the retry delay in seconds
+            poll_interval: Idle sleep between outbox polls in seconds
+            on_published: Callback(entry, result) after a successful publish
+            on_failed: Callback(entry, error) after an entry is given up on
+        """
+        self.outbox = outbox
+        self.wp_agent = wp_agent
+        self.workers = max(1, workers)
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.poll_interval = poll_interval
+        self.on_published = on_published
+        self.on_failed = on_failed
+
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._slots = threading.Semaphore(self.workers)
+        self._inflight = 0
+        self._inflight_lock = threading.Lock()
+        self.stats = {"published": 0, "retried": 0, "failed": 0}
+
+    def start(self) -> "OutboxPublisher":
+        """Start draining the outbox in the background."""
+        if self._thread and self._thread.is_alive():
+            return self
+        self._stop.clear()
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="wp-publisher")
+        self._thread = threading.Thread(target=self._run, name="wp-outbox-publisher", daemon=True)
+        self._thread.start()
+        logger.info(f"Outbox publisher started with {self.workers} workers")
+        return self
+
+    def notify(self) -> None:
+        """Wake the publisher immediately (e.g. right after an enqueue)."""
+        self._wake.set()
+
+    def stop(self, drain: bool = True, timeout: Optional[float] = None) -> Dict[str, int]:
+        """
+        Stop the publisher.
+
+        Args:
+            drain: Keep publishing (including backoff retries) until no pending or in-flight
+                   entries remain before stopping
+            timeout: Maximum seconds to wait while draining; anything still pending
+                     afterwards stays in the outbox for the next run
+
+        Returns:
+            Outbox counts by status after stopping
+        """
+        if drain:
+            deadline = time.time() + timeout if timeout is not None else None
+            while not self._is_idle():
+                if deadline is not None and time.time() >= deadline:
+                    logger.warning("Outbox drain timed out; remaining entries stay queued for the next run")
+                    break
+                self._wake.set()
+                time.sleep(min(self.poll_interval, 0.1))
+
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join()
+        if self._executor:
+            self._executor.shutdown(wait=True)
+        self._thread = None
+        self._executor = None
+        return self.outbox.counts()
+
+    def _is_idle(self) -> bool:
+        with self._inflight_lock:
+            if self._inflight:
+                return False
+        return self.outbox.next_due_in() is None
+
+    def _count(self, key: str) -> None:
+        with self._inflight_lock:
+            self.stats[key] += 1
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            if not self._slots.acquire(timeout=self.poll_interval):
+                continue
+            entries = self.outbox.claim(limit=1)
+            if not entries:
+                self._slots.release()
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+                continue
+            with self._inflight_lock:
+                self._inflight += 1
+            self._executor.submit(self._publish, entries[0])
+
+    def _publish(self, entry: Dict[str, Any]) -> None:
+        try:
+            try:
+                result = self.wp_agent.create_post(**entry["post"])
+            except Exception as e:
+                result = {"success": False, "error": str(e)}
+
+            if result.get("success"):
+                self.outbox.mark_published(entry["id"], result)
+                self._count("published")
+                if self.on_published:
+                    try:
+                        self.on_published(entry, result)
+                    except Exception as e:
+                        logger.error(f"on_published callback failed for outbox entry {entry['id']}: {e}")
+                return
+
+            error = result.get("error", "Unknown error")
+            if entry["attempts"] >= self.max_attempts:
+                logger.error(f"Giving up on outbox entry {entry['id']} after {entry['attempts']} attempts: {error}")
+                self.outbox.mark_failed(entry["id"], error)
+                self._count("failed")
+                if self.on_failed:
+                    try:
+                        self.on_failed(entry, error)
+                    except Exception as e:
+                        logger.error(f"on_failed callback failed for outbox entry {entry['id']}: {e}")
+            else:
+                delay = min(self.max_delay, self.base_delay * (2 ** (entry["attempts"] - 1)))
+                logger.warning(f"Publishing outbox entry {entry['id']} failed ({error}); retrying in {delay:.1f}s")
+                self.outbox.mark_failed(entry["id"], error, retry_delay=delay)
+                self._count("retried")
+        finally:
+            with self._inflight_lock:
+                self._inflight -= 1
+            self._slots.release()
+            self._wake.set()
@@ -6,17 +6,15 @@ This script extracts text from files and uses the AirthAgent to process them int
 import os
 import sys
 import json
+import time
+import queue
 import logging
 import argparse
-from typing import List, Dict, Any, Optional
+import threading
+from itertools import islice
+from typing import List, Dict, Any, Optional, Tuple, Iterable
 from pathlib import Path
-
-# Try to import docx for DOCX file processing
-try:
-    import docx
-    DOCX_AVAILABLE = True
-except ImportError:
-    DOCX_AVAILABLE = False
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 # Add the parent directory to sys.path to import the agents module
 script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -24,6 +22,10 @@ parent_dir = os.path.dirname(script_dir)
 sys.path.append(parent_dir)
 
 from agents.airth_agent import AirthAgent
+from agents.llm_executor import estimate_tokens
+from agents.ingest_manifest import IngestManifest, file_sha256, chunk_sha256
+from agents.memory_store import ROOT_DIR
+from agents.text_chunker import iter_file_chunks
 
 # Set up logging
 logging.basicConfig(
@@ -36,187 +38,336 @@ logging.basicConfig(
 )
 logger = logging.getLogger("MemoryProcessor")
 
-def extract_text_from_docx(file_path: str) -> str:
+SUPPORTED_EXTENSIONS = [".txt", ".md", ".text", ".docx"]
+
+# Files larger than this are chunked as a stream in the main process instead of in a worker
+STREAM_THRESHOLD = 32 * 1024 * 1024
+
+def find_memory_files(path: str) -> List[str]:
     """
-    Extract text from a DOCX file.
+    List the compatible files at a path.
     
     Args:
-        file_path: Path to the DOCX file
+        path: A memory file or a directory of memory files
         
     Returns:
-        Extracted text from the file
+        Sorted list of file paths
     """
-    if not DOCX_AVAILABLE:
-        logger.error("python-docx package is not installed. Cannot process DOCX files.")
-        return "ERROR: python-docx package is required to process DOCX files."
-    
-    try:
-        doc = docx.Document(file_path)
-        text = "\n\n".join([paragraph.text for paragraph in doc.paragraphs if paragraph.text.strip()])
-        logger.info(f"Successfully extracted {len(text)} characters from {file_path}")
-        return text
-    except Exception as e:
-        logger.error(f"Failed to extract text from DOCX file {file_path}: {e}")
-        return f"ERROR: Failed to extract text from DOCX file: {e}"
+    if os.path.isfile(path):
+        return [path]
+    return sorted(
+        os.path.join(path, file_name) for file_name in os.listdir(path)
+        if os.path.isfile(os.path.join(path, file_name))
+        and os.path.splitext(file_name)[1].lower() in SUPPORTED_EXTENSIONS
+    )
 
-def extract_text_from_file(file_path: str) -> str:
+def extract_file_chunks(file_path: str, chunk_size: int = 1000, overlap: int = 0,
+                        chunk_unit: str = "chars") -> Tuple[str, str, List[str], Optional[str]]:
     """
-    Extract text from a file based on its extension.
+    Hash a file and split it into chunks (runs in a worker process).
     
     Args:
-        file_path: Path to the file
+        file_path: Path to the memory file
+        chunk_size: Maximum chunk size
+        overlap: Trailing context repeated at the start of the next chunk
+        chunk_unit: Unit of chunk_size and overlap ("chars" or "tokens")
         
     Returns:
-        Extracted text from the file
+        Tuple of (file path, content SHA-256, chunks, error message or None)
     """
-    _, ext = os.path.splitext(file_path)
-    
-    if ext.lower() == ".docx":
-        return extract_text_from_docx(file_path)
-    elif ext.lower() in [".txt", ".md", ".text"]:
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                text = f.read()
-            logger.info(f"Successfully read {len(text)} characters from {file_path}")
-            return text
-        except Exception as e:
-            logger.error(f"Failed to read text file {file_path}: {e}")
-            return f"ERROR: Failed to read text file: {e}"
-    else:
-        logger.error(f"Unsupported file extension: {ext}")
-        return f"ERROR: Unsupported file extension: {ext}"
+    try:
+        sha256 = file_sha256(file_path)
+        chunks = list(iter_file_chunks(file_path, chunk_size, overlap, chunk_unit))
+    except Exception as e:
+        return file_path, "", [], f"ERROR: Failed to extract text from {file_path}: {e}"
+    return file_path, sha256, chunks, None
 
-def split_text_into_chunks(text: str, max_chunk_size: int = 1000) -> List[str]:
+class MemoryWriter:
     """
-    Split a large text into smaller chunks based on paragraphs.
+    Single writer thread that stores structured memories in batches.
     
-    Args:
-        text: The text to split
-        max_chunk_size: Maximum size of each chunk in characters
-        
-    Returns:
-        List of text chunks
-    """
-    # Split by paragraphs first
-    paragraphs = text.split('\n\n')
-    
-    chunks = []
-    current_chunk = ""
-    
-    for paragraph in paragraphs:
-        # If adding this paragraph would exceed the chunk size, start a new chunk
-        if len(current_chunk) + len(paragraph) > max_chunk_size and current_chunk:
-            chunks.append(current_chunk)
-            current_chunk = paragraph
-        else:
-            # Add to current chunk with a separator if needed
-            if current_chunk:
-                current_chunk += "\n\n" + paragraph
-            else:
-                current_chunk = paragraph
-    
-    # Add the last chunk if there's anything left
-    if current_chunk:
-        chunks.append(current_chunk)
-    
-    logger.info(f"Split text into {len(chunks)} chunks")
-    return chunks
-
-def process_memory_file(file_path: str, agent: AirthAgent, type_hint: Optional[str] = None) -> List[Dict[str, Any]]:
+    Structuring threads hand memories over through a queue and the writer
+    commits them with one agent.store_memories call per batch, so the store
+    and its search indexes are updated once per batch instead of once per memory
+    and near-duplicates are merged or rejected on the way in. After each batch
+    is committed, on_stored receives (memory_id, source) pairs so the caller can
+    checkpoint its progress; a rejected memory reports the id it duplicates.
     """
-    Process a memory file and convert it to structured memories.
     
-    Args:
-        file_path: Path to the memory file
-        agent: AirthAgent instance to use for processing
-        type_hint: Optional hint about the type of memories in the file
+    _STOP = object()
+    
+    def __init__(self, agent: AirthAgent, batch_size: int = 50, flush_interval: float = 1.0,
+                 on_stored=None):
+        """
+        Start the writer.
         
-    Returns:
-        List of structured memory objects
-    """
-    logger.info(f"Processing memory file: {file_path}")
+        Args:
+            agent: AirthAgent whose memory store receives the memories
+            batch_size: Memories per transaction
+            flush_interval: Seconds to wait for a full batch before writing a partial one
+            on_stored: Callback receiving [(memory_id, source), ...] after each committed batch
+        """
+        self.agent = agent
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.on_stored = on_stored
+        self.stored = 0
+        self.merged = 0
+        self.rejected = 0
+        self.failed = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="memory-writer", daemon=True)
+        self._thread.start()
     
-    # Extract text from the file
-    text = extract_text_from_file(file_path)
-    if text.startswith("ERROR:"):
-        logger.error(text)
-        return []
+    def put(self, memory: Dict[str, Any], source: Any = None) -> None:
+        """Queue a memory for writing, with an optional source passed back to on_stored."""
+        self._queue.put((memory, source))
     
-    # Split the text into manageable chunks
-    chunks = split_text_into_chunks(text)
+    def close(self) -> None:
+        """Write any remaining memories and stop the writer thread."""
+        self._queue.put(self._STOP)
+        self._thread.join()
     
-    # Process each chunk into a structured memory
-    memories = []
-    for i, chunk in enumerate(chunks, 1):
-        logger.info(f"Processing chunk {i} of {len(chunks)} ({len(chunk)} characters)")
+    def _run(self) -> None:
+        batch = []
+        stopping = False
+        while not stopping:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                item = None
+            if item is self._STOP:
+                stopping = True
+            elif item is not None:
+                batch.append(item)
+            if batch and (stopping or item is None or len(batch) >= self.batch_size):
+                self._flush(batch)
+                batch = []
+    
+    def _flush(self, batch: List[Tuple[Dict[str, Any], Any]]) -> None:
         try:
-            memory_data = agent.process_memory_from_text(chunk, type_hint)
-            memories.append(memory_data)
-            logger.info(f"Successfully processed chunk {i} into memory: {memory_data.get('title', 'Untitled')}")
+            results = self.agent.store_memories([memory for memory, _ in batch])
+            memory_ids = [result["id"] or result["duplicate_of"] for result in results]
+            statuses = [result["status"] for result in results]
+            self.stored += statuses.count("stored")
+            self.merged += statuses.count("merged")
+            self.rejected += statuses.count("rejected")
+            logger.info(f"Wrote batch of {len(batch)} memories ({self.stored} stored, "
+                        f"{self.merged} merged, {self.rejected} rejected so far)")
         except Exception as e:
-            logger.error(f"Failed to process chunk {i}: {e}")
-    
-    return memories
+            self.failed += len(batch)
+            logger.error(f"Failed to store batch of {len(batch)} memories: {e}")
+            return
+        if self.on_stored:
+            try:
+                self.on_stored(list(zip(memory_ids, [source for _, source in batch])))
+            except Exception as e:
+                logger.error(f"Failed to checkpoint batch of {len(batch)} memories: {e}")
 
-def add_memories_to_database(memories: List[Dict[str, Any]], agent: AirthAgent) -> int:
+def ingest_files(paths: List[str], agent: AirthAgent, type_hint: Optional[str] = None,
+                 workers: int = 4, max_inflight: int = 4, batch_size: int = 50,
+                 manifest: Optional[IngestManifest] = None, chunk_size: int = 1000,
+                 overlap: int = 0, chunk_unit: str = "chars",
+                 stream_threshold: int = STREAM_THRESHOLD, structure_batch: int = 1) -> Dict[str, Any]:
     """
-    Add processed memories to Airth's memory database.
+    Ingest memory files in parallel.
     
-    Args:
-        memories: List of structured memory objects
-        agent: AirthAgent instance
-        
-    Returns:
-        Number of successfully added memories
-    """
-    success_count = 0
+    Files are extracted and chunked across a process pool, chunks are
+    structured by the LLM on the agent's shared llm_executor (so its rate
+    limits cover these requests together with any others the agent makes)
+    with at most max_inflight requests outstanding, and the results are
+    written by a single batched MemoryWriter. Files larger than
+    stream_threshold are chunked as a stream in this process instead, so they
+    are never held in memory whole.
     
-    for i, memory in enumerate(memories, 1):
-        logger.info(f"Adding memory {i} of {len(memories)} to database")
-        try:
-            success = agent.add_new_memory(memory)
-            if success:
-                success_count += 1
-                logger.info(f"Successfully added memory {i}: {memory.get('title', 'Untitled')}")
-            else:
-                logger.error(f"Failed to add memory {i}: Unknown error")
-        except Exception as e:
-            logger.error(f"Failed to add memory {i}: {e}")
+    With structure_batch above 1, that many chunks are structured by a single
+    LLM request; chunks whose part of the answer is missing or invalid are
+    retried on their own.
     
-    return success_count
-
-def process_directory(dir_path: str, agent: AirthAgent, type_hint: Optional[str] = None) -> int:
-    """
-    Process all compatible files in a directory.
+    With a manifest, files that were fully ingested before are skipped, chunks
+    already stored are not sent to the LLM again, and every written batch is
+    checkpointed, so an interrupted run resumes where it stopped.
     
     Args:
-        dir_path: Path to the directory
-        agent: AirthAgent instance to use for processing
+        paths: Memory files to ingest
+        agent: AirthAgent instance to use for structuring and storage
         type_hint: Optional hint about the type of memories
+        workers: Extraction processes
+        max_inflight: Concurrent structuring requests
+        batch_size: Memories per write transaction
+        manifest: Manifest used to skip finished work and record progress
+        chunk_size: Maximum chunk size
+        overlap: Trailing context repeated at the start of the next chunk
+        chunk_unit: Unit of chunk_size and overlap ("chars" or "tokens")
+        stream_threshold: Size in bytes above which a file is streamed
+        structure_batch: Chunks structured per LLM request
         
     Returns:
-        Total number of memories added
+        Dictionary of ingestion statistics
     """
-    logger.info(f"Processing directory: {dir_path}")
-    
-    if not os.path.isdir(dir_path):
-        logger.error(f"Directory does not exist: {dir_path}")
-        return 0
-    
-    total_added = 0
-    
-    for file_name in os.listdir(dir_path):
-        file_path = os.path.join(dir_path, file_name)
-        if os.path.isfile(file_path):
-            _, ext = os.path.splitext(file_path)
-            if ext.lower() in [".txt", ".md", ".text", ".docx"]:
-                logger.info(f"Found compatible file: {file_name}")
-                memories = process_memory_file(file_path, agent, type_hint)
-                added = add_memories_to_database(memories, agent)
-                total_added += added
-                logger.info(f"Added {added} memories from {file_name}")
-    
-    return total_added
+    stats = {"files": 0, "failed_files": 0, "skipped_files": 0, "chunks": 0, "skipped_chunks": 0,
+             "structured": 0, "failed_chunks": 0, "requests": 0}
+    stats_lock = threading.Lock()
+    start = time.perf_counter()
+    
+    if manifest:
+        unchanged = {path for path in paths if manifest.is_unchanged(path)}
+        stats["skipped_files"] = len(unchanged)
+        paths = [path for path in paths if path not in unchanged]
+    
+    # Chunks of each file that still have to be stored; a file is done once it is
+    # fully chunked ("sealed") and nothing remains
+    remaining: Dict[str, int] = {}
+    totals: Dict[str, int] = {}
+    sealed = set()
+    submitted_hashes = set()
+    
+    def on_stored(entries: List[Tuple[str, Tuple[str, str]]]) -> None:
+        if not manifest:
+            return
+        manifest.checkpoint([(chunk_hash, file_path, memory_id) for memory_id, (file_path, chunk_hash) in entries])
+        finished = []
+        with stats_lock:
+            for _, (file_path, _) in entries:
+                remaining[file_path] -= 1
+                if remaining[file_path] == 0 and file_path in sealed:
+                    finished.append(file_path)
+        for file_path in finished:
+            manifest.finish_file(file_path, totals[file_path])
+            logger.info(f"Finished ingesting {file_path}")
+    
+    executor = agent.llm_executor
+    inflight = threading.BoundedSemaphore(max_inflight)
+    writer = MemoryWriter(agent, batch_size=batch_size, on_stored=on_stored)
+    
+    def on_structured(future, sources: List[Tuple[str, str]]) -> None:
+        try:
+            try:
+                results = future.result()
+            except Exception as e:
+                results = [e] * len(sources)
+            structured = failed = 0
+            for result, source in zip(results, sources):
+                if isinstance(result, Exception):
+                    logger.error(f"Failed to structure chunk from {source[0]}: {result}")
+                    failed += 1
+                    continue
+                writer.put(result, source)
+                structured += 1
+            with stats_lock:
+                before = stats["structured"] + stats["failed_chunks"]
+                stats["structured"] += structured
+                stats["failed_chunks"] += failed
+                done = before + structured + failed
+            if done // 25 > before // 25:
+                elapsed = time.perf_counter() - start
+                logger.info(f"Progress: {done}/{stats['chunks']} chunks structured ({done / elapsed:.1f} chunks/s)")
+        finally:
+            # Released last, so holding every slot means all results were handed to the writer
+            inflight.release()
+    
+    # Chunks waiting to fill the next structuring request; groups may span files
+    pending: List[Tuple[str, Tuple[str, str]]] = []
+    
+    def submit_pending() -> None:
+        if not pending:
+            return
+        texts = [chunk for chunk, _ in pending]
+        sources = [source for _, source in pending]
+        pending.clear()
+        with stats_lock:
+            stats["requests"] += 1
+        # Block while max_inflight requests are already being structured
+        inflight.acquire()
+        executor.submit(
+            agent.process_memories_from_texts, texts, type_hint,
+            estimated_tokens=sum(estimate_tokens(text, 800) for text in texts)
+        ).add_done_callback(lambda f, sources=sources: on_structured(f, sources))
+    
+    def submit_chunks(file_path: str, sha256: str, chunks: Iterable[str]) -> None:
+        # Chunks are hashed and checked against the manifest in groups, so a
+        # streamed file never accumulates in memory
+        if manifest:
+            manifest.start_file(file_path, sha256)
+        with stats_lock:
+            remaining[file_path] = 0
+        total = new = 0
+        chunks = iter(chunks)
+        for group in iter(lambda: list(islice(chunks, 100)), []):
+            hashed = [(chunk_sha256(chunk), chunk) for chunk in group]
+            done = manifest.stored_chunks(chunk_hash for chunk_hash, _ in hashed) if manifest else set()
+            for chunk_hash, chunk in hashed:
+                total += 1
+                # Skip chunks stored by earlier runs or already queued from another file in this run
+                if chunk_hash in done or chunk_hash in submitted_hashes:
+                    continue
+                submitted_hashes.add(chunk_hash)
+                new += 1
+                with stats_lock:
+                    remaining[file_path] += 1
+                    stats["chunks"] += 1
+                pending.append((chunk, (file_path, chunk_hash)))
+                if len(pending) >= structure_batch:
+                    submit_pending()
+        with stats_lock:
+            stats["skipped_chunks"] += total - new
+            totals[file_path] = total
+            sealed.add(file_path)
+            finished = remaining[file_path] == 0
+        logger.info(f"Chunked {file_path} into {total} chunks ({new} new)")
+        if manifest and finished:
+            manifest.finish_file(file_path, total)
+    
+    streamed = [path for path in paths if os.path.getsize(path) > stream_threshold]
+    pooled = [path for path in paths if os.path.getsize(path) <= stream_threshold]
+    
+    try:
+        with ProcessPoolExecutor(max_workers=max(1, workers)) as pool:
+            futures = [pool.submit(extract_file_chunks, path, chunk_size, overlap, chunk_unit) for path in pooled]
+            
+            for file_path in streamed:
+                sha256 = file_sha256(file_path)
+                if manifest and manifest.is_file_done(file_path, sha256):
+                    logger.info(f"Skipping {file_path}: content already ingested")
+                    stats["skipped_files"] += 1
+                    continue
+                stats["files"] += 1
+                logger.info(f"Streaming {file_path} ({os.path.getsize(file_path) / 1e6:.1f} MB)")
+                try:
+                    submit_chunks(file_path, sha256, iter_file_chunks(file_path, chunk_size, overlap, chunk_unit))
+                except Exception as e:
+                    # Chunks submitted so far are kept; the file stays unfinished and resumes next run
+                    logger.error(f"Failed to stream {file_path}: {e}")
+                    stats["failed_files"] += 1
+            
+            for future in as_completed(futures):
+                file_path, sha256, chunks, error = future.result()
+                if error:
+                    logger.error(error)
+                    stats["failed_files"] += 1
+                    continue
+                if manifest and manifest.is_file_done(file_path, sha256):
+                    logger.info(f"Skipping {file_path}: content already ingested")
+                    stats["skipped_files"] += 1
+                    continue
+                stats["files"] += 1
+                submit_chunks(file_path, sha256, chunks)
+            submit_pending()
+    finally:
+        # The executor is shared, so wait for this run's requests rather than shutting it down
+        for _ in range(max_inflight):
+            inflight.acquire()
+        writer.close()
+    
+    elapsed = time.perf_counter() - start
+    stats["stored"] = writer.stored
+    stats["merged"] = writer.merged
+    stats["rejected"] = writer.rejected
+    stats["failed_writes"] = writer.failed
+    stats["elapsed"] = elapsed
+    stats["chunks_per_second"] = stats["chunks"] / elapsed if elapsed else 0.0
+    stats["memories_per_second"] = writer.stored / elapsed if elapsed else 0.0
+    return stats
 
 def main():
     """Main function to process memory files or directories."""
@@ -224,32 +375,69 @@ def main():
     parser.add_argument("path", help="Path to a memory file or directory of memory files")
     parser.add_argument("--type", help="Optional hint about the type of memories (personal, faction, event, relationship, knowledge)")
     parser.add_argument("--config", help="Path to the config file")
+    parser.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1),
+                        help="Processes used to extract and chunk files")
+    parser.add_argument("--max-inflight", type=int, default=4,
+                        help="Maximum concurrent LLM structuring requests")
+    parser.add_argument("--batch-size", type=int, default=50, help="Memories written per transaction")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="Maximum chunk size")
+    parser.add_argument("--chunk-unit", choices=["chars", "tokens"], default="chars",
+                        help="Unit of --chunk-size and --overlap")
+    parser.add_argument("--overlap", type=int, default=0, help="Context repeated from the end of the previous chunk")
+    parser.add_argument("--structure-batch", type=int,
+                        help="Chunks structured per LLM request (default from memory.structure_batch_size)")
+    parser.add_argument("--manifest", help="Path to the ingest manifest (default from memory.manifest_path)")
+    parser.add_argument("--no-manifest", action="store_true", help="Ingest everything without skipping or checkpointing")
+    parser.add_argument("--force", action="store_true", help="Forget the manifest and re-ingest every file")
     args = parser.parse_args()
     
-    # Check if python-docx is available
-    if not DOCX_AVAILABLE:
-        logger.warning("python-docx is not installed. DOCX files will not be processed.")
-    
     # Initialize the AirthAgent
     config_path = args.config if args.config else os.path.join(parent_dir, "config", "config.yaml")
     agent = AirthAgent(config_path)
     
     # Process the specified path
     path = args.path
-    type_hint = args.type
-    
-    if os.path.isdir(path):
-        total_added = process_directory(path, agent, type_hint)
-        logger.info(f"Total memories added from directory: {total_added}")
-        print(f"Successfully added {total_added} memories from directory: {path}")
-    elif os.path.isfile(path):
-        memories = process_memory_file(path, agent, type_hint)
-        added = add_memories_to_database(memories, agent)
-        logger.info(f"Total memories added from file: {added}")
-        print(f"Successfully added {added} memories from file: {path}")
-    else:
+    if not os.path.exists(path):
         logger.error(f"Path does not exist: {path}")
         print(f"Error: Path does not exist: {path}")
+        return
+    
+    manifest = None
+    if not args.no_manifest:
+        manifest_path = args.manifest or agent.config.get("memory", {}).get(
+            "manifest_path", os.path.join("data", "ingest_manifest.sqlite3"))
+        if not os.path.isabs(manifest_path):
+            manifest_path = os.path.join(ROOT_DIR, manifest_path)
+        manifest = IngestManifest(manifest_path)
+        if args.force:
+            manifest.reset()
+    
+    structure_batch = args.structure_batch or agent.config.get("memory", {}).get("structure_batch_size", 1)
+    
+    paths = find_memory_files(path)
+    logger.info(f"Ingesting {len(paths)} files with {args.workers} extraction workers "
+                f"and {args.max_inflight} concurrent structuring requests of up to {structure_batch} chunks")
+    stats = ingest_files(paths, agent, args.type, workers=args.workers,
+                         max_inflight=args.max_inflight, batch_size=args.batch_size, manifest=manifest,
+                         chunk_size=args.chunk_size, overlap=args.overlap, chunk_unit=args.chunk_unit,
+                         structure_batch=max(1, structure_batch))
+    
+    print("\n" + "=" * 60)
+    print("MEMORY INGESTION SUMMARY")
+    print("=" * 60)
+    print(f"Files: {stats['files']} processed, {stats['skipped_files']} unchanged, {stats['failed_files']} failed")
+    print(f"Chunks: {stats['chunks']} new, {stats['skipped_chunks']} already ingested, "
+          f"{stats['structured']} structured in {stats['requests']} requests, {stats['failed_chunks']} failed")
+    print(f"Memories: {stats['stored']} stored, {stats['merged']} merged and {stats['rejected']} rejected "
+          f"as near-duplicates, {stats['failed_writes']} failed to store")
+    print(f"Elapsed: {stats['elapsed']:.1f}s ({stats['chunks_per_second']:.2f} chunks/s, "
+          f"{stats['memories_per_second']:.2f} memories/s)")
+    if manifest:
+        summary = manifest.summary()
+        print(f"Manifest: {summary['files'].get('done', 0)} files done, "
+              f"{summary['files'].get('in_progress', 0)} to resume, {summary['chunks']} chunks stored")
+        manifest.close()
+    print("=" * 60)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -3,14 +3,16 @@
 TEC Automation Pipeline
 This script runs the full automation pipeline for The Elidoras Codex:
 1. Fetches tasks from ClickUp
-2. Processes them with AI content enhancement
-3. Posts the enhanced content to WordPress
-4. Backs up content to Google Cloud Storage
+2. Processes them with AI content enhancement (prompts run concurrently)
+3. Queues the enhanced content in the WordPress outbox, which a background
+   publisher posts to WordPress while generation continues
+4. Backs up content to the configured storage backend (Google Cloud Storage by default)
 """
 import os
 import sys
 import yaml
 import logging
+import threading
 from typing import Dict, Any, List
 from datetime import datetime
 
@@ -23,7 +25,9 @@ sys.path.append(parent_dir)
 from agents.tecbot import TECBot
 from agents.clickup_agent import ClickUpAgent
 from agents.wp_poster import WordPressAgent
-from agents.gcp_storage import GCPStorageAgent
+from agents.wp_outbox import WordPressOutbox, OutboxPublisher
+from agents.storage_backend import create_storage_backend
+from agents.llm_executor import get_llm_executor, estimate_tokens
 
 # Configure logging
 logging.basicConfig(
@@ -55,6 +59,7 @@ def run_pipeline(config: Dict[str, Any]) -> Dict[str, Any]:
         "status": "success",
         "tasks_processed": 0,
         "content_enhanced": 0,
+        "posts_queued": 0,
         "posts_created": 0,
         "backups_created": 0,
         "errors": []
@@ -66,124 +71,208 @@ def run_pipeline(config: Dict[str, Any]) -> Dict[str, Any]:
         clickup_agent = ClickUpAgent(config_path)
         tecbot = TECBot(config_path)
         wp_agent = WordPressAgent(config_path)
-        gcp_agent = GCPStorageAgent(config_path)
+        storage_agent = create_storage_backend(config_path, default="gcp")
         
-        # Step 1: Get tasks from ClickUp
-        ready_status = "Ready for Publishing"  # Or get from config
-        tasks = clickup_agent.get_tasks(status=ready_status)
+        # Generated posts go through a durable outbox so a slow or unavailable
+        # WordPress site never blocks generation or loses content
+        wp_config = config.get('agents', {}).get('wordpress', {})
+        outbox_config = wp_config.get('outbox', {})
+        outbox_path = outbox_config.get('path')
+        if outbox_path and not os.path.isabs(outbox_path):
+            outbox_path = os.path.join(parent_dir, outbox_path)
+        outbox = WordPressOutbox(outbox_path)
+        results_lock = threading.Lock()
         
-        if not tasks:
-            logger.info(f"No tasks with status '{ready_status}' found in ClickUp")
-            return results
+        def on_published(entry: Dict[str, Any], post_result: Dict[str, Any]) -> None:
+            """Back up a published post and update its ClickUp task."""
+            post_title = entry["post"].get("title", "")
+            task_id = entry["metadata"].get("task_id", "")
+            task_name = entry["metadata"].get("task_name", "")
+            post_url = post_result.get("post_url", "")
+            post_id = post_result.get("post_id", "")
+            
+            with results_lock:
+                results["posts_created"] += 1
+            
+            # Step 3a: Backup the post data to storage
+            backup_data = {
+                "post_id": post_id,
+                "post_url": post_url,
+                "title": post_title,
+                "content": entry["post"].get("content", ""),
+                "excerpt": entry["post"].get("excerpt", ""),
+                "task_id": task_id,
+                "task_name": task_name,
+                "timestamp": datetime.now().isoformat()
+            }
+            
+            backup_result = storage_agent.backup_wordpress_data(
+                backup_data, 
+                f"post_{post_id}_{task_id}_{datetime.now().strftime('%Y%m%d')}"
+            )
+            
+            if backup_result.get("success"):
+                with results_lock:
+                    results["backups_created"] += 1
+                logger.info(f"Post backup created: {backup_result.get('url') or backup_result.get('path')}")
+            else:
+                logger.warning(f"Failed to backup post: {backup_result.get('error')}")
+            
+            if task_id:
+                # Step 4: Update ClickUp task with the WordPress post URL
+                comment = f"Content published to WordPress: {post_url}"
+                clickup_agent.add_comment_to_task(task_id, comment)
+                
+                # Update task status to "Published" or similar
+                clickup_agent.update_task_status(task_id, "Published")
         
-        logger.info(f"Found {len(tasks)} tasks ready for processing")
+        def on_failed(entry: Dict[str, Any], error: str) -> None:
+            """Record a post the publisher gave up on."""
+            task_id = entry["metadata"].get("task_id", "")
+            logger.error(f"Failed to publish task {task_id}: {error}")
+            with results_lock:
+                results["errors"].append(f"Task {task_id} publishing failed: {error}")
         
-        # Step 2: Process each task
-        for task in tasks:
-            task_id = task.get("id")
-            task_name = task.get("name", "Unnamed task")
-            task_description = task.get("description", "")
+        publisher = OutboxPublisher(
+            outbox,
+            wp_agent,
+            workers=outbox_config.get('workers', 4),
+            max_attempts=outbox_config.get('max_attempts', 5),
+            base_delay=outbox_config.get('retry_base_delay', 2.0),
+            on_published=on_published,
+            on_failed=on_failed
+        )
+        # Also picks up posts left over from earlier runs
+        publisher.start()
+        try:
+            # Step 1: Get tasks from ClickUp
+            ready_status = "Ready for Publishing"  # Or get from config
+            tasks = clickup_agent.get_tasks(status=ready_status)
             
-            logger.info(f"Processing task: {task_name} ({task_id})")
+            # A task stays ready until its post is published, so one whose post is
+            # still waiting in the outbox from an earlier run is not generated again
+            queued_task_ids = outbox.queued_keys()
+            waiting = [task for task in tasks or [] if task.get("id") in queued_task_ids]
+            if waiting:
+                logger.info(f"Skipping {len(waiting)} tasks whose posts are already in the outbox")
+                results["tasks_already_queued"] = len(waiting)
+                tasks = [task for task in tasks if task.get("id") not in queued_task_ids]
             
-            try:
-                # Step 2a: Enhance content with AI
-                enhanced_content = tecbot.generate_content(
-                    "content_enhancement", 
-                    {"content": f"{task_name}\n\n{task_description}"}
-                )
-                
-                results["content_enhanced"] += 1
+            if not tasks:
+                logger.info(f"No tasks with status '{ready_status}' left to process")
+                return results
+            
+            logger.info(f"Found {len(tasks)} tasks ready for processing")
+            
+            # Step 2: Generate content for every task concurrently. Each task needs
+            # 2a an enhanced body and 2b a compelling title; all of these prompts are
+            # independent, so they go through the shared LLM executor in one batch.
+            llm_requests = []
+            for task in tasks:
+                task_name = task.get("name", "Unnamed task")
+                task_description = task.get("description", "")
+                llm_requests.append(("content_enhancement", {"content": f"{task_name}\n\n{task_description}"}))
+                llm_requests.append(("post_title_generator", {"topic": task_name}))
+            
+            # Cached prompts are answered here; only the misses go through the
+            # executor, so they alone are charged to the rate limits
+            cached = [tecbot.is_cached(*request) for request in llm_requests]
+            llm_executor = get_llm_executor(config.get('llm_executor'))
+            miss_outputs = iter(llm_executor.map(
+                lambda request: tecbot.generate_content(*request),
+                [request for request, hit in zip(llm_requests, cached) if not hit],
+                estimate=lambda request: estimate_tokens(
+                    tecbot.prompts.get(request[0], "") + "".join(request[1].values()), tecbot.max_tokens
+                ),
+                return_exceptions=True
+            ))
+            llm_outputs = [tecbot.generate_content(*request) if hit else next(miss_outputs)
+                           for request, hit in zip(llm_requests, cached)]
+            
+            for index, task in enumerate(tasks):
+                task_id = task.get("id")
+                task_name = task.get("name", "Unnamed task")
                 
-                # Step 2b: Generate a compelling title
-                title_suggestions = tecbot.generate_content(
-                    "post_title_generator",
-                    {"topic": task_name}
-                )
+                logger.info(f"Processing task: {task_name} ({task_id})")
                 
-                # Use the first title in the list or the original task name if parsing fails
                 try:
-                    import re
-                    titles = re.findall(r'^\d+\.\s+(.+)$', title_suggestions, re.MULTILINE)
-                    post_title = titles[0] if titles else task_name
-                except:
-                    post_title = task_name
-                
-                # Step 3: Post to WordPress
-                post_result = wp_agent.create_post(
-                    title=post_title,
-                    content=enhanced_content,
-                    excerpt=task_name,
-                    status=config.get('agents', {}).get('wordpress', {}).get('post_status', 'draft')
-                )
-                
-                if post_result.get("success"):
-                    results["posts_created"] += 1
-                    post_url = post_result.get("post_url", "")
-                    post_id = post_result.get("post_id", "")
+                    enhanced_content = llm_outputs[2 * index]
+                    title_suggestions = llm_outputs[2 * index + 1]
+                    if isinstance(enhanced_content, Exception):
+                        raise enhanced_content
                     
-                    # Step 3a: Backup the post data to Google Cloud Storage
-                    backup_data = {
-                        "post_id": post_id,
-                        "post_url": post_url,
-                        "title": post_title,
-                        "content": enhanced_content,
-                        "excerpt": task_name,
-                        "task_id": task_id,
-                        "task_name": task_name,
-                        "timestamp": datetime.now().isoformat()
-                    }
+                    results["content_enhanced"] += 1
                     
-                    backup_result = gcp_agent.backup_wordpress_data(
-                        backup_data, 
-                        f"post_{post_id}_{task_id}_{datetime.now().strftime('%Y%m%d')}"
-                    )
+                    if isinstance(title_suggestions, Exception):
+                        title_suggestions = ""
                     
-                    if backup_result.get("success"):
-                        results["backups_created"] += 1
-                        logger.info(f"Post backup created: {backup_result.get('url')}")
-                    else:
-                        logger.warning(f"Failed to backup post: {backup_result.get('error')}")
+                    # Use the first title in the list or the original task name if parsing fails
+                    try:
+                        import re
+                        titles = re.findall(r'^\d+\.\s+(.+)$', title_suggestions, re.MULTILINE)
+                        post_title = titles[0] if titles else task_name
+                    except:
+                        post_title = task_name
                     
-                    # Step 4: Update ClickUp task with the WordPress post URL
-                    comment = f"Content published to WordPress: {post_url}"
-                    clickup_agent.add_comment_to_task(task_id, comment)
+                    # Step 3: Queue the post for WordPress; the publisher takes it from here
+                    outbox.enqueue(
+                        {
+                            "title": post_title,
+                            "content": enhanced_content,
+                            "excerpt": task_name,
+                            "status": wp_config.get('post_status', 'draft')
+                        },
+                        {"task_id": task_id, "task_name": task_name},
+                        key=task_id
+                    )
+                    publisher.notify()
+                    results["posts_queued"] += 1
                     
-                    # Update task status to "Published" or similar
-                    clickup_agent.update_task_status(task_id, "Published")
-                else:
-                    error_msg = post_result.get("error", "Unknown error")
-                    logger.error(f"Failed to publish task {task_id}: {error_msg}")
-                    results["errors"].append(f"Task {task_id} publishing failed: {error_msg}")
-                
-                results["tasks_processed"] += 1
-                
-            except Exception as e:
-                logger.error(f"Error processing task {task_id}: {e}")
-                results["errors"].append(f"Task {task_id} processing failed: {str(e)}")
+                    results["tasks_processed"] += 1
+                    
+                except Exception as e:
+                    logger.error(f"Error processing task {task_id}: {e}")
+                    results["errors"].append(f"Task {task_id} processing failed: {str(e)}")
+        finally:
+            # Wait for the publisher to catch up; anything still pending stays queued
+            outbox_counts = publisher.stop(drain=True, timeout=outbox_config.get('drain_timeout', 120))
+            outbox.close()
+            results["posts_pending"] = outbox_counts["pending"]
+            if outbox_counts["pending"]:
+                logger.warning(f"{outbox_counts['pending']} posts remain in the outbox for the next run")
+        
+        if tecbot.llm_cache:
+            results["llm_cache"] = tecbot.llm_cache.metrics()
         
-        # Step 5: Save overall execution log to Google Cloud Storage
+        # Step 5: Save overall execution log to storage
         try:
             log_data = {
                 "execution_date": datetime.now().isoformat(),
                 "results": results,
                 "tasks_processed": results["tasks_processed"],
+                "posts_queued": results["posts_queued"],
                 "posts_created": results["posts_created"],
                 "content_enhanced": results["content_enhanced"],
                 "backups_created": results["backups_created"]
             }
             
-            log_backup_result = gcp_agent.backup_wordpress_data(
+            log_backup_result = storage_agent.backup_wordpress_data(
                 log_data,
                 f"execution_log_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
             )
             
             if log_backup_result.get("success"):
-                logger.info(f"Execution log backup created: {log_backup_result.get('url')}")
+                logger.info(f"Execution log backup created: {log_backup_result.get('url') or log_backup_result.get('path')}")
             else:
                 logger.warning(f"Failed to backup execution log: {log_backup_result.get('error')}")
         except Exception as e:
-            logger.error(f"Error saving execution log to GCP: {e}")
+            logger.error(f"Error saving execution log to storage: {e}")
+        
+        # Persist backup records still buffered in the open segment (and, with tiered
+        # storage, give queued replication a chance to reach the remote)
+        flush_result = storage_agent.flush_backups()
+        if not flush_result.get("success"):
+            logger.warning(f"Failed to flush backups: {flush_result.get('error')}")
         
         logger.info("TEC automation pipeline completed")
         
@@ -214,8 +303,15 @@ if __name__ == "__main__":
     print(f"Status: {results['status'].upper()}")
     print(f"Tasks processed: {results['tasks_processed']}")
     print(f"Content enhanced: {results['content_enhanced']}")
+    print(f"WordPress posts queued: {results['posts_queued']}")
     print(f"WordPress posts created: {results['posts_created']}")
+    print(f"WordPress posts pending in outbox: {results.get('posts_pending', 0)}")
     print(f"GCP backups created: {results['backups_created']}")
+    if results.get("llm_cache"):
+        cache_metrics = results["llm_cache"]
+        print(f"LLM cache hit rate: {cache_metrics['hit_rate']:.0%} "
+              f"({cache_metrics['hits']} hits, {cache_metrics['misses']} misses, "
+              f"{cache_metrics['bypassed']} bypassed)")
     print(f"Duration: {duration:.2f} seconds")
     
     if results["errors"]:
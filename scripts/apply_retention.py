@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+"""
+Apply Retention - Prune, compress and tier backups and generated assets.
+
+Applies the rules in storage.retention.rules to local storage and to
+directories such as output/images: keep the last N files, keep one per day
+for D days, gzip files older than X days and move files older than Y days
+to Google Cloud Storage. Prints what was (or with --dry-run, would be)
+deleted, compressed and moved, and the bytes reclaimed.
+
+Usage:
+    python apply_retention.py [--dry-run] [--config config/config.yaml]
+"""
+import os
+import sys
+import json
+import logging
+import argparse
+
+import yaml
+
+# Add parent directory to path to import agents
+script_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(script_dir)
+sys.path.append(parent_dir)
+
+from agents.local_storage import LocalStorageAgent
+from agents.retention import build_retention_engine
+
+def main():
+    """Run the retention rules once and print the report."""
+    parser = argparse.ArgumentParser(description="Apply retention and tiering rules to stored files")
+    parser.add_argument("--dry-run", action="store_true", help="Only show what would change")
+    parser.add_argument("--config", default=os.path.join(parent_dir, "config", "config.yaml"),
+                        help="Path to config.yaml")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    with open(args.config, "r") as f:
+        config = yaml.safe_load(f) or {}
+    rules = config.get("storage", {}).get("retention", {}).get("rules", [])
+    if not rules:
+        print("No retention rules configured (storage.retention.rules)")
+        return
+
+    local = LocalStorageAgent(args.config) if any(rule.get("store", "storage") == "storage" for rule in rules) else None
+    remote = None
+    if any(rule.get("remote_after_days") is not None for rule in rules):
+        # Connects to the bucket only if a file is actually due to move
+        from agents.gcp_storage import GCPStorageAgent
+        remote = GCPStorageAgent(args.config)
+
+    engine = build_retention_engine(config, parent_dir, local=local, remote=remote)
+    result = engine.run(dry_run=args.dry_run)
+    print(json.dumps(result, indent=2))
+    sys.exit(0 if result["success"] else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python
+"""
+Memory Search Benchmark
+Measures recall and query latency of BM25, vector and hybrid memory retrieval
+on a synthetic corpus.
+
+The corpus is built from topics, each with its own vocabulary. Every query
+targets one memory with a few of its words, some of them inflected ("archive"
+-> "archives", "archiving") the way a person paraphrases, so keyword matching
+alone misses part of the signal. The benchmark reports how often the target
+is in the top k (recall@k), how many of the top k share the target's topic,
+and the p50/p95 latency per query.
+
+Usage:
+    python benchmark_memory_search.py [--memories 20000] [--queries 200] [--k 5]
+                                      [--topics 50] [--modes bm25 vector hybrid]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+from typing import Dict, Any, List
+
+# Add parent directory to path to import agents
+script_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(script_dir)
+sys.path.append(parent_dir)
+
+from agents.memory_store import MemoryStore
+from agents.memory_search import BM25Index
+from agents.memory_vectors import VectorIndex, HybridSearch
+
+SYLLABLES = ["ka", "lor", "eth", "vin", "mor", "sa", "tek", "ril", "oda", "zen", "qua", "bel",
+             "dra", "nox", "ume", "pha", "sil", "gor", "ira", "tal", "ven", "cor", "lyx", "aro"]
+SUFFIXES = ["s", "ing", "ed", "er"]
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of values."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+def make_word(rng: random.Random) -> str:
+    return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+
+def build_corpus(memories: int, topics: int, rng: random.Random) -> List[Dict[str, Any]]:
+    """Generate memories whose words come mostly from their topic's vocabulary."""
+    shared = [make_word(rng) for _ in range(2000)]
+    vocabularies = [[make_word(rng) for _ in range(60)] for _ in range(topics)]
+    corpus = []
+    for i in range(memories):
+        topic = i % topics
+        words = rng.choices(vocabularies[topic], k=rng.randint(15, 40)) + rng.choices(shared, k=rng.randint(5, 15))
+        rng.shuffle(words)
+        corpus.append({
+            "id": f"bench{i:06d}",
+            "type": "knowledge",
+            "title": " ".join(rng.sample(vocabularies[topic], 3)),
+            "content": " ".join(words),
+            "associated_entities": [],
+            "meta": {"priority_level": rng.randint(1, 10), "topic": topic}
+        })
+    return corpus
+
+def make_query(memory: Dict[str, Any], rng: random.Random, inflect: float) -> str:
+    """A few words of a memory, some of them inflected."""
+    words = rng.sample(memory["content"].split(), 4)
+    return " ".join(word + rng.choice(SUFFIXES) if rng.random() < inflect else word for word in words)
+
+def run_mode(name: str, retriever, queries: List[Dict[str, Any]], k: int) -> Dict[str, Any]:
+    """Time every query and score the results."""
+    latencies = []
+    hits = 0
+    on_topic = 0
+    for query in queries:
+        start = time.perf_counter()
+        results = retriever.search(query["text"], k)
+        latencies.append(time.perf_counter() - start)
+        ids = [memory_id for memory_id, _ in results]
+        hits += query["target"] in ids
+        on_topic += sum(1 for memory_id in ids if int(memory_id[5:]) % query["topics"] == query["topic"])
+    return {
+        "mode": name,
+        "recall": hits / len(queries),
+        "topic_precision": on_topic / (len(queries) * k),
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "max": max(latencies)
+    }
+
+def main():
+    """Run the benchmark and print a summary table."""
+    parser = argparse.ArgumentParser(description="Benchmark BM25, vector and hybrid memory retrieval")
+    parser.add_argument("--memories", type=int, default=20000, help="Number of synthetic memories")
+    parser.add_argument("--queries", type=int, default=200, help="Number of queries")
+    parser.add_argument("--k", type=int, default=5, help="Results per query")
+    parser.add_argument("--topics", type=int, default=50, help="Number of topics in the corpus")
+    parser.add_argument("--inflect", type=float, default=0.5, help="Fraction of query words inflected")
+    parser.add_argument("--modes", nargs="+", default=["bm25", "vector", "hybrid"],
+                        choices=["bm25", "vector", "hybrid"], help="Retrieval modes to test")
+    parser.add_argument("--seed", type=int, default=42, help="Seed for the corpus and queries")
+    args = parser.parse_args()
+
+    import logging
+    logging.getLogger("TEC").setLevel(logging.WARNING)
+
+    rng = random.Random(args.seed)
+    corpus = build_corpus(args.memories, args.topics, rng)
+    queries = []
+    for memory in rng.sample(corpus, min(args.queries, len(corpus))):
+        queries.append({
+            "text": make_query(memory, rng, args.inflect),
+            "target": memory["id"],
+            "topic": memory["meta"]["topic"],
+            "topics": args.topics
+        })
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = MemoryStore(os.path.join(tmp_dir, "memories.sqlite3"), seed_path=None)
+        start = time.perf_counter()
+        store.add_many(corpus)
+        store_elapsed = time.perf_counter() - start
+
+        start = time.perf_counter()
+        bm25 = BM25Index(store)
+        bm25_elapsed = time.perf_counter() - start
+        start = time.perf_counter()
+        vectors = VectorIndex(store)
+        vector_elapsed = time.perf_counter() - start
+
+        retrievers = {"bm25": bm25, "vector": vectors, "hybrid": HybridSearch(bm25, vectors)}
+        rows = [run_mode(mode, retrievers[mode], queries, args.k) for mode in args.modes]
+
+        vectors.close()
+        bm25.close()
+        store.close()
+
+    print("\n" + "=" * 72)
+    print(f"MEMORY SEARCH BENCHMARK  memories={args.memories} queries={len(queries)} k={args.k} "
+          f"topics={args.topics} inflect={args.inflect}")
+    print("=" * 72)
+    print(f"Build: store {store_elapsed:.1f}s, BM25 index {bm25_elapsed:.1f}s, vector index {vector_elapsed:.1f}s")
+    print(f"{'mode':<10}{'recall@k':>10}{'on-topic@k':>12}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}")
+    for row in rows:
+        print(f"{row['mode']:<10}{row['recall']:>10.3f}{row['topic_precision']:>12.3f}"
+              f"{row['p50'] * 1000:>10.2f}{row['p95'] * 1000:>10.2f}{row['max'] * 1000:>10.2f}")
+    print("=" * 72)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+#!/usr/bin/env python
+"""
+WordPress Publish Benchmark
+Measures publish throughput and tail latency of WordPressAgent against the
+fake WordPress REST server, both with inline (serial) create_post calls and
+through the outbox publisher.
+
+Usage:
+    python benchmark_wp_publish.py [--posts 200] [--latency 0.05] [--jitter 0.02]
+                                   [--error-rate 0.05] [--workers 1 4 8]
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import threading
+from typing import Dict, Any, List
+
+# Add parent directory to path to import agents
+script_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(script_dir)
+sys.path.append(parent_dir)
+sys.path.append(script_dir)
+
+from fake_wp_server import FakeWordPressServer
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of values."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+def summarize(mode: str, latencies: List[float], elapsed: float, published: int, failed: int) -> Dict[str, Any]:
+    """Build a result row for one benchmark run."""
+    return {
+        "mode": mode,
+        "published": published,
+        "failed": failed,
+        "elapsed": elapsed,
+        "throughput": published / elapsed if elapsed else 0.0,
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        "max": max(latencies) if latencies else 0.0
+    }
+
+def make_post(i: int) -> Dict[str, Any]:
+    return {
+        "title": f"Benchmark post {i}",
+        "content": "<p>" + "The Machine Goddess remembers. " * 40 + "</p>",
+        "excerpt": f"Benchmark excerpt {i}",
+        "status": "draft"
+    }
+
+def run_serial(wp_agent, posts: int) -> Dict[str, Any]:
+    """Publish posts one at a time, the way run_pipeline used to."""
+    latencies = []
+    published = failed = 0
+    start = time.perf_counter()
+    for i in range(posts):
+        call_start = time.perf_counter()
+        result = wp_agent.create_post(**make_post(i))
+        latencies.append(time.perf_counter() - call_start)
+        if result.get("success"):
+            published += 1
+        else:
+            failed += 1
+    return summarize("serial", latencies, time.perf_counter() - start, published, failed)
+
+def run_outbox(wp_agent, posts: int, workers: int) -> Dict[str, Any]:
+    """Publish posts through the outbox; latency is enqueue-to-published, retries included."""
+    from agents.wp_outbox import WordPressOutbox, OutboxPublisher
+
+    latencies = []
+    lock = threading.Lock()
+    failed = []
+
+    def on_published(entry: Dict[str, Any], result: Dict[str, Any]) -> None:
+        with lock:
+            latencies.append(time.perf_counter() - entry["metadata"]["enqueued_at"])
+
+    def on_failed(entry: Dict[str, Any], error: str) -> None:
+        with lock:
+            failed.append(entry["id"])
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        outbox = WordPressOutbox(os.path.join(tmp_dir, "outbox.sqlite3"))
+        publisher = OutboxPublisher(outbox, wp_agent, workers=workers, base_delay=0.05, max_delay=1.0,
+                                    poll_interval=0.05, on_published=on_published, on_failed=on_failed)
+        start = time.perf_counter()
+        publisher.start()
+        for i in range(posts):
+            outbox.enqueue(make_post(i), {"enqueued_at": time.perf_counter()})
+            publisher.notify()
+        enqueue_elapsed = time.perf_counter() - start
+        publisher.stop(drain=True)
+        elapsed = time.perf_counter() - start
+        outbox.close()
+
+    row = summarize(f"outbox x{workers}", latencies, elapsed, len(latencies), len(failed))
+    row["enqueue_elapsed"] = enqueue_elapsed
+    return row
+
+def main():
+    """Run the benchmark and print a summary table."""
+    parser = argparse.ArgumentParser(description="Benchmark WordPress publishing against a fake REST server")
+    parser.add_argument("--posts", type=int, default=200, help="Number of posts per run")
+    parser.add_argument("--latency", type=float, default=0.05, help="Server latency per request in seconds")
+    parser.add_argument("--jitter", type=float, default=0.02, help="Server latency jitter in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.05, help="Fraction of requests that fail")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8], help="Outbox worker counts to test")
+    parser.add_argument("--skip-serial", action="store_true", help="Skip the serial baseline")
+    parser.add_argument("--seed", type=int, default=42, help="Seed for latency/error injection")
+    args = parser.parse_args()
+
+    with FakeWordPressServer(latency=args.latency, jitter=args.jitter,
+                             error_rate=args.error_rate, seed=args.seed) as server:
+        os.environ["WP_SITE_URL"] = server.url
+        os.environ["WP_USER"] = "benchmark"
+        os.environ["WP_APP_PASS"] = "benchmark"
+
+        import logging
+        from agents.wp_poster import WordPressAgent
+        wp_agent = WordPressAgent()
+        # Per-post logging (including the injected failures) would flood the output
+        logging.getLogger("TEC").setLevel(logging.CRITICAL)
+
+        rows = []
+        if not args.skip_serial:
+            rows.append(run_serial(wp_agent, args.posts))
+        for workers in args.workers:
+            rows.append(run_outbox(wp_agent, args.posts, workers))
+
+        print("\n" + "=" * 86)
+        print(f"WORDPRESS PUBLISH BENCHMARK  posts={args.posts} latency={args.latency}s "
+              f"jitter={args.jitter}s error_rate={args.error_rate}")
+        print("=" * 86)
+        print(f"{'mode':<12}{'published':>10}{'failed':>8}{'elapsed s':>11}{'posts/s':>9}"
+              f"{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+        for row in rows:
+            print(f"{row['mode']:<12}{row['published']:>10}{row['failed']:>8}{row['elapsed']:>11.2f}"
+                  f"{row['throughput']:>9.1f}{row['p50'] * 1000:>9.1f}{row['p95'] * 1000:>9.1f}"
+                  f"{row['p99'] * 1000:>9.1f}{row['max'] * 1000:>9.1f}")
+        print("-" * 86)
+        print("serial: per-call latency, failures are lost. outbox: enqueue-to-published latency, "
+              "failures retried.")
+        print(f"Server handled {server.stats['requests']} requests "
+              f"({server.stats['errors_injected']} injected errors)")
+        print("=" * 86)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,484 @@
+#!/usr/bin/env python
+"""
+Fake Google Cloud Storage Server
+An in-process stand-in for the subset of the Cloud Storage JSON API that
+GCPStorageAgent uses, so uploads, downloads and backups can be exercised and
+benchmarked without a real bucket or credentials.
+
+Covers bucket lookup, object metadata, listing, deletion, compose, ranged
+media downloads and both multipart and resumable (chunked) uploads, with
+configurable latency and error injection. Objects carry size, md5Hash, crc32c
+(when google-crc32c is installed) and generation like real ones.
+
+Usage:
+    python fake_gcs_server.py [--port 4443] [--latency 0.05] [--jitter 0.02] [--error-rate 0.1]
+
+Then point the agents at it (the client library honours STORAGE_EMULATOR_HOST
+and skips authentication):
+    STORAGE_EMULATOR_HOST=http://127.0.0.1:4443 GCP_PROJECT_ID=tec GCP_BUCKET_NAME=tec-backups
+"""
+import re
+import json
+import time
+import uuid
+import base64
+import random
+import hashlib
+import argparse
+import threading
+from datetime import datetime, timezone
+from typing import Dict, Any, Optional, Tuple
+from urllib.parse import unquote, quote, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+try:
+    import google_crc32c
+except ImportError:
+    google_crc32c = None
+
+class FakeGCSServer:
+    """
+    Threaded fake of the Cloud Storage JSON API.
+
+    Buckets are created on first use and all state lives in memory. Every
+    request sleeps for latency +/- jitter seconds, and a fraction of requests
+    (error_rate) fail with error_status before touching any state.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0,
+                 jitter: float = 0.0, error_rate: float = 0.0, error_status: int = 503,
+                 seed: Optional[int] = None):
+        """
+        Configure the fake server.
+
+        Args:
+            host: Interface to bind
+            port: Port to bind (0 picks a free port)
+            latency: Base delay added to every request in seconds
+            jitter: Maximum random deviation from the base delay in seconds
+            error_rate: Fraction of requests (0-1) that fail with error_status
+            error_status: HTTP status returned for injected errors
+            seed: Seed for the latency/error random generator
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._buckets: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._uploads: Dict[str, Dict[str, Any]] = {}
+        self._generation = int(time.time() * 1e6)
+        self.stats = {"requests": 0, "errors_injected": 0, "bytes_uploaded": 0, "bytes_downloaded": 0,
+                      "by_route": {}}
+
+        handler = type("FakeGCSHandler", (_FakeGCSHandler,), {"server_state": self})
+        self._httpd = ThreadingHTTPServer((host, port), handler)
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        """Endpoint to use as STORAGE_EMULATOR_HOST."""
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeGCSServer":
+        """Serve requests on a background thread."""
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="fake-gcs-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Shut the server down."""
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread:
+            self._thread.join()
+
+    def __enter__(self) -> "FakeGCSServer":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def objects(self, bucket: str) -> Dict[str, bytes]:
+        """Return a snapshot of the object contents in a bucket."""
+        with self._lock:
+            return {name: obj["data"] for name, obj in self._buckets.get(bucket, {}).items()}
+
+    def pending_uploads(self) -> int:
+        """Number of resumable upload sessions that were started but not finished or cancelled."""
+        with self._lock:
+            return len(self._uploads)
+
+    # Request handling (called from handler threads)
+
+    def _before_request(self, route: str) -> Optional[int]:
+        with self._lock:
+            self.stats["requests"] += 1
+            self.stats["by_route"][route] = self.stats["by_route"].get(route, 0) + 1
+            delay = max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+            fail = self._random.random() < self.error_rate
+            if fail:
+                self.stats["errors_injected"] += 1
+        if delay:
+            time.sleep(delay)
+        return self.error_status if fail else None
+
+    def _store(self, bucket: str, name: str, data: bytes, metadata: Dict[str, Any],
+               if_generation_match: Optional[str], component_count: int = 0) -> Tuple[int, Dict[str, Any]]:
+        with self._lock:
+            objects = self._buckets.setdefault(bucket, {})
+            current = objects.get(name)
+            if if_generation_match is not None and str(current["generation"] if current else 0) != if_generation_match:
+                return 412, _error(412, "At least one of the pre-conditions you specified did not hold.")
+            self._generation += 1
+            now = datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+            objects[name] = {
+                "data": data,
+                "generation": self._generation,
+                "contentType": metadata.get("contentType") or "application/octet-stream",
+                "metadata": metadata.get("metadata"),
+                # Composite objects have a crc32c but no md5Hash, as in GCS
+                "md5Hash": None if component_count else base64.b64encode(hashlib.md5(data).digest()).decode(),
+                "crc32c": _crc32c(data),
+                "componentCount": component_count,
+                "timeCreated": now,
+                "updated": now
+            }
+            self.stats["bytes_uploaded"] += len(data)
+            return 200, self._resource(bucket, name, objects[name])
+
+    def _resource(self, bucket: str, name: str, obj: Dict[str, Any]) -> Dict[str, Any]:
+        data = obj["data"]
+        resource = {
+            "kind": "storage#object",
+            "id": f"{bucket}/{name}/{obj['generation']}",
+            "selfLink": f"{self.url}/storage/v1/b/{bucket}/o/{quote(name, safe='')}",
+            "mediaLink": f"{self.url}/download/storage/v1/b/{bucket}/o/{quote(name, safe='')}"
+                         f"?generation={obj['generation']}&alt=media",
+            "name": name,
+            "bucket": bucket,
+            "generation": str(obj["generation"]),
+            "metageneration": "1",
+            "contentType": obj["contentType"],
+            "size": str(len(data)),
+            "etag": base64.b64encode(str(obj["generation"]).encode()).decode(),
+            "timeCreated": obj["timeCreated"],
+            "updated": obj["updated"]
+        }
+        if obj["md5Hash"]:
+            resource["md5Hash"] = obj["md5Hash"]
+        if obj["crc32c"]:
+            resource["crc32c"] = obj["crc32c"]
+        if obj["componentCount"]:
+            resource["componentCount"] = obj["componentCount"]
+        if obj.get("metadata"):
+            resource["metadata"] = obj["metadata"]
+        return resource
+
+    def _get_object(self, bucket: str, name: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._buckets.get(bucket, {}).get(name)
+
+    def _list(self, bucket: str, prefix: str, page_token: Optional[str], max_results: int) -> Dict[str, Any]:
+        with self._lock:
+            objects = self._buckets.get(bucket, {})
+            names = sorted(name for name in objects if name.startswith(prefix) and (not page_token or name > page_token))
+            page = names[:max_results]
+            items = [self._resource(bucket, name, objects[name]) for name in page]
+        result = {"kind": "storage#objects", "items": items}
+        if len(names) > max_results:
+            result["nextPageToken"] = page[-1]
+        return result
+
+    def _delete(self, bucket: str, name: str) -> bool:
+        with self._lock:
+            return self._buckets.get(bucket, {}).pop(name, None) is not None
+
+    def _compose(self, bucket: str, name: str, request: Dict[str, Any],
+                 if_generation_match: Optional[str]) -> Tuple[int, Dict[str, Any]]:
+        sources = request.get("sourceObjects", [])
+        if not 1 <= len(sources) <= 32:
+            return 400, _error(400, "A compose request needs between 1 and 32 source objects.")
+        parts = []
+        component_count = 0
+        with self._lock:
+            objects = self._buckets.get(bucket, {})
+            for source in sources:
+                obj = objects.get(source["name"])
+                if obj is None:
+                    return 404, _error(404, f"Source object {source['name']} not found.")
+                parts.append(obj["data"])
+                component_count += obj["componentCount"] or 1
+        metadata = request.get("destination") or {}
+        return self._store(bucket, name, b"".join(parts), metadata, if_generation_match, component_count)
+
+    def _start_upload(self, bucket: str, metadata: Dict[str, Any], query: Dict[str, str]) -> str:
+        upload_id = uuid.uuid4().hex
+        with self._lock:
+            self._uploads[upload_id] = {
+                "bucket": bucket,
+                "name": metadata.get("name") or query.get("name"),
+                "metadata": metadata,
+                "if_generation_match": query.get("ifGenerationMatch"),
+                "data": bytearray()
+            }
+        return upload_id
+
+    def _upload_chunk(self, upload_id: str, content_range: str, body: bytes) -> Tuple[int, Any, Dict[str, str]]:
+        with self._lock:
+            upload = self._uploads.get(upload_id)
+        if upload is None:
+            return 404, _error(404, "No such upload session."), {}
+        # Content-Range: bytes <first>-<last>/<total or *>, or bytes */<total or *> with no data
+        match = re.fullmatch(r"bytes (?:(\d+)-(\d+)|\*)/(\d+|\*)", content_range.strip())
+        if not match:
+            return 400, _error(400, f"Invalid Content-Range: {content_range}"), {}
+        first, _, total = match.groups()
+        if first is not None and int(first) != len(upload["data"]):
+            return 400, _error(400, "Chunk does not start at the persisted offset."), {}
+        upload["data"] += body
+        if total != "*" and int(total) == len(upload["data"]):
+            with self._lock:
+                self._uploads.pop(upload_id, None)
+            status, resource = self._store(upload["bucket"], upload["name"], bytes(upload["data"]),
+                                           upload["metadata"], upload["if_generation_match"])
+            return status, resource, {}
+        headers = {"Range": f"bytes=0-{len(upload['data']) - 1}"} if upload["data"] else {}
+        return 308, None, headers
+
+    def _cancel_upload(self, upload_id: str) -> bool:
+        with self._lock:
+            return self._uploads.pop(upload_id, None) is not None
+
+    def dispatch(self, method: str, path: str, query: Dict[str, str], headers, body: bytes) -> Tuple[int, Any, Dict[str, str], bytes]:
+        """
+        Route a JSON API request.
+
+        Args:
+            method: HTTP method
+            path: Request path (e.g. /storage/v1/b/bucket/o/name)
+            query: Query string parameters
+            headers: Request headers
+            body: Raw request body
+
+        Returns:
+            Tuple of (status code, JSON-serialisable response or None, extra headers, raw media body)
+        """
+        match = re.fullmatch(r"/upload/storage/v1/b/([^/]+)/o", path)
+        if match:
+            bucket = unquote(match.group(1))
+            upload_type = query.get("uploadType")
+            if method == "POST" and upload_type == "multipart":
+                metadata, data = _parse_multipart_related(body, headers.get("Content-Type", ""))
+                status, resource = self._store(bucket, metadata.get("name") or query.get("name"), data, metadata,
+                                               query.get("ifGenerationMatch"))
+                return status, resource, {}, b""
+            if method == "POST" and upload_type == "media":
+                status, resource = self._store(bucket, query.get("name"), body,
+                                               {"contentType": headers.get("Content-Type")},
+                                               query.get("ifGenerationMatch"))
+                return status, resource, {}, b""
+            if method == "POST" and upload_type == "resumable":
+                metadata = json.loads(body) if body else {}
+                metadata.setdefault("contentType", headers.get("X-Upload-Content-Type"))
+                upload_id = self._start_upload(bucket, metadata, query)
+                location = f"{self.url}{path}?uploadType=resumable&upload_id={upload_id}"
+                return 200, None, {"Location": location}, b""
+            if method == "PUT" and "upload_id" in query:
+                status, resource, extra = self._upload_chunk(query["upload_id"], headers.get("Content-Range", ""), body)
+                return status, resource, extra, b""
+            if method == "DELETE" and "upload_id" in query:
+                self._cancel_upload(query["upload_id"])
+                return 499, None, {}, b""
+            return 400, _error(400, "Unsupported upload request."), {}, b""
+
+        match = re.fullmatch(r"/download/storage/v1/b/([^/]+)/o/(.+)", path)
+        if match and method == "GET":
+            bucket, name = unquote(match.group(1)), unquote(match.group(2))
+            obj = self._get_object(bucket, name)
+            if obj is None:
+                return 404, _error(404, "No such object."), {}, b""
+            return self._media(obj, headers.get("Range"))
+
+        match = re.fullmatch(r"/storage/v1/b/([^/]+)/o/(.+)/compose", path)
+        if match and method == "POST":
+            status, resource = self._compose(unquote(match.group(1)), unquote(match.group(2)),
+                                             json.loads(body or b"{}"), query.get("ifGenerationMatch"))
+            return status, resource, {}, b""
+
+        match = re.fullmatch(r"/storage/v1/b/([^/]+)(?:/o(?:/(.+))?)?", path)
+        if not match:
+            return 404, _error(404, "Not found."), {}, b""
+        bucket, is_objects, name = unquote(match.group(1)), "/o" in path, match.group(2)
+        if not is_objects:
+            with self._lock:
+                self._buckets.setdefault(bucket, {})
+            return 200, {"kind": "storage#bucket", "id": bucket, "name": bucket}, {}, b""
+        if name is None:
+            if method != "GET":
+                return 405, _error(405, "Method not allowed."), {}, b""
+            return 200, self._list(bucket, query.get("prefix", ""), query.get("pageToken"),
+                                   int(query.get("maxResults", 1000))), {}, b""
+        name = unquote(name)
+        obj = self._get_object(bucket, name)
+        if method == "GET":
+            if obj is None:
+                return 404, _error(404, "No such object."), {}, b""
+            if query.get("alt") == "media":
+                return self._media(obj, headers.get("Range"))
+            return 200, self._resource(bucket, name, obj), {}, b""
+        if method == "DELETE":
+            if "ifGenerationMatch" in query and (obj is None or str(obj["generation"]) != query["ifGenerationMatch"]):
+                return 412, _error(412, "At least one of the pre-conditions you specified did not hold."), {}, b""
+            if not self._delete(bucket, name):
+                return 404, _error(404, "No such object."), {}, b""
+            return 204, None, {}, b""
+        return 405, _error(405, "Method not allowed."), {}, b""
+
+    def _media(self, obj: Dict[str, Any], range_header: Optional[str]) -> Tuple[int, Any, Dict[str, str], bytes]:
+        data = obj["data"]
+        headers = {"Content-Type": obj["contentType"], "x-goog-generation": str(obj["generation"])}
+        match = re.fullmatch(r"bytes=(\d+)-(\d*)", (range_header or "").strip())
+        if match:
+            start = int(match.group(1))
+            end = min(int(match.group(2)) if match.group(2) else len(data) - 1, len(data) - 1)
+            chunk = data[start:end + 1]
+            headers["Content-Range"] = f"bytes {start}-{end}/{len(data)}"
+            status = 206
+        else:
+            chunk = data
+            hashes = [f"md5={obj['md5Hash']}"] if obj["md5Hash"] else []
+            if obj["crc32c"]:
+                hashes.insert(0, f"crc32c={obj['crc32c']}")
+            headers["x-goog-hash"] = ",".join(hashes)
+            status = 200
+        with self._lock:
+            self.stats["bytes_downloaded"] += len(chunk)
+        return status, None, headers, chunk
+
+def _crc32c(data: bytes) -> Optional[str]:
+    if google_crc32c is None:
+        return None
+    return base64.b64encode(google_crc32c.value(data).to_bytes(4, "big")).decode()
+
+def _error(status: int, message: str) -> Dict[str, Any]:
+    return {"error": {"code": status, "message": message, "errors": [{"message": message}]}}
+
+def _parse_multipart_related(raw_body: bytes, content_type: str) -> Tuple[Dict[str, Any], bytes]:
+    """Split a multipart/related upload into its JSON metadata and media parts."""
+    match = re.search(r"boundary=\"?([^\";]+)\"?", content_type)
+    if not match:
+        raise ValueError("Missing multipart boundary")
+    boundary = b"--" + match.group(1).encode()
+    parts = []
+    for part in raw_body.split(boundary)[1:]:
+        if part.startswith(b"--"):
+            break
+        head, _, value = part[2:].partition(b"\r\n\r\n")
+        parts.append((head, value[:-2] if value.endswith(b"\r\n") else value))
+    metadata = json.loads(parts[0][1])
+    media_head, data = parts[1]
+    part_type = re.search(rb"content-type:\s*(\S+)", media_head, re.IGNORECASE)
+    if part_type and not metadata.get("contentType"):
+        metadata["contentType"] = part_type.group(1).decode()
+    return metadata, data
+
+class _FakeGCSHandler(BaseHTTPRequestHandler):
+    """HTTP handler that forwards requests to the owning FakeGCSServer."""
+
+    server_state: FakeGCSServer = None
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately; without TCP_NODELAY each small
+    # response waits out the client's delayed ACK
+    disable_nagle_algorithm = True
+
+    def log_message(self, format: str, *args) -> None:
+        # Keep benchmark output clean
+        pass
+
+    def do_GET(self) -> None:
+        self._handle("GET")
+
+    def do_POST(self) -> None:
+        self._handle("POST")
+
+    def do_PUT(self) -> None:
+        self._handle("PUT")
+
+    def do_DELETE(self) -> None:
+        self._handle("DELETE")
+
+    def _handle(self, method: str) -> None:
+        state = self.server_state
+        length = int(self.headers.get("Content-Length", 0) or 0)
+        raw_body = self.rfile.read(length) if length else b""
+
+        raw_path, _, raw_query = self.path.partition("?")
+        query = {key: values[0] for key, values in parse_qs(raw_query).items()}
+
+        route = re.sub(r"/o/.+", "/o/{name}", re.sub(r"/b/[^/]+", "/b/{bucket}", raw_path))
+        injected_status = state._before_request(f"{method} {route}")
+        if injected_status:
+            self._respond(injected_status, _error(injected_status, "Injected failure."))
+            return
+
+        try:
+            status, data, headers, media = state.dispatch(method, raw_path, query, self.headers, raw_body)
+        except (ValueError, IndexError) as e:
+            self._respond(400, _error(400, str(e)))
+            return
+        if data is None and not media and status not in (200, 308):
+            # 204 and cancelled uploads
+            self.send_response(status)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if data is None:
+            self._respond_raw(status, media, headers)
+        else:
+            self._respond(status, data, headers)
+
+    def _respond(self, status: int, data: Any, headers: Optional[Dict[str, str]] = None) -> None:
+        payload = json.dumps(data).encode()
+        self._respond_raw(status, payload, {"Content-Type": "application/json; charset=UTF-8", **(headers or {})})
+
+    def _respond_raw(self, status: int, payload: bytes, headers: Dict[str, str]) -> None:
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(payload)))
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+def main():
+    """Run the fake server in the foreground."""
+    parser = argparse.ArgumentParser(description="Run a fake Google Cloud Storage JSON API server")
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to bind")
+    parser.add_argument("--port", type=int, default=4443, help="Port to bind")
+    parser.add_argument("--latency", type=float, default=0.0, help="Base latency per request in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Random latency deviation in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests that fail (0-1)")
+    parser.add_argument("--error-status", type=int, default=503, help="HTTP status for injected failures")
+    args = parser.parse_args()
+
+    server = FakeGCSServer(args.host, args.port, latency=args.latency, jitter=args.jitter,
+                           error_rate=args.error_rate, error_status=args.error_status)
+    print(f"Fake Cloud Storage API listening on {server.url} (Ctrl+C to stop)")
+    print(f"Use: STORAGE_EMULATOR_HOST={server.url}")
+    server.start()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print(f"\nServed {server.stats['requests']} requests "
+              f"({server.stats['errors_injected']} injected errors, "
+              f"{server.stats['bytes_uploaded'] / 1e6:.1f} MB up, {server.stats['bytes_downloaded'] / 1e6:.1f} MB down)")
+    finally:
+        server.stop()
+
+if __name__ == "__main__":
+    main()
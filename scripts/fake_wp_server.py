@@ -0,0 +1,405 @@
+#!/usr/bin/env python
+"""
+Fake WordPress REST Server
+An in-process stand-in for the WordPress REST API so WordPressAgent (and the
+outbox publisher) can be exercised and benchmarked without a live site.
+
+Covers posts, media, categories, tags and the batch endpoint, with configurable
+latency and error injection.
+
+Usage:
+    python fake_wp_server.py [--port 8088] [--latency 0.05] [--jitter 0.02] [--error-rate 0.1]
+
+Then point the agents at it:
+    WP_SITE_URL=http://127.0.0.1:8088 WP_USER=tec WP_APP_PASS=secret
+"""
+import re
+import json
+import time
+import random
+import argparse
+import threading
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+COLLECTIONS = ("posts", "media", "categories", "tags")
+
+class FakeWordPressServer:
+    """
+    Threaded fake of the WordPress REST API.
+
+    State lives in memory and is discarded when the server stops. Every request
+    sleeps for latency +/- jitter seconds, and a fraction of requests (error_rate)
+    fail with error_status before touching any state.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0,
+                 jitter: float = 0.0, error_rate: float = 0.0, error_status: int = 503,
+                 require_auth: bool = True, seed: Optional[int] = None):
+        """
+        Configure the fake server.
+
+        Args:
+            host: Interface to bind
+            port: Port to bind (0 picks a free port)
+            latency: Base delay added to every request in seconds
+            jitter: Maximum random deviation from the base delay in seconds
+            error_rate: Fraction of requests (0-1) that fail with error_status
+            error_status: HTTP status returned for injected errors
+            require_auth: Reject requests without a Basic Authorization header
+            seed: Seed for the latency/error random generator
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.require_auth = require_auth
+
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._items: Dict[str, Dict[int, Dict[str, Any]]] = {name: {} for name in COLLECTIONS}
+        self._next_id = 1
+        self.stats = {"requests": 0, "errors_injected": 0, "by_route": {}}
+
+        handler = type("FakeWordPressHandler", (_FakeWordPressHandler,), {"server_state": self})
+        self._httpd = ThreadingHTTPServer((host, port), handler)
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        """Site URL to use as WP_SITE_URL."""
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeWordPressServer":
+        """Serve requests on a background thread."""
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="fake-wp-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Shut the server down."""
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread:
+            self._thread.join()
+
+    def __enter__(self) -> "FakeWordPressServer":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def items(self, collection: str) -> List[Dict[str, Any]]:
+        """Return a snapshot of the stored items in a collection."""
+        with self._lock:
+            return [dict(item) for item in self._items[collection].values()]
+
+    # Request handling (called from handler threads)
+
+    def _before_request(self, route: str) -> Optional[int]:
+        with self._lock:
+            self.stats["requests"] += 1
+            self.stats["by_route"][route] = self.stats["by_route"].get(route, 0) + 1
+            delay = max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+            fail = self._random.random() < self.error_rate
+            if fail:
+                self.stats["errors_injected"] += 1
+        if delay:
+            time.sleep(delay)
+        return self.error_status if fail else None
+
+    def _create(self, collection: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        with self._lock:
+            item_id = self._next_id
+            self._next_id += 1
+            item = self._build_item(collection, item_id, data)
+            self._items[collection][item_id] = item
+            return dict(item)
+
+    def _update(self, collection: str, item_id: int, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            item = self._items[collection].get(item_id)
+            if item is None:
+                return None
+            for key, value in data.items():
+                if key in ("title", "content", "excerpt") and collection == "posts":
+                    item[key] = {"rendered": value, "raw": value}
+                else:
+                    item[key] = value
+            item["modified"] = datetime.now().isoformat()
+            return dict(item)
+
+    def _delete(self, collection: str, item_id: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            item = self._items[collection].pop(item_id, None)
+            return dict(item) if item else None
+
+    def _get(self, collection: str, item_id: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            item = self._items[collection].get(item_id)
+            return dict(item) if item else None
+
+    def _list(self, collection: str, page: int, per_page: int, search: str = "") -> Tuple[List[Dict[str, Any]], int]:
+        with self._lock:
+            items = list(self._items[collection].values())
+        if search:
+            needle = search.lower()
+            items = [item for item in items if needle in json.dumps(item).lower()]
+        start = (page - 1) * per_page
+        return [dict(item) for item in items[start:start + per_page]], len(items)
+
+    def _build_item(self, collection: str, item_id: int, data: Dict[str, Any]) -> Dict[str, Any]:
+        now = datetime.now().isoformat()
+        if collection == "posts":
+            slug = re.sub(r"[^a-z0-9]+", "-", str(data.get("title", "")).lower()).strip("-") or str(item_id)
+            return {
+                "id": item_id,
+                "date": now,
+                "modified": now,
+                "slug": slug,
+                "status": data.get("status", "draft"),
+                "link": f"{self.url}/?p={item_id}",
+                "title": {"rendered": data.get("title", ""), "raw": data.get("title", "")},
+                "content": {"rendered": data.get("content", ""), "raw": data.get("content", "")},
+                "excerpt": {"rendered": data.get("excerpt", ""), "raw": data.get("excerpt", "")},
+                "categories": data.get("categories", []),
+                "tags": data.get("tags", []),
+                "featured_media": data.get("featured_media", 0)
+            }
+        if collection == "media":
+            file_name = data.get("file_name", f"upload-{item_id}")
+            return {
+                "id": item_id,
+                "date": now,
+                "modified": now,
+                "title": {"rendered": data.get("title") or file_name},
+                "media_type": "image" if data.get("mime_type", "").startswith("image/") else "file",
+                "mime_type": data.get("mime_type", "application/octet-stream"),
+                "source_url": f"{self.url}/wp-content/uploads/{file_name}",
+                "media_details": {"filesize": data.get("size", 0)}
+            }
+        # categories and tags
+        name = data.get("name", f"term-{item_id}")
+        return {
+            "id": item_id,
+            "name": name,
+            "slug": data.get("slug") or re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-"),
+            "description": data.get("description", ""),
+            "count": 0,
+            "taxonomy": "category" if collection == "categories" else "post_tag"
+        }
+
+    def dispatch(self, method: str, path: str, query: Dict[str, str], body: Dict[str, Any]) -> Tuple[int, Any, Dict[str, str]]:
+        """
+        Route a REST request to the in-memory collections.
+
+        Args:
+            method: HTTP method
+            path: Path relative to /wp-json (e.g. /wp/v2/posts/3)
+            query: Query string parameters
+            body: Decoded request body
+
+        Returns:
+            Tuple of (status code, JSON-serialisable response, extra headers)
+        """
+        if path.rstrip("/") == "/batch/v1" and method == "POST":
+            return self._dispatch_batch(body)
+
+        match = re.fullmatch(r"/wp/v2/(posts|media|categories|tags)(?:/(\d+))?/?", path)
+        if not match:
+            return 404, _error("rest_no_route", "No route was found matching the URL and request method.", 404), {}
+        collection, item_id = match.group(1), match.group(2)
+
+        if item_id is None:
+            if method == "GET":
+                page = int(query.get("page", 1))
+                per_page = int(query.get("per_page", 10))
+                items, total = self._list(collection, page, per_page, query.get("search", ""))
+                pages = max(1, -(-total // per_page))
+                return 200, items, {"X-WP-Total": str(total), "X-WP-TotalPages": str(pages)}
+            if method == "POST":
+                if collection == "posts" and not body.get("title") and not body.get("content"):
+                    return 400, _error("empty_content", "Content, title, and excerpt are empty.", 400), {}
+                if collection in ("categories", "tags") and not body.get("name"):
+                    return 400, _error("rest_missing_callback_param", "Missing parameter(s): name", 400), {}
+                return 201, self._create(collection, body), {}
+            return 405, _error("rest_no_route", "Method not allowed.", 405), {}
+
+        item_id = int(item_id)
+        if method == "GET":
+            item = self._get(collection, item_id)
+        elif method in ("POST", "PUT", "PATCH"):
+            item = self._update(collection, item_id, body)
+        elif method == "DELETE":
+            item = self._delete(collection, item_id)
+            if item:
+                return 200, {"deleted": True, "previous": item}, {}
+        else:
+            return 405, _error("rest_no_route", "Method not allowed.", 405), {}
+        if item is None:
+            return 404, _error("rest_post_invalid_id", "Invalid ID.", 404), {}
+        return 200, item, {}
+
+    def _dispatch_batch(self, body: Dict[str, Any]) -> Tuple[int, Any, Dict[str, str]]:
+        requests_list = body.get("requests", [])
+        if len(requests_list) > 25:
+            return 400, _error("rest_batch_max_requests", "The batch request contains too many requests.", 400), {}
+        responses = []
+        for sub_request in requests_list:
+            sub_path = sub_request.get("path", "")
+            sub_path, _, sub_query = sub_path.partition("?")
+            query = dict(pair.split("=", 1) for pair in sub_query.split("&") if "=" in pair)
+            status, data, headers = self.dispatch(sub_request.get("method", "POST").upper(), sub_path,
+                                                  query, sub_request.get("body") or {})
+            responses.append({"body": data, "status": status, "headers": headers})
+        return 207, {"responses": responses}, {}
+
+def _error(code: str, message: str, status: int) -> Dict[str, Any]:
+    return {"code": code, "message": message, "data": {"status": status}}
+
+class _FakeWordPressHandler(BaseHTTPRequestHandler):
+    """HTTP handler that forwards /wp-json requests to the owning FakeWordPressServer."""
+
+    server_state: FakeWordPressServer = None
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format: str, *args) -> None:
+        # Keep benchmark output clean
+        pass
+
+    def do_GET(self) -> None:
+        self._handle("GET")
+
+    def do_POST(self) -> None:
+        self._handle("POST")
+
+    def do_PUT(self) -> None:
+        self._handle("PUT")
+
+    def do_PATCH(self) -> None:
+        self._handle("PATCH")
+
+    def do_DELETE(self) -> None:
+        self._handle("DELETE")
+
+    def _handle(self, method: str) -> None:
+        state = self.server_state
+        length = int(self.headers.get("Content-Length", 0) or 0)
+        raw_body = self.rfile.read(length) if length else b""
+
+        raw_path, _, raw_query = self.path.partition("?")
+        query = dict(pair.split("=", 1) for pair in raw_query.split("&") if "=" in pair)
+        if not raw_path.startswith("/wp-json"):
+            self._respond(404, _error("rest_no_route", "Not a REST route.", 404))
+            return
+        path = raw_path[len("/wp-json"):]
+
+        route = re.sub(r"/\d+", "/{id}", path)
+        injected_status = state._before_request(f"{method} {route}")
+        if injected_status:
+            self._respond(injected_status, _error("fake_injected_error", "Injected failure.", injected_status))
+            return
+
+        if state.require_auth and not self.headers.get("Authorization", "").startswith("Basic "):
+            self._respond(401, _error("rest_not_logged_in", "You are not currently logged in.", 401))
+            return
+
+        try:
+            body = self._decode_body(raw_body, path)
+        except ValueError as e:
+            self._respond(400, _error("rest_invalid_json", str(e), 400))
+            return
+
+        status, data, headers = state.dispatch(method, path, query, body)
+        self._respond(status, data, headers)
+
+    def _decode_body(self, raw_body: bytes, path: str) -> Dict[str, Any]:
+        content_type = self.headers.get("Content-Type", "")
+        if not raw_body:
+            return {}
+        if content_type.startswith("application/json"):
+            try:
+                return json.loads(raw_body)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Invalid JSON body: {e}")
+        if content_type.startswith("multipart/form-data"):
+            return _parse_multipart(raw_body, content_type)
+        if path.startswith("/wp/v2/media"):
+            # Raw binary upload with Content-Disposition, as the REST API also accepts
+            disposition = self.headers.get("Content-Disposition", "")
+            match = re.search(r'filename="?([^";]+)"?', disposition)
+            return {
+                "file_name": match.group(1) if match else "upload",
+                "mime_type": content_type or "application/octet-stream",
+                "size": len(raw_body)
+            }
+        return {}
+
+    def _respond(self, status: int, data: Any, headers: Optional[Dict[str, str]] = None) -> None:
+        payload = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=UTF-8")
+        self.send_header("Content-Length", str(len(payload)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+def _parse_multipart(raw_body: bytes, content_type: str) -> Dict[str, Any]:
+    """Minimal multipart/form-data parser for media uploads."""
+    match = re.search(r"boundary=\"?([^\";]+)\"?", content_type)
+    if not match:
+        raise ValueError("Missing multipart boundary")
+    boundary = b"--" + match.group(1).encode()
+
+    fields: Dict[str, Any] = {}
+    for part in raw_body.split(boundary):
+        part = part.strip(b"\r\n")
+        if not part or part == b"--":
+            continue
+        head, _, value = part.partition(b"\r\n\r\n")
+        head_text = head.decode(errors="replace")
+        name = re.search(r'name="([^"]+)"', head_text)
+        if not name:
+            continue
+        file_name = re.search(r'filename="([^"]*)"', head_text)
+        if file_name:
+            part_type = re.search(r"Content-Type:\s*(\S+)", head_text, re.IGNORECASE)
+            fields["file_name"] = file_name.group(1)
+            fields["mime_type"] = part_type.group(1) if part_type else "application/octet-stream"
+            fields["size"] = len(value)
+        else:
+            fields[name.group(1)] = value.decode(errors="replace")
+    return fields
+
+def main():
+    """Run the fake server in the foreground."""
+    parser = argparse.ArgumentParser(description="Run a fake WordPress REST API server")
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to bind")
+    parser.add_argument("--port", type=int, default=8088, help="Port to bind")
+    parser.add_argument("--latency", type=float, default=0.0, help="Base latency per request in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Random latency deviation in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests that fail (0-1)")
+    parser.add_argument("--error-status", type=int, default=503, help="HTTP status for injected failures")
+    parser.add_argument("--no-auth", action="store_true", help="Accept requests without credentials")
+    args = parser.parse_args()
+
+    server = FakeWordPressServer(args.host, args.port, latency=args.latency, jitter=args.jitter,
+                                 error_rate=args.error_rate, error_status=args.error_status,
+                                 require_auth=not args.no_auth)
+    print(f"Fake WordPress REST API listening on {server.url}/wp-json (Ctrl+C to stop)")
+    server.start()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print(f"\nServed {server.stats['requests']} requests "
+              f"({server.stats['errors_injected']} injected errors)")
+    finally:
+        server.stop()
+
+if __name__ == "__main__":
+    main()
@@ -62,8 +62,11 @@ def run_console_mode(agent: AirthAgent):
             print("\nAirth: *smirks* See you in the digital abyss...\n")
             break
         
-        response = agent.generate_in_character_response(user_input)
-        print(f"\nAirth: {response}\n")
+        # Print tokens as they arrive so the wait is only until the first one
+        print("\nAirth: ", end="", flush=True)
+        for fragment in agent.stream_in_character_response(user_input):
+            print(fragment, end="", flush=True)
+        print("\n")
 
 
 def run_post_mode(agent: AirthAgent):
@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+"""
+Sync Storage - Mirror local storage to the Google Cloud Storage bucket, or back.
+
+Compares the local metadata index with the bucket listing and transfers only
+files that are new or differ in size or checksum, in parallel. Files that
+exist only on the destination are listed, and deleted with --delete.
+
+Usage:
+    python sync_storage.py [--prefix images/] [--direction {upload,download}]
+                           [--delete] [--dry-run] [--exclude backups/segments/]
+                           [--config config/config.yaml]
+
+Example:
+    python sync_storage.py --prefix images/ --delete --dry-run
+"""
+import os
+import sys
+import json
+import logging
+import argparse
+
+# Add parent directory to path to import agents
+script_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(script_dir)
+sys.path.append(parent_dir)
+
+from agents.local_storage import LocalStorageAgent
+from agents.gcp_storage import GCPStorageAgent
+from agents.storage_sync import StorageSync
+
+def main():
+    """Run one sync and print a summary."""
+    parser = argparse.ArgumentParser(description="Sync local storage with the Cloud Storage bucket")
+    parser.add_argument("--prefix", default="", help="Only sync names starting with this")
+    parser.add_argument("--direction", choices=["upload", "download"], default="upload",
+                        help="upload makes the bucket match local storage; download the reverse")
+    parser.add_argument("--delete", action="store_true", help="Delete files that exist only on the destination")
+    parser.add_argument("--dry-run", action="store_true", help="Only show what would change")
+    parser.add_argument("--exclude", nargs="*", default=None,
+                        help="Skip names starting with these prefixes (default: storage.sync.exclude_prefixes)")
+    parser.add_argument("--config", default=os.path.join(parent_dir, "config", "config.yaml"),
+                        help="Path to config.yaml")
+    parser.add_argument("--verbose", action="store_true", help="List every file to transfer or delete")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    local = LocalStorageAgent(args.config)
+    remote = GCPStorageAgent(args.config)
+    if not remote.bucket:
+        print("Bucket not initialized; check GCP_BUCKET_NAME and credentials")
+        sys.exit(1)
+    exclude = args.exclude
+    if exclude is None:
+        exclude = local.config.get("storage", {}).get("sync", {}).get("exclude_prefixes", [])
+
+    syncer = StorageSync(local, remote)
+    try:
+        result = syncer.sync(args.prefix, args.direction, delete=args.delete, dry_run=args.dry_run,
+                             exclude_prefixes=tuple(exclude))
+    finally:
+        syncer.close()
+
+    if args.verbose:
+        for item in result["transfer"]:
+            print(f"{args.direction:>8} {item['name']} ({item['reason']}, {item['bytes']} bytes)")
+        for name in result["delete"]:
+            print(f"{'delete':>8} {name}")
+    summary = {key: value for key, value in result.items() if key not in ("transfer", "delete", "extraneous")}
+    summary.update(to_transfer=len(result["transfer"]), to_delete=len(result["delete"]),
+                   extraneous=len(result["extraneous"]))
+    print(json.dumps(summary, indent=2))
+    sys.exit(0 if result["success"] else 1)
+
+if __name__ == "__main__":
+    main()